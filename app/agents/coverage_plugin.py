@@ -0,0 +1,92 @@
+"""
+Plugin pytest que registra a cobertura de linhas e arcos da implementação por teste.
+
+Carregado pelo runner via `-p app.agents.coverage_plugin --line-coverage-out=<arquivo>`.
+Usa sys.settrace apenas durante a chamada de cada teste e só rastreia frames do
+módulo alvo, sem depender do pacote `coverage`. Ao final da sessão grava um JSON:
+
+    {nodeid: {"lines": [int, ...], "arcs": [[de, para], ...]}}
+
+Arcos seguem a convenção do coverage.py: entrada e saída da função usam o
+número negativo da primeira linha da função.
+"""
+import json
+import os
+import sys
+import threading
+from typing import Dict, Set, Tuple
+import pytest
+
+_coverage: Dict[str, Dict[str, Set]] = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--line-coverage-out",
+        action="store",
+        default="",
+        help="Arquivo JSON que recebe a cobertura por teste."
+    )
+    parser.addoption(
+        "--line-coverage-module",
+        action="store",
+        default="app_code.py",
+        help="Nome do arquivo da implementação a rastrear."
+    )
+
+
+def pytest_sessionstart(session):
+    # O plugin pode ser reutilizado por várias sessões no mesmo processo (workers do sandbox)
+    _coverage.clear()
+
+
+def _make_tracer(target: str, lines: Set[int], arcs: Set[Tuple[int, int]]):
+    def global_trace(frame, event, arg):
+        if event != "call" or os.path.basename(frame.f_code.co_filename) != target:
+            return None
+        last = [-frame.f_code.co_firstlineno]
+
+        def local_trace(frame, event, arg):
+            if event == "line":
+                lines.add(frame.f_lineno)
+                arcs.add((last[0], frame.f_lineno))
+                last[0] = frame.f_lineno
+            elif event == "return":
+                arcs.add((last[0], -frame.f_code.co_firstlineno))
+            return local_trace
+
+        return local_trace
+
+    return global_trace
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    if not item.config.getoption("--line-coverage-out"):
+        yield
+        return
+
+    lines: Set[int] = set()
+    arcs: Set[Tuple[int, int]] = set()
+    tracer = _make_tracer(item.config.getoption("--line-coverage-module"), lines, arcs)
+    previous = sys.gettrace()
+    sys.settrace(tracer)
+    threading.settrace(tracer)
+    try:
+        yield
+    finally:
+        sys.settrace(previous)
+        threading.settrace(None)
+        _coverage[item.nodeid] = {"lines": lines, "arcs": arcs}
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption("--line-coverage-out")
+    if not path:
+        return
+    data = {
+        nodeid: {"lines": sorted(cov["lines"]), "arcs": sorted(list(arc) for arc in cov["arcs"])}
+        for nodeid, cov in _coverage.items()
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
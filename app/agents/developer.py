@@ -1,22 +1,94 @@
 import re
-from langchain_openai import ChatOpenAI
+import difflib
 from langchain_core.messages import SystemMessage, HumanMessage
 from app.config import Config
+from app.llm import GenerationAborted, stream_completion, select_model, create_chat_model
 import logging
+import threading
+from typing import Optional, Tuple
 
 def remove_test_imports(code: str) -> str:
     """Remove imports relacionados a testes."""
     lines = code.split('\n')
     return '\n'.join([line for line in lines if not (line.strip().startswith('import pytest') or line.strip().startswith('from pytest'))])
 
+class GenerationFailed(ValueError):
+    """Developer ou Tester não produziu código válido após esgotar as tentativas."""
+    pass
+
+def _developer_line_check(function_name: str):
+    """
+    Checagens baratas aplicadas a cada linha enquanto o Developer gera o código.
+
+    Aborta em blocos markdown, quando a primeira função pública de nível de
+    módulo parecida com a função alvo tem outro nome (ex.: `roman_to_integer`
+    em vez de `roman_to_int`) ou quando `def <função>` não aparece nas primeiras
+    Config.DEVELOPER_NAME_CHECK_LINES linhas. Helpers (nomes com `_` ou sem
+    semelhança com a função alvo) são aceitos antes dela.
+    """
+    state = {"lines": 0, "found": False}
+
+    def check(line: str):
+        if line.lstrip().startswith("```"):
+            return "bloco markdown na resposta"
+        if state["found"]:
+            return None
+
+        state["lines"] += 1
+        match = _TOP_LEVEL_DEF.match(line)
+        if match:
+            name = match.group(1)
+            if name == function_name:
+                state["found"] = True
+                return None
+            if _looks_like_target(name, function_name):
+                return f"função '{name}' gerada no lugar de '{function_name}'"
+        if state["lines"] >= Config.DEVELOPER_NAME_CHECK_LINES:
+            return f"'def {function_name}' ausente nas primeiras {state['lines']} linhas"
+        return None
+
+    return check
+
+_TOP_LEVEL_DEF = re.compile(r'^(?:async\s+)?def\s+(\w+)\s*\(')
+
+def _looks_like_target(name: str, function_name: str) -> bool:
+    """Função pública cujo nome é uma variação do alvo (e não um helper)."""
+    if name.startswith("_"):
+        return False
+    return difflib.SequenceMatcher(None, name.lower(), function_name.lower()).ratio() >= 0.75
+
+def validate_generated_code(code: str, function_name: str) -> str:
+    """Valida o código gerado. Retorna a descrição do problema ou string vazia se válido."""
+    if not code.strip():
+        return "código vazio"
+
+    # Valida se a função tem o nome correto (def exato, não apenas um prefixo)
+    if not re.search(rf'^\s*(?:async\s+)?def\s+{re.escape(function_name)}\s*\(', code, re.MULTILINE):
+        return f"código não contém a função {function_name}"
+
+    try:
+        compile(code, '<string>', 'exec')
+    except SyntaxError as e:
+        return f"erro de sintaxe: {e}"
+
+    return ""
+
 def generate_code_incremental(
     test_code: str,
     function_name: str,
     feedback: str = "",
-    previous_code: str = ""
+    previous_code: str = "",
+    model: Optional[str] = None,
+    temperature: float = 0.3,
+    cancel: Optional[threading.Event] = None
 ) -> str:
-    """Gera código MÍNIMO para fazer os testes passarem."""
-    llm = ChatOpenAI(model=Config.MODEL, temperature=0.3)
+    """
+    Gera código MÍNIMO para fazer os testes passarem.
+
+    Com `cancel`, a geração é abortada (GenerationAborted) assim que o evento
+    for sinalizado, ex.: quando outro candidato especulativo já ficou GREEN.
+    """
+    llm = create_chat_model("developer", model or select_model("developer"), temperature=temperature)
     
     context_parts = []
     if feedback:
@@ -87,42 +159,108 @@ def generate_code_incremental(
         f"Código da função {function_name}:"
     ))
     
-    response = llm.invoke([system_msg, human_msg])
-    raw_code = response.content.strip()
-    
-    
-    ##logging.info("=" * 70)
-    ##logging.info("🔍 RAW RESPONSE FROM DEVELOPER LLM:")
-    ##logging.info(f"Length: {len(raw_code)} chars")
-    ##logging.info(f"Lines: {len(raw_code.split(chr(10)))}")
-    ##logging.info(f"Content:\n{raw_code}")
-    ##logging.info("=" * 70)
-    
-    # Remove imports de teste
-    clean_code = remove_test_imports(raw_code)
-    
-   
-    ##logging.info("=" * 70)
-    ##logging.info("🔍 FINAL CODE AFTER CLEANUP:")
-    ##logging.info(f"Length: {len(clean_code)} chars")
-    ##logging.info(f"Lines: {len(clean_code.split(chr(10)))}")
-    ##logging.info(f"Content:\n{clean_code}")
-    ##logging.info("=" * 70)
-    
-    if not clean_code.strip():
-        raise ValueError("Developer gerou código vazio")
-    
-    # Valida se a função tem o nome correto
-    if f"def {function_name}" not in clean_code:
-        raise ValueError(
-            f"Código não contém a função {function_name}.\n\n"
-            f"RAW RESPONSE:\n{raw_code}\n\n"
-            f"FINAL CODE:\n{clean_code}"
+    max_chars = max(Config.DEVELOPER_MAX_CHARS, 3 * len(previous_code))
+    code, last_error = _generate_validated(llm, system_msg, human_msg, function_name, max_chars, cancel)
+    if code is not None:
+        return code
+
+    # Orçamento local esgotado: mantém o código anterior válido em vez de abortar o workflow
+    if previous_code and not validate_generated_code(previous_code, function_name):
+        logging.error(f"❌ Developer esgotou as tentativas ({last_error}). Mantendo código anterior.")
+        return previous_code
+
+    raise GenerationFailed(f"Developer falhou após {Config.GENERATION_MAX_ATTEMPTS} tentativas: {last_error}")
+
+def _generate_validated(
+    llm,
+    system_msg: SystemMessage,
+    human_msg: HumanMessage,
+    function_name: str,
+    max_chars: int,
+    cancel: Optional[threading.Event] = None
+) -> Tuple[Optional[str], str]:
+    """Gera código em streaming, repetindo respostas inválidas. Retorna (código ou None, último erro)."""
+    messages = [system_msg, human_msg]
+    last_error = ""
+
+    for attempt in range(1, Config.GENERATION_MAX_ATTEMPTS + 1):
+        # Checagem com estado (linhas já vistas): uma nova a cada tentativa
+        line_check = _developer_line_check(function_name)
+        if cancel is not None:
+            base_check = line_check
+            line_check = lambda line: "candidato cancelado" if cancel.is_set() else base_check(line)
+
+        try:
+            raw_code = stream_completion(
+                llm,
+                messages,
+                line_check=line_check,
+                max_chars=max_chars
+            ).strip()
+        except GenerationAborted as e:
+            if cancel is not None and cancel.is_set():
+                raise
+            last_error = f"geração abortada: {e.reason}"
+        else:
+            # Remove imports de teste
+            clean_code = remove_test_imports(raw_code)
+            last_error = validate_generated_code(clean_code, function_name)
+            if not last_error:
+                return clean_code, ""
+
+        logging.warning(
+            f"⚠️ Developer: tentativa {attempt}/{Config.GENERATION_MAX_ATTEMPTS} rejeitada ({last_error})"
         )
-    
-    try:
-        compile(clean_code, '<string>', 'exec')
-    except SyntaxError as e:
-        raise ValueError(f"Erro de sintaxe: {e}\n\nCódigo:\n{clean_code}")
-    
-    return clean_code
\ No newline at end of file
+        messages = [system_msg, human_msg, HumanMessage(content=(
+            f"⚠️ A resposta anterior foi rejeitada: {last_error}.\n"
+            f"Retorne APENAS código Python puro, SEM markdown, com 'def {function_name}(...):'."
+        ))]
+
+    return None, last_error
+
+def refactor_code(
+    test_code: str,
+    function_name: str,
+    current_code: str,
+    specification: str = "",
+    model: Optional[str] = None
+) -> str:
+    """
+    Fase REFACTOR: reescreve uma implementação já GREEN para ficar mais limpa e
+    eficiente, sem mudar o comportamento verificado pelos testes.
+
+    Retorna o código atual se nenhuma resposta válida for gerada.
+    """
+    llm = create_chat_model("developer", model or select_model("developer"), temperature=0.2)
+
+    system_msg = SystemMessage(content=(
+        f"Você é o DESENVOLVEDOR (Developer) na fase REFACTOR de um fluxo de Test-Driven Development (TDD).\n\n"
+        f"A função {function_name} já passa em TODOS os testes. Ela foi construída passo a passo com\n"
+        f"código mínimo e pode ter acumulado casos especiais, repetições e algoritmos ineficientes.\n\n"
+        f"📜 REGRAS FUNDAMENTAIS:\n"
+        f"1. NÃO mude o comportamento: todos os testes devem continuar passando.\n"
+        f"2. Remova casos especiais redundantes e generalize a lógica.\n"
+        f"3. Prefira o algoritmo de menor complexidade adequado ao problema.\n"
+        f"4. Mantenha o nome e a assinatura: def {function_name}(...).\n"
+        f"5. Não use bibliotecas externas.\n\n"
+        f"📦 FORMATO DE RESPOSTA OBRIGATÓRIO:\n"
+        f"⚠️ Retorne APENAS o código Python puro, SEM blocos markdown, SEM explicações."
+    ))
+
+    spec_part = f"ESPECIFICAÇÃO:\n{specification}\n\n" if specification else ""
+    human_msg = HumanMessage(content=(
+        f"NOME DA FUNÇÃO (use EXATAMENTE este): {function_name}\n\n"
+        f"{spec_part}"
+        f"TESTES QUE DEVEM CONTINUAR PASSANDO:\n```python\n{test_code}\n```\n\n"
+        f"IMPLEMENTAÇÃO ATUAL (GREEN):\n```python\n{current_code.strip()}\n```\n\n"
+        f"TAREFA:\n"
+        f"Refatore a função {function_name} para ficar mais simples e mais rápida, com o mesmo comportamento.\n\n"
+        f"Código da função {function_name}:"
+    ))
+
+    max_chars = max(Config.DEVELOPER_MAX_CHARS, 3 * len(current_code))
+    code, last_error = _generate_validated(llm, system_msg, human_msg, function_name, max_chars)
+    if code is None:
+        logging.warning(f"⚠️ Refactor: nenhuma versão válida gerada ({last_error}). Mantendo código atual.")
+        return current_code
+    return code
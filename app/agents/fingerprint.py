@@ -0,0 +1,77 @@
+import hashlib
+import re
+from typing import Dict, List, Optional
+
+# "test_app.py::test_soma PASSED    [ 50%]" (saída -v)
+_VERBOSE_RESULT = re.compile(r'^(\S+::\S+)\s+(PASSED|FAILED|ERROR|SKIPPED|XFAIL|XPASS)\b', re.MULTILINE)
+# "FAILED test_app.py::test_soma - assert 3 == 4" (short test summary)
+_SUMMARY_LINE = re.compile(r'^(FAILED|ERROR) (\S+::\S+|\S+)(?: - (.*))?$', re.MULTILINE)
+# "E   SyntaxError: invalid syntax" (detalhe do traceback --tb=short)
+_ERROR_DETAIL = re.compile(r'^E\s+(.*\S)', re.MULTILINE)
+
+
+def parse_test_results(output: str) -> Dict[str, str]:
+    """Resultado de cada teste (nodeid -> PASSED/FAILED/ERROR/...) a partir da saída -v do pytest."""
+    results: Dict[str, str] = {}
+    for nodeid, outcome in _VERBOSE_RESULT.findall(output):
+        results[nodeid] = outcome
+    # O resumo final cobre testes cujas linhas -v foram cortadas da saída limitada
+    for outcome, nodeid, _ in _SUMMARY_LINE.findall(output):
+        results.setdefault(nodeid, outcome)
+    return results
+
+
+def failing_tests(output: str) -> List[str]:
+    """Nodeids dos testes que falharam ou deram erro, ordenados."""
+    return sorted(nodeid for nodeid, outcome in parse_test_results(output).items() if outcome in ("FAILED", "ERROR"))
+
+
+def failure_messages(output: str) -> Dict[str, str]:
+    """Mensagem do resumo final para cada teste que falhou (nodeid -> mensagem)."""
+    return {nodeid: message for _, nodeid, message in _SUMMARY_LINE.findall(output)}
+
+
+def _normalize_message(message: str) -> str:
+    """Remove da mensagem de falha o que muda entre execuções sem mudar a falha."""
+    message = re.sub(r'0x[0-9a-fA-F]+', '0x?', message)          # endereços de objetos
+    message = re.sub(r'(/[^\s:\'"]+/)+', '', message)             # caminhos absolutos
+    message = re.sub(r'(\.py)[:(]\d+\)?', r'\1:?', message)       # "app_code.py:12" / "app_code.py(12)"
+    message = re.sub(r'\b(line|linha) \d+', r'\1 ?', message)     # "line 12"
+    message = re.sub(r'\b\d+(?:\.\d+)?s\b', '?s', message)        # durações ("in 0.12s")
+    message = re.sub(r'\s+', ' ', message)
+    return message.strip().rstrip('.').strip()
+
+
+def failure_fingerprint(output: str) -> str:
+    """
+    Impressão digital de uma execução com falhas: conjunto de testes falhando
+    e diffs de asserção normalizados. Duas execuções com o mesmo fingerprint
+    falharam "do mesmo jeito".
+    """
+    # Erros de coleta ("ERROR test_app.py") não trazem mensagem no resumo: usa as linhas "E   ..."
+    details = " | ".join(_ERROR_DETAIL.findall(output))
+    entries = sorted(
+        f"{outcome} {nodeid} {_normalize_message(message or details)}"
+        for outcome, nodeid, message in _SUMMARY_LINE.findall(output)
+    )
+    if not entries:
+        entries = failing_tests(output)
+    if not entries:
+        # Sem testes identificáveis (ex.: erro de coleta): usa o final da saída
+        entries = [_normalize_message(output[-2000:])]
+    return hashlib.sha1("\n".join(entries).encode("utf-8")).hexdigest()[:12]
+
+
+def detect_stuck_loop(history: List[str], fingerprint: str) -> Optional[str]:
+    """
+    Compara o fingerprint atual com o histórico do sub-requisito.
+
+    Returns:
+        "repeat" se repete a falha anterior, "oscillation" se volta a uma
+        falha já vista (ex.: A → B → A), ou None se a falha é nova.
+    """
+    if history and history[-1] == fingerprint:
+        return "repeat"
+    if fingerprint in history:
+        return "oscillation"
+    return None
@@ -0,0 +1,103 @@
+import collections
+import os
+from typing import Deque, List, Optional
+from app.config import Config
+
+
+class BoundedOutput:
+    """
+    Buffer de saída com memória limitada.
+
+    Mantém os primeiros `head_chars` caracteres e os últimos `tail_chars` (ring buffer);
+    o meio é descartado e substituído por um marcador de truncamento. Opcionalmente,
+    a saída completa é gravada em `spill_path` à medida que chega.
+    """
+
+    encoding = "utf-8"
+
+    def __init__(
+        self,
+        head_chars: Optional[int] = None,
+        tail_chars: Optional[int] = None,
+        spill_path: Optional[str] = None
+    ):
+        self.head_chars = Config.RUNNER_OUTPUT_HEAD_CHARS if head_chars is None else head_chars
+        self.tail_chars = Config.RUNNER_OUTPUT_TAIL_CHARS if tail_chars is None else tail_chars
+        self._head: List[str] = []
+        self._head_size = 0
+        self._tail: Deque[str] = collections.deque()
+        self._tail_size = 0
+        self.dropped = 0
+        self.total = 0
+        self.spill_path = spill_path
+        self._spill = None
+        if spill_path:
+            os.makedirs(os.path.dirname(spill_path) or ".", exist_ok=True)
+            self._spill = open(spill_path, "w", encoding="utf-8", errors="replace")
+
+    def write(self, text: str) -> int:
+        if not text:
+            return 0
+        size = len(text)
+        self.total += size
+        self._write_spill(text)
+
+        if self._head_size < self.head_chars:
+            room = self.head_chars - self._head_size
+            self._head.append(text[:room])
+            self._head_size += min(room, len(text))
+            text = text[room:]
+            if not text:
+                return size
+
+        self._tail.append(text)
+        self._tail_size += len(text)
+        while self._tail_size > self.tail_chars and self._tail:
+            excess = self._tail_size - self.tail_chars
+            first = self._tail[0]
+            if len(first) <= excess:
+                self._tail.popleft()
+                self._tail_size -= len(first)
+                self.dropped += len(first)
+            else:
+                self._tail[0] = first[excess:]
+                self._tail_size -= excess
+                self.dropped += excess
+        return size
+
+    def _write_spill(self, text: str) -> None:
+        if self._spill is None:
+            return
+        try:
+            self._spill.write(text)
+        except OSError:
+            # Ex.: limite de tamanho de arquivo do sandbox; a saída limitada continua disponível
+            self._spill.close()
+            self._spill = None
+
+    def flush(self) -> None:
+        if self._spill is not None:
+            self._spill.flush()
+
+    def isatty(self) -> bool:
+        return False
+
+    @property
+    def truncated(self) -> bool:
+        return self.dropped > 0
+
+    def getvalue(self) -> str:
+        head = "".join(self._head)
+        tail = "".join(self._tail)
+        if not self.truncated:
+            return head + tail
+        marker = f"\n\n... [✂️ {self.dropped} caracteres omitidos"
+        if self.spill_path:
+            marker += f"; saída completa em {self.spill_path}"
+        marker += "] ...\n\n"
+        return head + marker + tail
+
+    def close(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
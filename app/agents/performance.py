@@ -0,0 +1,368 @@
+import ast
+import json
+import math
+import os
+import re
+import tempfile
+from typing import Dict, List, Optional, Tuple
+from app.config import Config
+from app.agents.runner import run_pytest
+
+# Benchmark executado como arquivo de teste (sandbox/subprocesso do runner). Mede
+# o tempo por chamada em entradas geometricamente maiores e grava os pontos a
+# cada tamanho, para que um timeout ainda deixe as medições anteriores. Uma
+# exceção da função é gravada em "error" (o timeout do plugin não é Exception).
+_HARNESS = '''import json
+import random
+import time
+from {module} import {function}
+
+KIND = {kind!r}
+OUT = {out!r}
+START, FACTOR, MAX_STEPS = {start!r}, {factor!r}, {max_steps!r}
+MAX_CALL, TOTAL, MIN_BATCH = {max_call!r}, {total!r}, {min_batch!r}
+MAX_SEQUENCE = {max_sequence!r}
+
+
+def _probable_prime(n):
+    if n < 2:
+        return False
+    for p in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37):
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+    for a in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37):
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _inputs(size):
+    # Variações por tamanho; vale a mais lenta (aproxima o pior caso)
+    rng = random.Random(size)
+    if KIND == "int":
+        prime = size
+        while prime > 2 and not _probable_prime(prime):
+            prime -= 1
+        return [size, size - 1, prime]
+    if KIND == "str":
+        return ["a" * size, "".join(rng.choice("abcdefghij") for _ in range(size))]
+    values = [rng.randint(-size, size) for _ in range(size)]
+    return [values, sorted(values), sorted(values, reverse=True)]
+
+
+def _copy(value):
+    return list(value) if isinstance(value, list) else value
+
+
+def _time_call(value):
+    # Calibra com uma chamada e repete em lote até MIN_BATCH segundos (melhor de 3 lotes)
+    started = time.perf_counter()
+    {function}(_copy(value))
+    single = time.perf_counter() - started
+    if single >= MIN_BATCH:
+        return single
+    repeats = max(1, min(10000, int(MIN_BATCH / max(single, 1e-7))))
+    if isinstance(value, list):
+        # Cópias do lote limitadas a ~MAX_SEQUENCE elementos no total
+        repeats = min(repeats, max(1, MAX_SEQUENCE // max(len(value), 1)))
+    best = single
+    for _ in range(3):
+        batch = [_copy(value) for _ in range(repeats)]
+        started = time.perf_counter()
+        for item in batch:
+            {function}(item)
+        best = min(best, (time.perf_counter() - started) / repeats)
+    return best
+
+
+def _save(points, next_size, done, error=""):
+    with open(OUT, "w") as f:
+        json.dump({{"points": points, "next_size": next_size, "done": done, "error": error}}, f)
+
+
+def test_benchmark():
+    points, size, elapsed = [], START, 0.0
+    for _ in range(MAX_STEPS):
+        started = time.perf_counter()
+        try:
+            seconds = max(_time_call(value) for value in _inputs(size))
+        except Exception as e:
+            _save(points, size, False, f"{{type(e).__name__}}: {{e}}"[:300])
+            return
+        elapsed += time.perf_counter() - started
+        points.append([size, seconds])
+        _save(points, size * FACTOR, False)
+        if seconds >= MAX_CALL or elapsed >= TOTAL or (KIND != "int" and size * FACTOR > MAX_SEQUENCE):
+            break
+        size *= FACTOR
+    _save(points, size * FACTOR, True)
+'''
+
+_SUPERSCRIPTS = {"²": "2", "³": "3"}
+
+
+def parse_complexity_target(text: str) -> Optional[Tuple[str, float]]:
+    """
+    Extrai da especificação (ou de um alvo configurado, ex.: "O(n log n)") a
+    complexidade exigida.
+
+    Returns:
+        (rótulo, expoente de n) ou None se não houver alvo reconhecível.
+        Fatores logarítmicos não mudam o expoente (cobertos pela tolerância).
+    """
+    if not text:
+        return None
+
+    for inner in re.findall(r"O\(\s*([^()]*(?:\([^()]*\))?[^()]*)\)", text):
+        expression = inner.lower().replace(" ", "").replace("*", "")
+        for superscript, digit in _SUPERSCRIPTS.items():
+            expression = expression.replace(superscript, f"^{digit}")
+        expression = expression.replace("log(n)", "logn")
+        if expression in ("1", "logn"):
+            return f"O({inner.strip()})", 0.0
+        if expression in ("√n", "sqrt(n)", "sqrtn", "n^0.5", "n^(1/2)"):
+            return f"O({inner.strip()})", 0.5
+        if expression in ("n", "nlogn"):
+            return f"O({inner.strip()})", 1.0
+        power = re.fullmatch(r"n\^?(\d+(?:\.\d+)?)(?:logn)?", expression)
+        if power:
+            return f"O({inner.strip()})", float(power.group(1))
+
+    lowered = text.lower()
+    if "raiz quadrada" in lowered or "square root" in lowered:
+        return "O(√n)", 0.5
+    if "tempo linear" in lowered or "complexidade linear" in lowered:
+        return "O(n)", 1.0
+    return None
+
+
+def infer_input_kind(tests_code: str, function_name: str) -> Optional[str]:
+    """
+    Tipo da entrada da função ("int", "str" ou "list"), a partir das chamadas
+    com um único argumento literal nos testes. None se não for possível inferir.
+    """
+    try:
+        tree = ast.parse(tests_code)
+    except SyntaxError:
+        return None
+
+    kinds: Dict[str, int] = {}
+    for node in ast.walk(tree):
+        if not (
+            isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+            and node.func.id == function_name and len(node.args) == 1 and not node.keywords
+        ):
+            continue
+        try:
+            value = ast.literal_eval(node.args[0])
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            continue
+        if isinstance(value, bool):
+            continue
+        kind = {int: "int", str: "str", list: "list"}.get(type(value))
+        if kind:
+            kinds[kind] = kinds.get(kind, 0) + 1
+    return max(kinds, key=kinds.get) if kinds else None
+
+
+def measure_growth(
+    implementation_code: str,
+    function_name: str,
+    input_kind: str,
+    per_test_timeout: Optional[float] = None
+) -> Tuple[List[Tuple[int, float]], bool, str, str]:
+    """
+    Mede o tempo por chamada da função em entradas geometricamente maiores,
+    no mesmo isolamento (sandbox ou subprocesso) usado pelos testes.
+
+    Returns:
+        (pontos [(tamanho, segundos)], True se o benchmark terminou,
+         exceção lançada pela função ("" se nenhuma), saída do pytest).
+        Sem término e sem exceção, o benchmark foi interrompido por tempo.
+    """
+    fd, out_path = tempfile.mkstemp(prefix="tdd_perf_", suffix=".json")
+    os.close(fd)
+    harness = _HARNESS.format(
+        module=Config.IMPLEMENTATION_MODULE,
+        function=function_name,
+        kind=input_kind,
+        out=out_path,
+        start=Config.PERF_START_SIZE,
+        factor=Config.PERF_GROWTH_FACTOR,
+        max_steps=Config.PERF_MAX_STEPS,
+        max_call=Config.PERF_MAX_CALL_SECONDS,
+        total=Config.PERF_BENCHMARK_SECONDS,
+        min_batch=Config.PERF_MIN_BATCH_SECONDS,
+        max_sequence=Config.PERF_MAX_SEQUENCE_SIZE
+    )
+    try:
+        output = run_pytest(
+            per_test_timeout=per_test_timeout or Config.PERF_CHECK_TIMEOUT,
+            files={
+                Config.TEST_FILE: harness,
+                f"{Config.IMPLEMENTATION_MODULE}.py": implementation_code
+            }
+        )
+        try:
+            with open(out_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        points = [(int(size), float(seconds)) for size, seconds in data.get("points", [])]
+        return points, bool(data.get("done")), data.get("error", ""), output
+    finally:
+        os.remove(out_path)
+
+
+def fit_exponent(points: List[Tuple[int, float]]) -> Optional[float]:
+    """
+    Expoente k de t ≈ c·n^k por regressão linear em escala log-log, usando os
+    maiores tamanhos medidos (onde o comportamento assintótico domina).
+    """
+    usable = [(size, seconds) for size, seconds in points if size > 0 and seconds > 0]
+    usable = usable[-Config.PERF_FIT_POINTS:]
+    if len(usable) < 3:
+        return None
+    xs = [math.log(size) for size, _ in usable]
+    ys = [math.log(seconds) for _, seconds in usable]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if variance == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}µs"
+
+
+def check_complexity(
+    implementation_code: str,
+    function_name: str,
+    tests_code: str,
+    target: str,
+    per_test_timeout: Optional[float] = None
+) -> Tuple[Optional[bool], str]:
+    """
+    Verifica empiricamente se a implementação cresce dentro do alvo de complexidade.
+
+    Returns:
+        (True se atende, False se é mais lenta que o alvo, None se inconclusivo;
+         relatório para o Developer / logs)
+    """
+    parsed = parse_complexity_target(target)
+    if parsed is None:
+        return None, f"Alvo de complexidade não reconhecido: {target!r}"
+    label, target_exponent = parsed
+
+    input_kind = Config.PERF_INPUT_KIND or infer_input_kind(tests_code, function_name)
+    if input_kind not in ("int", "str", "list"):
+        return None, "Não foi possível inferir o tipo da entrada da função a partir dos testes"
+
+    points, done, error, output = measure_growth(implementation_code, function_name, input_kind, per_test_timeout)
+    if not points:
+        return None, f"Benchmark não produziu medições:\n{error or output[-1000:]}"
+
+    table = "\n".join(f"  n = {size:>22,} → {_format_seconds(seconds)} por chamada" for size, seconds in points)
+    if error:
+        # Exceção (ex.: RecursionError, entrada fora do domínio aceito): não indica lentidão
+        next_size = points[-1][0] * Config.PERF_GROWTH_FACTOR
+        return None, (
+            f"Benchmark interrompido por exceção em n = {next_size:,} ({error}); "
+            f"crescimento inconclusivo:\n{table}"
+        )
+    if not done:
+        # Timeout no meio do benchmark: a chamada seguinte excedeu o limite de tempo do teste
+        report = (
+            f"⚠️ DESEMPENHO: a função excedeu o tempo limite do benchmark (alvo {label}).\n\n"
+            f"Medições (entrada do tipo {input_kind}, pior variação por tamanho):\n{table}\n\n"
+            f"A execução não terminou com a entrada seguinte. Reescreva o algoritmo para "
+            f"cumprir {label}, mantendo todos os testes passando."
+        )
+        return False, report
+
+    exponent = fit_exponent(points)
+    if exponent is None:
+        return None, f"Medições insuficientes para estimar o crescimento:\n{table}"
+
+    if exponent <= target_exponent + Config.PERF_EXPONENT_TOLERANCE:
+        return True, f"Crescimento medido ≈ n^{exponent:.2f} (alvo {label}):\n{table}"
+
+    # Quanto mais lento que o alvo no maior tamanho, tomando o primeiro ponto ajustado como referência
+    fitted = points[-Config.PERF_FIT_POINTS:]
+    (base_size, base_seconds), (last_size, last_seconds) = fitted[0], fitted[-1]
+    expected = base_seconds * (last_size / base_size) ** target_exponent
+    slowdown = last_seconds / expected if expected > 0 else float("inf")
+    report = (
+        f"⚠️ DESEMPENHO ABAIXO DO EXIGIDO:\n\n"
+        f"A especificação exige {label}, mas o tempo medido cresce ≈ n^{exponent:.2f}.\n"
+        f"Medições (entrada do tipo {input_kind}, pior variação por tamanho):\n{table}\n\n"
+        f"Com n = {last_size:,}, a função está ~{slowdown:.1f}x mais lenta do que {label} permitiria.\n\n"
+        f"AÇÃO REQUERIDA:\n"
+        f"- Reescreva o algoritmo para cumprir {label}\n"
+        f"- Mantenha todos os testes passando (comportamento idêntico)"
+    )
+    return False, report
+
+
+def compare_performance(
+    baseline_code: str,
+    candidate_code: str,
+    function_name: str,
+    tests_code: str
+) -> Tuple[Optional[bool], str]:
+    """
+    Micro-benchmark de duas versões da função nos mesmos tamanhos de entrada.
+
+    Returns:
+        (True se a candidata não é mais lenta que a base, False se regrediu,
+         None se inconclusivo; resumo da comparação)
+    """
+    input_kind = Config.PERF_INPUT_KIND or infer_input_kind(tests_code, function_name)
+    if input_kind not in ("int", "str", "list"):
+        return None, "Não foi possível inferir o tipo da entrada da função a partir dos testes"
+
+    baseline, baseline_done, baseline_error, _ = measure_growth(baseline_code, function_name, input_kind)
+    candidate, candidate_done, candidate_error, _ = measure_growth(candidate_code, function_name, input_kind)
+    if not baseline or not candidate:
+        return None, "Benchmark não produziu medições"
+    # Sem uma medição completa da base não há referência para "mais lenta"
+    if not baseline_done:
+        reason = f"exceção: {baseline_error}" if baseline_error else "tempo limite"
+        return None, f"A versão atual não completou o benchmark ({reason})"
+    if candidate_error:
+        return None, f"A nova versão lançou uma exceção no benchmark: {candidate_error}"
+
+    # Só os tamanhos medidos pelas duas versões entram na comparação
+    candidate_times = dict(candidate)
+    common = [(size, seconds) for size, seconds in baseline if size in candidate_times][-Config.REFACTOR_BENCHMARK_POINTS:]
+    # A candidata parou antes (limite por chamada ou timeout) em um tamanho que a base mediu: é mais lenta
+    last_size = baseline[-1][0]
+    if candidate[-1][0] < last_size and (not candidate_done or candidate[-1][1] >= Config.PERF_MAX_CALL_SECONDS):
+        return False, f"A nova versão não completou o benchmark até n = {last_size:,}"
+    if not common:
+        return None, "Sem tamanhos de entrada em comum entre as medições"
+
+    # Média geométrica da razão de tempos nos maiores tamanhos em comum
+    log_ratio = sum(math.log(candidate_times[size] / seconds) for size, seconds in common) / len(common)
+    ratio = math.exp(log_ratio)
+    summary = "\n".join(
+        f"  n = {size:>22,}: {_format_seconds(seconds)} → {_format_seconds(candidate_times[size])}"
+        for size, seconds in common
+    )
+    report = f"Tempo relativo da nova versão: {ratio:.3g}x\n{summary}"
+    return ratio <= 1 + Config.REFACTOR_MAX_SLOWDOWN, report
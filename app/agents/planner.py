@@ -1,15 +1,39 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from app.config import Config
+from app.llm import invoke_llm, stream_completion, select_model, create_chat_model
+import contextvars
 import json
 import logging
+import threading
 
-def generate_plan(specification: str) -> List[str]:
+def _parse_dependencies(tdd_plan: List[Dict[str, Any]]) -> List[List[int]]:
+    """
+    Converte 'depends_on' (números 1-based das etapas) em índices 0-based.
+
+    Apenas dependências para etapas anteriores são aceitas; uma etapa sem
+    'depends_on' válido depende da anterior (execução sequencial).
+    """
+    dependencies = []
+    for index, step in enumerate(tdd_plan):
+        raw = step.get("depends_on")
+        if not isinstance(raw, list):
+            dependencies.append([index - 1] if index > 0 else [])
+            continue
+        deps = sorted({int(d) - 1 for d in raw if isinstance(d, (int, float)) and 0 <= int(d) - 1 < index})
+        dependencies.append(deps)
+    return dependencies
+
+def generate_plan(specification: str, model: Optional[str] = None) -> List[str]:
     """Gera um plano de TDD (lista de sub-requisitos) a partir da especificação."""
-    llm = ChatOpenAI(model=Config.MODEL, temperature=0.1)
-    
-    messages = [
+    steps, _ = generate_plan_graph(specification, model=model)
+    return steps
+
+_FALLBACK_PLAN = ["Falha ao gerar o plano, escreva um teste que valide a falha de implementação."]
+
+def _plan_messages(specification: str) -> list:
+    """Prompt do Planner no formato compacto (uma etapa JSON por linha, sem 'actions')."""
+    return [
         SystemMessage(content=(
             "Você é o Planejador (Planner), um especialista em Test Driven Development (TDD). "
             "Sua função é receber um requisito de alto nível e dividi-lo em um plano de TDD passo a passo. "
@@ -20,13 +44,16 @@ def generate_plan(specification: str) -> List[str]:
             "\n4. Se os testes passarem, o Reviewer analisa o código. "
             "\n5. Repita para o próximo sub-requisito."
             "\n\nREGRAS DE FORMATAÇÃO:"
-            "\n1. Retorne **apenas** um JSON válido. Não inclua nenhuma explicação ou texto fora do JSON."
-            "\n2. O JSON deve conter a chave 'tdd_plan' com uma lista de etapas (objetos JSON)."
-            "\n3. Cada etapa deve conter:"
+            "\n1. Retorne **apenas** linhas JSON, UMA etapa por linha, na ordem de execução. "
+            "Sem markdown, sem lista envolvente, sem texto fora do JSON."
+            "\n2. Cada linha é um objeto com:"
+            "\n   - 'id': número da etapa, começando em 1."
             "\n   - 'sub_requirement': descrição curta e específica do objetivo do teste (ex: 'Testar soma de números positivos')."
-            "\n   - 'actions': lista com as instruções para Tester, Developer, Executor e Reviewer, seguindo o ciclo TDD."
+            "\n   - 'depends_on': lista com os ids das etapas ANTERIORES das quais esta depende."
+            "\n     Use [] para etapas independentes (ex: tratamento de minúsculas vs. limite de repetições)."
             "\n\nFormato esperado:"
-            "\n{\n  'tdd_plan': [\n    {\n      'sub_requirement': '...',\n      'actions': [\n        'Tester: ...',\n        'Developer: ...',\n        'Executor: ...',\n        'Reviewer: ...'\n      ]\n    }\n  ]\n}"
+            '\n{"id": 1, "sub_requirement": "...", "depends_on": []}'
+            '\n{"id": 2, "sub_requirement": "...", "depends_on": [1]}'
         )),
         HumanMessage(content=(
             f"📝 Requisito Principal:\n{specification}\n\n"
@@ -34,28 +61,142 @@ def generate_plan(specification: str) -> List[str]:
         ))
     ]
 
-    response = llm.invoke(messages)
+def _parse_plan_line(line: str) -> Optional[Dict[str, Any]]:
+    """Interpreta uma linha do formato compacto (None se não for uma etapa)."""
+    line = line.strip().rstrip(",")
+    if not line.startswith("{"):
+        return None
+    try:
+        step = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return step if isinstance(step, dict) and step.get("sub_requirement") else None
+
+def _parse_plan(content: str) -> List[Dict[str, Any]]:
+    """Etapas do formato compacto; aceita também o formato legado {'tdd_plan': [...]}."""
+    steps = [step for step in map(_parse_plan_line, content.splitlines()) if step]
+    if steps:
+        return steps
+
+    # Tenta corrigir a resposta se o LLM incluiu markdown
+    content = content.strip()
+    if content.startswith('```json'):
+        content = content.strip('```json').strip()
+    elif content.startswith('```'):
+        content = content.strip('```').strip()
+    data = json.loads(content)
+    return [step for step in data.get('tdd_plan', []) if 'sub_requirement' in step]
+
+def generate_plan_graph(specification: str, model: Optional[str] = None) -> Tuple[List[str], List[List[int]]]:
+    """
+    Gera o plano de TDD como um DAG: sub-requisitos e, para cada um, os índices
+    (0-based) das etapas das quais depende.
+    """
+    llm = create_chat_model("planner", model or select_model("planner"), temperature=0.1)
+
+    response = invoke_llm(llm, _plan_messages(specification))
     content = response.content.strip()
     
     try:
-        # Tenta corrigir a resposta se o LLM incluiu markdown
-        if content.startswith('```json'):
-            content = content.strip('```json').strip()
-        elif content.startswith('```'):
-            content = content.strip('```').strip()
-            
-        data = json.loads(content)
-        
-        # FIX: Usar a chave correta 'tdd_plan' conforme especificado no prompt
-        tdd_plan = data.get('tdd_plan', [])
+        tdd_plan = _parse_plan(content)
+        if not tdd_plan:
+            raise ValueError("nenhuma etapa encontrada")
         
-        # Extrair apenas os 'sub_requirement' de cada etapa
-        sub_requirements = [step['sub_requirement'] for step in tdd_plan if 'sub_requirement' in step]
+        # Extrair apenas os 'sub_requirement' (e dependências) de cada etapa
+        sub_requirements = [step['sub_requirement'] for step in tdd_plan]
         
-        return sub_requirements
+        return sub_requirements, _parse_dependencies(tdd_plan)
         
-    except (json.JSONDecodeError, KeyError, TypeError) as e:
+    except (json.JSONDecodeError, KeyError, TypeError, AttributeError, ValueError) as e:
         logging.error(f"❌ Erro ao decodificar JSON do Planner: {e}")
         logging.error(f"Conteúdo do LLM: {content}")
         # Retorna um plano de falha se houver erro
-        return ["Falha ao gerar o plano, escreva um teste que valide a falha de implementação."]
\ No newline at end of file
+        return list(_FALLBACK_PLAN), [[]]
+
+
+class StreamingPlan:
+    """
+    Plano gerado em streaming: cada etapa fica disponível assim que sua linha
+    JSON se completa, enquanto o restante do plano continua sendo gerado em
+    segundo plano.
+
+    Com `received` (etapas e dependências 0-based de um stream anterior), o plano
+    é gerado de novo e apenas as etapas seguintes às já recebidas são acrescentadas.
+    """
+
+    def __init__(
+        self,
+        specification: str,
+        model: Optional[str] = None,
+        received: Optional[Tuple[List[str], List[List[int]]]] = None
+    ):
+        self.specification = specification
+        self.model = model
+        plan, dependencies = received or ([], [])
+        self._raw_steps: List[Dict[str, Any]] = [
+            {
+                "id": index + 1,
+                "sub_requirement": step,
+                "depends_on": [d + 1 for d in dependencies[index]] if index < len(dependencies) else None
+            }
+            for index, step in enumerate(plan)
+        ]
+        self._cond = threading.Condition()
+        self.done = False
+        self.error: Optional[Exception] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StreamingPlan":
+        """Inicia a geração em segundo plano (herdando o contexto da tarefa)."""
+        self._thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._generate,),
+            name="planner-stream",
+            daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def _add(self, step: Optional[Dict[str, Any]]) -> None:
+        if step is None:
+            return
+        with self._cond:
+            # Após um retry o stream recomeça: etapas já recebidas (pelo id) são ignoradas
+            step_id = step.get("id")
+            if isinstance(step_id, int) and step_id <= len(self._raw_steps):
+                return
+            self._raw_steps.append(step)
+            logging.info(f"🧠 Etapa {len(self._raw_steps)} recebida: {step['sub_requirement']}")
+            self._cond.notify_all()
+
+    def _check_line(self, line: str) -> Optional[str]:
+        self._add(_parse_plan_line(line))
+        return None
+
+    def _generate(self) -> None:
+        llm = create_chat_model("planner", self.model or select_model("planner"), temperature=0.1)
+        try:
+            content = stream_completion(llm, _plan_messages(self.specification), line_check=self._check_line)
+            # A última linha pode não terminar com quebra de linha
+            for step in _parse_plan(content)[len(self._raw_steps):]:
+                self._add(step)
+        except Exception as e:
+            logging.error(f"❌ Planner (streaming) falhou: {e}")
+            self.error = e
+        finally:
+            with self._cond:
+                self.done = True
+                self._cond.notify_all()
+
+    def wait_for(self, count: int) -> bool:
+        """Bloqueia até existirem `count` etapas ou o plano terminar. Retorna se há `count` etapas."""
+        with self._cond:
+            while len(self._raw_steps) < count and not self.done:
+                self._cond.wait()
+            return len(self._raw_steps) >= count
+
+    def snapshot(self) -> Tuple[List[str], List[List[int]]]:
+        """Etapas recebidas até agora e suas dependências (índices 0-based)."""
+        with self._cond:
+            steps = list(self._raw_steps)
+        return [step['sub_requirement'] for step in steps], _parse_dependencies(steps)
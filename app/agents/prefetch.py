@@ -0,0 +1,138 @@
+import ast
+import contextvars
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.config import Config
+from app.agents.tester import generate_test_for_sub_req
+
+
+def _top_level(code: str) -> Optional[Tuple[List[ast.stmt], Dict[str, ast.stmt]]]:
+    """Imports e definições de nível de módulo (None se o código não compila)."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    definitions = {
+        node.name: node for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+    }
+    return imports, definitions
+
+
+def merge_prefetched_tests(base_tests: str, drafted_tests: str, current_tests: str) -> Optional[str]:
+    """
+    Reconcilia um arquivo de testes gerado antecipadamente sobre `base_tests`
+    com o arquivo atual.
+
+    Se o arquivo não mudou, o rascunho é usado como está. Caso contrário, as
+    definições novas do rascunho (ausentes da base) são anexadas ao arquivo
+    atual, junto com imports que faltarem. Retorna None em caso de conflito
+    (definição nova com nome já usado no arquivo atual, ou código inválido).
+    """
+    if current_tests == base_tests:
+        return drafted_tests
+
+    base, drafted, current = _top_level(base_tests), _top_level(drafted_tests), _top_level(current_tests)
+    if base is None or drafted is None or current is None:
+        return None
+
+    new_definitions = [node for name, node in drafted[1].items() if name not in base[1]]
+    if not new_definitions or any(node.name in current[1] for node in new_definitions):
+        return None
+
+    current_imports = {ast.unparse(node) for node in current[0]}
+    missing_imports = [ast.unparse(node) for node in drafted[0] if ast.unparse(node) not in current_imports]
+
+    drafted_lines = drafted_tests.splitlines()
+    new_blocks = [
+        "\n".join(drafted_lines[min([node.lineno] + [d.lineno for d in node.decorator_list]) - 1:node.end_lineno])
+        for node in new_definitions
+    ]
+    merged = current_tests.rstrip("\n")
+    if missing_imports:
+        merged = "\n".join(missing_imports) + "\n" + merged
+    return merged + "\n\n\n" + "\n\n\n".join(new_blocks) + "\n"
+
+
+class TestPrefetcher:
+    """
+    Gera, em segundo plano, os testes dos próximos sub-requisitos do plano
+    enquanto Developer e Runner trabalham no passo atual.
+
+    Cada rascunho é gerado sobre o arquivo de testes do momento em que foi
+    agendado; ao chegar a vez do passo, `take` o reconcilia com o arquivo atual.
+    """
+
+    def __init__(self, depth: Optional[int] = None, workers: Optional[int] = None):
+        self.depth = Config.TEST_PREFETCH_DEPTH if depth is None else depth
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or Config.TEST_PREFETCH_WORKERS,
+            thread_name_prefix="test-prefetch"
+        )
+        self._drafts: Dict[int, Tuple[str, Future]] = {}
+
+    def schedule(
+        self,
+        plan: List[str],
+        start_index: int,
+        function_name: str,
+        base_tests: str,
+        skip: Iterable[int] = ()
+    ) -> None:
+        """
+        Agenda rascunhos para os passos start_index..start_index+depth-1 ainda não agendados.
+
+        Passos em `skip` (ex.: o próximo lote independente, que roda em ramos
+        com testes próprios) não são pré-gerados.
+        """
+        skip = set(skip)
+        for index in range(start_index, min(start_index + self.depth, len(plan))):
+            if index in self._drafts or index in skip:
+                continue
+            logging.info(f"📥 Prefetch: gerando testes do sub-requisito [{index + 1}] em segundo plano")
+            # Herda o contexto da tarefa (orçamento e escalonador)
+            future = self._executor.submit(
+                contextvars.copy_context().run,
+                generate_test_for_sub_req,
+                sub_requirement=plan[index],
+                function_name=function_name,
+                all_tests_code=base_tests
+            )
+            self._drafts[index] = (base_tests, future)
+
+    def take(self, index: int, current_tests: str) -> Optional[str]:
+        """
+        Retorna o arquivo de testes do passo `index` reconciliado com o atual,
+        esperando o rascunho terminar se necessário. None se não houver rascunho
+        utilizável (o passo deve gerar os testes normalmente).
+        """
+        draft = self._drafts.pop(index, None)
+        if draft is None:
+            return None
+
+        base_tests, future = draft
+        try:
+            drafted_tests = future.result()
+        except Exception as e:
+            logging.warning(f"⚠️ Prefetch do sub-requisito [{index + 1}] falhou: {e}")
+            return None
+
+        merged = merge_prefetched_tests(base_tests, drafted_tests, current_tests)
+        if merged is None:
+            logging.info(f"♻️ Prefetch do sub-requisito [{index + 1}] conflita com os testes atuais; regenerando")
+        else:
+            logging.info(f"⚡ Usando testes pré-gerados do sub-requisito [{index + 1}]")
+        return merged
+
+    def discard(self) -> None:
+        """Descarta rascunhos pendentes (ex.: os próximos passos vão rodar em ramos)."""
+        for _, future in self._drafts.values():
+            future.cancel()
+        self._drafts.clear()
+
+    def shutdown(self) -> None:
+        """Descarta rascunhos pendentes e encerra os workers."""
+        self.discard()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,191 @@
+import ast
+import contextlib
+import io
+import os
+import symtable
+import sys
+import tempfile
+import threading
+from typing import List, Set
+from app.config import Config
+
+# pytest.main altera estado global do processo (sys.modules, sys.path, stdout)
+_collect_lock = threading.Lock()
+
+# Implementação substituta durante a coleta: qualquer nome importado existe
+_COLLECTION_STUB = """
+def __getattr__(name):
+    def stub(*args, **kwargs):
+        return None
+    return stub
+"""
+
+
+def _syntax_error_message(label: str, code: str) -> str:
+    """Compila o código e retorna uma mensagem de erro de sintaxe (ou string vazia)."""
+    try:
+        compile(code, label, 'exec')
+    except SyntaxError as e:
+        line = (e.text or "").rstrip()
+        return f"❌ Erro de sintaxe em {label}, linha {e.lineno}: {e.msg}\n    {line}"
+    return ""
+
+
+def _defined_names(code: str, label: str) -> Set[str]:
+    """
+    Nomes definidos no nível de módulo da implementação.
+
+    Usa a tabela de símbolos do compilador, que inclui definições dentro de
+    blocos compostos (`if`/`try`/`with`/`for`), ex.: o fallback
+    `try: from math import isqrt` / `except ImportError: def isqrt(...)`.
+    """
+    table = symtable.symtable(code, label, 'exec')
+    return {
+        symbol.get_name() for symbol in table.get_symbols()
+        if symbol.is_assigned() or symbol.is_imported() or symbol.is_namespace()
+    }
+
+
+class _CollectionRecorder:
+    """Plugin pytest que registra os itens coletados e os erros de coleta."""
+
+    def __init__(self):
+        self.items: List[str] = []
+        self.errors: List[str] = []
+
+    def pytest_collectreport(self, report):
+        if report.failed:
+            text = str(report.longrepr)
+            details = [line[1:].strip() for line in text.splitlines() if line.startswith("E ")]
+            summary = " | ".join(details[-3:]) or text.strip().splitlines()[-1]
+            self.errors.append(f"❌ Erro na coleta de {report.nodeid or Config.TEST_FILE}: {summary}")
+
+    def pytest_collection_finish(self, session):
+        self.items = [item.nodeid for item in session.items]
+
+
+def collect_tests(tests_code: str) -> _CollectionRecorder:
+    """
+    Executa `pytest --collect-only` em processo sobre uma cópia do arquivo de testes.
+
+    A implementação é substituída por um módulo em que qualquer nome existe, de
+    modo que a coleta reflete apenas o arquivo de testes (imports, decoradores,
+    parametrizações, classes Test*), e não o estado atual da implementação.
+    """
+    import pytest
+
+    recorder = _CollectionRecorder()
+    modules = {os.path.splitext(Config.TEST_FILE)[0], Config.IMPLEMENTATION_MODULE}
+    with _collect_lock, tempfile.TemporaryDirectory(prefix="tdd_preflight_") as workspace:
+        files = {
+            Config.TEST_FILE: tests_code,
+            f"{Config.IMPLEMENTATION_MODULE}.py": _COLLECTION_STUB,
+            # rootdir isolado: nenhuma configuração de diretórios ancestrais é aplicada
+            "pytest.ini": "[pytest]\n",
+        }
+        for name, content in files.items():
+            with open(os.path.join(workspace, name), "w", encoding="utf-8") as f:
+                f.write(content)
+
+        saved_path = list(sys.path)
+        saved_modules = {name: sys.modules.pop(name) for name in modules if name in sys.modules}
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                pytest.main(
+                    [
+                        os.path.join(workspace, Config.TEST_FILE), "--collect-only", "-q", "-s",
+                        "-p", "no:cacheprovider", "-p", "no:logging", "-p", "no:faulthandler",
+                    ],
+                    plugins=[recorder]
+                )
+        finally:
+            for name in modules:
+                sys.modules.pop(name, None)
+            sys.modules.update(saved_modules)
+            sys.path[:] = saved_path
+    return recorder
+
+
+def check_tests(tests_code: str) -> List[str]:
+    """
+    Checagens do arquivo de testes antes do runner.
+
+    Verifica sintaxe, nomes de teste duplicados (a última definição sobrescreve
+    as anteriores sem erro do pytest) e a coleta real via `pytest --collect-only`
+    em processo: erros de import, decoradores ou parametrizações inválidas e
+    arquivos sem nenhum teste coletável.
+    """
+    error = _syntax_error_message(Config.TEST_FILE, tests_code)
+    if error:
+        return [error]
+
+    problems: List[str] = []
+    tree = ast.parse(tests_code)
+
+    scopes = [(tree.body, "")] + [
+        (node.body, f"{node.name}.") for node in tree.body
+        if isinstance(node, ast.ClassDef) and node.name.startswith("Test")
+    ]
+    for body, prefix in scopes:
+        seen: Set[str] = set()
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test"):
+                if node.name in seen:
+                    problems.append(
+                        f"❌ Teste duplicado '{prefix}{node.name}' (linha {node.lineno}): "
+                        f"a última definição sobrescreve a anterior e o pytest coleta apenas uma."
+                    )
+                seen.add(node.name)
+
+    recorder = collect_tests(tests_code)
+    problems.extend(recorder.errors)
+    if not recorder.errors and not recorder.items:
+        problems.append(f"❌ Nenhum teste coletável pelo pytest em {Config.TEST_FILE}.")
+
+    return problems
+
+
+def check_implementation(tests_code: str, implementation_code: str, function_name: str) -> List[str]:
+    """
+    Checagens estáticas da implementação contra os testes.
+
+    Verifica sintaxe, a presença da função principal e se cada nome importado
+    via 'from app_code import ...' existe na AST da implementação.
+    """
+    module_name = Config.IMPLEMENTATION_MODULE
+    impl_label = f"{module_name}.py"
+
+    error = _syntax_error_message(impl_label, implementation_code)
+    if error:
+        return [error]
+
+    defined = _defined_names(implementation_code, impl_label)
+    problems: List[str] = []
+
+    if function_name and function_name not in defined:
+        problems.append(f"❌ A função '{function_name}' não está definida em {impl_label}.")
+
+    try:
+        tests_tree = ast.parse(tests_code)
+    except SyntaxError:
+        return problems
+
+    for node in tests_tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module == module_name:
+            for alias in node.names:
+                if alias.name != '*' and alias.name not in defined and alias.name != function_name:
+                    problems.append(
+                        f"❌ 'from {module_name} import {alias.name}' (linha {node.lineno}): "
+                        f"'{alias.name}' não existe em {impl_label}."
+                    )
+
+    return problems
+
+
+def format_preflight_report(problems: List[str]) -> str:
+    """Formata os problemas encontrados como feedback determinístico."""
+    return (
+        "🛫 PRE-FLIGHT FALHOU (análise estática, pytest não foi executado):\n\n"
+        + "\n".join(problems)
+        + "\n\nCorrija EXATAMENTE os problemas acima."
+    )
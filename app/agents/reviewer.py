@@ -1,7 +1,8 @@
 import re
-from langchain_openai import ChatOpenAI
+from typing import Optional
 from langchain_core.messages import SystemMessage, HumanMessage
 from app.config import Config
+from app.llm import invoke_llm, select_model, create_chat_model
 
 def extract_relevant_spec_context(
     specification: str,
@@ -13,7 +14,7 @@ def extract_relevant_spec_context(
     Usa LLM para extrair APENAS a parte relevante da especificação.
     Sem heurísticas frágeis - deixa a LLM decidir o que é relevante.
     """
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.1)  # Modelo rápido e barato
+    llm = create_chat_model("spec_context", select_model("spec_context"), temperature=0.1)  # Tier rápido e barato
     
     system_msg = SystemMessage(content=(
         "Você é um assistente que extrai APENAS as informações relevantes de uma especificação.\n\n"
@@ -43,7 +44,7 @@ def extract_relevant_spec_context(
         f"Extraia APENAS as regras da especificação relevantes para corrigir esta falha."
     ))
     
-    response = llm.invoke([system_msg, human_msg])
+    response = invoke_llm(llm, [system_msg, human_msg])
     return response.content.strip()
 
 
@@ -54,12 +55,17 @@ def analyze_failures(
     iteration: int = 0,
     max_retries: int = 3,
     current_code: str = "",
-    test_code: str = ""
+    test_code: str = "",
+    model: Optional[str] = None,
+    feedback_mode: Optional[str] = None
 ) -> str:
     """
     Analisa falhas com feedback GRADUAL usando LLM para filtragem.
+
+    `feedback_mode` força o modo (ex.: "ARCHITECTURAL" quando o orquestrador
+    detecta um loop de falhas idênticas); por padrão é escolhido pela iteração.
     """
-    llm = ChatOpenAI(model=Config.MODEL, temperature=0.3)
+    llm = create_chat_model("reviewer", model or select_model("reviewer", iteration=iteration), temperature=0.3)
 
     # --- Extrai métricas do pytest ---
     passed_match = re.search(r'(\d+)\s+passed', test_output)
@@ -71,12 +77,18 @@ def analyze_failures(
     total = passed_count + failed_count
     
     # --- ESTRATÉGIA DE FEEDBACK GRADUAL ---
-    if iteration == 0:
-        feedback_mode = "MINIMAL"
+    if feedback_mode is None:
+        if iteration == 0:
+            feedback_mode = "MINIMAL"
+        elif iteration == 1:
+            feedback_mode = "CONTEXTUAL"
+        else:  # iteration >= 2
+            feedback_mode = "ARCHITECTURAL"
+
+    if feedback_mode == "MINIMAL":
         spec_context = ""  # Sem contexto de spec
         
-    elif iteration == 1:
-        feedback_mode = "CONTEXTUAL"
+    elif feedback_mode == "CONTEXTUAL":
         # ⚠️ LLM extrai contexto relevante
         spec_context = extract_relevant_spec_context(
             specification=specification,
@@ -85,8 +97,7 @@ def analyze_failures(
             current_code=current_code
         )
         
-    else:  # iteration >= 2
-        feedback_mode = "ARCHITECTURAL"
+    else:  # ARCHITECTURAL
         spec_context = specification  # Spec completa para análise profunda
 
     # --- SYSTEM MESSAGE (instruções de comportamento) ---
@@ -164,5 +175,5 @@ def analyze_failures(
             f"4. Se não houver conflito, identifique o erro de implementação específico"
         ))
 
-    response = llm.invoke([system_msg, human_msg])
+    response = invoke_llm(llm, [system_msg, human_msg])
     return response.content.strip()
\ No newline at end of file
@@ -1,27 +1,194 @@
+import json
+import os
 import subprocess
+import sys
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
 from app.config import Config
+from app.agents.output_capture import BoundedOutput
+from app.runtime.context import charge_task, check_task_budget
+from app.runtime.scheduler import get_scheduler
 
-def run_pytest() -> str:
-    """Executa pytest no arquivo de testes."""
+try:
+    import resource  # noqa: F401  (disponível apenas em sistemas POSIX)
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+# Prefixo das falhas de infraestrutura (pytest nem chegou a executar os testes).
+# Timeouts e limites do sandbox violados não usam o prefixo: são causados pelo código testado.
+RUNNER_ERROR_PREFIX = "❌ Erro do runner"
+
+def is_runner_error(output: str) -> bool:
+    """Indica que a saída descreve uma falha do runner, e não o resultado dos testes."""
+    return output.startswith(RUNNER_ERROR_PREFIX)
+
+def _pytest_args(test_path: str, per_test_timeout: float, extra_args: Optional[List[str]] = None) -> List[str]:
+    return [
+        test_path, "-v", "--tb=short",
+        "-p", "app.agents.timeout_plugin", f"--per-test-timeout={per_test_timeout}"
+    ] + list(extra_args or [])
+
+def _read_workspace_files(workspace: Optional[str] = None) -> dict:
+    """Lê os arquivos de teste e implementação do workspace."""
+    files = {}
+    for name in (Config.TEST_FILE, f"{Config.IMPLEMENTATION_MODULE}.py"):
+        path = os.path.join(workspace or Config.WORKSPACE_PATH, name)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                files[name] = f.read()
+    return files
+
+def _run_in_sandbox(
+    per_test_timeout: float,
+    spill_path: Optional[str],
+    files: Dict[str, str],
+    extra_args: Optional[List[str]] = None
+) -> str:
+    from app.sandbox import get_sandbox_pool
+
+    args = _pytest_args(Config.TEST_FILE, per_test_timeout, extra_args) + ["-p", "no:cacheprovider"]
+    output = get_sandbox_pool().run_pytest(
+        files=files,
+        args=args,
+        timeout=Config.RUNNER_TIMEOUT,
+        spill_path=os.path.abspath(spill_path) if spill_path else None
+    )
+    return output.strip()
+
+def _run_in_subprocess(
+    per_test_timeout: float,
+    spill_path: Optional[str],
+    workspace: Optional[str] = None,
+    extra_args: Optional[List[str]] = None
+) -> str:
     test_file = Config.TEST_FILE
-    
+    workspace = workspace or Config.WORKSPACE_PATH
+    output = BoundedOutput(spill_path=spill_path)
+
     try:
-        result = subprocess.run(
-            ["pytest", f"workspace/{test_file}", "-v", "--tb=short"],
-            capture_output=True,
+        # stderr junto com stdout: lido em streaming para um buffer de tamanho fixo
+        process = subprocess.Popen(
+            [sys.executable, "-m", "pytest"] + _pytest_args(f"{workspace}/{test_file}", per_test_timeout, extra_args),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             text=True,
-            timeout=30
+            errors="replace"
         )
-        
-        # Combina stdout e stderr para análise completa
-        output = result.stdout
-        if result.stderr:
-            output += f"\n\nERROS:\n{result.stderr}"
-        
-        return output.strip()
-    except subprocess.TimeoutExpired:
-        return "❌ Erro: execução de testes expirou (timeout de 30s)."
     except FileNotFoundError:
-        return "❌ Erro: pytest não está instalado. Execute: pip install pytest"
+        output.close()
+        return f"{RUNNER_ERROR_PREFIX}: pytest não está instalado. Execute: pip install pytest"
     except Exception as e:
-        return f"❌ Erro ao executar testes: {str(e)}"
+        output.close()
+        return f"{RUNNER_ERROR_PREFIX}: falha ao executar testes: {str(e)}"
+
+    def pump():
+        for chunk in iter(lambda: process.stdout.read(4096), ""):
+            output.write(chunk)
+
+    reader = threading.Thread(target=pump, daemon=True)
+    reader.start()
+    try:
+        process.wait(timeout=Config.RUNNER_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        reader.join(timeout=1)
+        output.close()
+        return f"❌ Erro: execução de testes expirou (timeout de {Config.RUNNER_TIMEOUT}s)."
+
+    reader.join()
+    output.close()
+    return output.getvalue().strip()
+
+def _run_in_isolated_workspace(
+    per_test_timeout: float,
+    spill_path: Optional[str],
+    files: Dict[str, str],
+    extra_args: Optional[List[str]] = None
+) -> str:
+    """Grava `files` em um diretório temporário e executa o pytest nele (sem tocar o workspace)."""
+    with tempfile.TemporaryDirectory(prefix="tdd_candidate_") as workspace:
+        for name, content in files.items():
+            with open(os.path.join(workspace, name), "w", encoding="utf-8") as f:
+                f.write(content)
+        return _run_in_subprocess(per_test_timeout, spill_path, workspace, extra_args)
+
+def run_pytest(
+    per_test_timeout: Optional[float] = None,
+    spill_path: Optional[str] = None,
+    files: Optional[Dict[str, str]] = None,
+    workspace: Optional[str] = None,
+    extra_args: Optional[List[str]] = None
+) -> str:
+    """
+    Executa pytest no arquivo de testes.
+
+    Com Config.SANDBOX_ENABLED (e o módulo `resource` disponível), os testes rodam
+    no pool de workers com limites de CPU/memória/arquivo; caso contrário, em um
+    subprocesso comum. Em ambos os casos a saída é lida em streaming para um buffer
+    limitado (início + final, com marcador de truncamento).
+
+    Args:
+        per_test_timeout: Limite de tempo por teste em segundos (None usa Config.PER_TEST_TIMEOUT).
+            Um teste travado falha isoladamente com TIMEOUT e os demais continuam.
+        spill_path: Arquivo opcional que recebe a saída completa, sem truncamento.
+        files: Arquivos (nome -> conteúdo) a testar em um workspace isolado, em vez
+            dos arquivos do workspace da tarefa (ex.: candidatos especulativos do Developer).
+        workspace: Diretório da tarefa (None usa Config.WORKSPACE_PATH).
+        extra_args: Argumentos adicionais para o pytest (ex.: plugins).
+    """
+    per_test_timeout = Config.PER_TEST_TIMEOUT if per_test_timeout is None else per_test_timeout
+
+    check_task_budget()
+
+    # Slots do runner distribuídos entre tarefas concorrentes pelo escalonador
+    with get_scheduler().slot("runner"):
+        charge_task("runner_runs")
+        if Config.SANDBOX_ENABLED and HAS_RESOURCE:
+            try:
+                return _run_in_sandbox(per_test_timeout, spill_path, files or _read_workspace_files(workspace), extra_args)
+            except Exception as e:
+                return f"{RUNNER_ERROR_PREFIX}: falha ao executar testes no sandbox: {str(e)}"
+
+        if files is not None:
+            return _run_in_isolated_workspace(per_test_timeout, spill_path, files, extra_args)
+        return _run_in_subprocess(per_test_timeout, spill_path, workspace, extra_args)
+
+def run_pytest_with_coverage(
+    per_test_timeout: Optional[float] = None,
+    spill_path: Optional[str] = None,
+    files: Optional[Dict[str, str]] = None,
+    workspace: Optional[str] = None
+) -> Tuple[str, Dict[str, Dict[str, list]]]:
+    """
+    Executa pytest registrando a cobertura de linhas/arcos da implementação por
+    teste (plugin app.agents.coverage_plugin).
+
+    Returns:
+        (saída do pytest, {nodeid: {"lines": [...], "arcs": [[de, para], ...]}}).
+        A cobertura fica vazia se a sessão do pytest não chegou ao fim.
+    """
+    fd, coverage_path = tempfile.mkstemp(prefix="tdd_coverage_", suffix=".json")
+    os.close(fd)
+    try:
+        output = run_pytest(
+            per_test_timeout=per_test_timeout,
+            spill_path=spill_path,
+            files=files,
+            workspace=workspace,
+            extra_args=[
+                "-p", "app.agents.coverage_plugin",
+                f"--line-coverage-out={coverage_path}",
+                f"--line-coverage-module={Config.IMPLEMENTATION_MODULE}.py"
+            ]
+        )
+        try:
+            with open(coverage_path, "r", encoding="utf-8") as f:
+                coverage = json.load(f)
+        except (OSError, ValueError):
+            coverage = {}
+        return output, coverage
+    finally:
+        os.remove(coverage_path)
@@ -0,0 +1,96 @@
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+from app.config import Config
+from app.agents.developer import GenerationFailed, generate_code_incremental
+from app.agents.fingerprint import parse_test_results
+from app.agents.preflight import check_implementation
+from app.agents.runner import run_pytest
+from app.llm import GenerationAborted
+
+
+def _all_passed(output: str) -> bool:
+    lowered = output.lower()
+    return "passed" in lowered and "failed" not in lowered and "error" not in lowered
+
+
+def generate_speculative_code(
+    test_code: str,
+    function_name: str,
+    feedback: str = "",
+    previous_code: str = "",
+    model: Optional[str] = None,
+    temperatures: Optional[List[float]] = None,
+    per_test_timeout: Optional[float] = None
+) -> Tuple[str, Optional[str]]:
+    """
+    Gera K implementações candidatas em paralelo (uma por temperatura) e testa
+    cada uma em um workspace isolado assim que fica pronta.
+
+    O primeiro candidato GREEN vence e os demais são cancelados (gerações em
+    andamento são abortadas no próximo trecho recebido, sem esperar por elas).
+    Sem nenhum GREEN, retorna o candidato com mais testes passando.
+
+    Returns:
+        (código, saída do pytest do candidato GREEN ou None se nenhum passou)
+    """
+    temperatures = temperatures or Config.DEVELOPER_CANDIDATE_TEMPERATURES
+    cancel = threading.Event()
+    module_file = f"{Config.IMPLEMENTATION_MODULE}.py"
+
+    def candidate(temperature: float) -> Tuple[str, Optional[str]]:
+        code = generate_code_incremental(
+            test_code=test_code,
+            function_name=function_name,
+            feedback=feedback,
+            previous_code=previous_code,
+            model=model,
+            temperature=temperature,
+            cancel=cancel
+        )
+        if cancel.is_set() or check_implementation(test_code, code, function_name):
+            return code, None
+        output = run_pytest(
+            per_test_timeout=per_test_timeout,
+            files={Config.TEST_FILE: test_code, module_file: code}
+        )
+        return code, output
+
+    best_code, best_passed = None, -1
+    pool = ThreadPoolExecutor(max_workers=len(temperatures), thread_name_prefix="candidate")
+    try:
+        # Cada candidato herda o contexto da tarefa (orçamento e escalonador)
+        futures = {
+            pool.submit(contextvars.copy_context().run, candidate, temperature): temperature
+            for temperature in temperatures
+        }
+        for future in as_completed(futures):
+            temperature = futures[future]
+            try:
+                code, output = future.result()
+            except GenerationAborted:
+                continue
+            except Exception as e:
+                logging.warning(f"⚠️ Candidato (temperatura {temperature}) falhou: {e}")
+                continue
+
+            if output is not None and _all_passed(output):
+                logging.info(f"🏁 Candidato GREEN (temperatura {temperature}); cancelando os demais")
+                cancel.set()
+                return code, output
+
+            passed = -1 if output is None else sum(
+                1 for outcome in parse_test_results(output).values() if outcome == "PASSED"
+            )
+            logging.info(f"🧪 Candidato (temperatura {temperature}): {max(passed, 0)} teste(s) passando")
+            if passed > best_passed:
+                best_code, best_passed = code, passed
+    finally:
+        # Não espera os perdedores: eles param sozinhos ao ver o cancelamento
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if best_code is None:
+        raise GenerationFailed("Developer: nenhum candidato especulativo gerou código válido")
+    return best_code, None
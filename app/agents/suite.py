@@ -0,0 +1,207 @@
+import ast
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+def _test_functions(tree: ast.Module) -> List[ast.FunctionDef]:
+    return [
+        node for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test_")
+    ]
+
+
+def assertion_signatures(func: ast.FunctionDef) -> Optional[Set[str]]:
+    """
+    Assinaturas normalizadas das verificações de um teste (AST sem comentários,
+    nomes de variáveis ou posições).
+
+    `assert chamada == esperado` vira o par (chamada, esperado), independente do
+    lado em que cada um aparece; blocos `with pytest.raises(...)` entram inteiros.
+    Retorna None para testes que não devem ser comparados (parametrizados,
+    com fixtures ou sem verificações).
+    """
+    if func.decorator_list or func.args.args:
+        return None
+
+    signatures = set()
+    for node in ast.walk(func):
+        if isinstance(node, ast.Assert):
+            test = node.test
+            if isinstance(test, ast.Compare) and len(test.ops) == 1 and isinstance(test.ops[0], ast.Eq):
+                pair = sorted([ast.dump(test.left), ast.dump(test.comparators[0])])
+                signatures.add("eq:" + "|".join(pair))
+            else:
+                signatures.add("assert:" + ast.dump(test))
+        elif isinstance(node, (ast.With, ast.AsyncWith)):
+            signatures.add("with:" + ast.dump(ast.Module(body=[node], type_ignores=[])))
+    return signatures or None
+
+
+def _remove_functions(code: str, functions: Iterable[ast.FunctionDef]) -> str:
+    """Remove as funções (com seus decoradores) pelo intervalo de linhas no código-fonte."""
+    lines = code.splitlines()
+    drop = set()
+    for func in functions:
+        start = min([func.lineno] + [d.lineno for d in func.decorator_list])
+        drop.update(range(start - 1, func.end_lineno))
+    kept = [line for index, line in enumerate(lines) if index not in drop]
+    # Evita sequências longas de linhas em branco no lugar das funções removidas
+    return re.sub(r"\n{4,}", "\n\n\n", "\n".join(kept)).strip("\n") + "\n"
+
+
+def remove_duplicate_tests(previous_tests: str, new_tests: str) -> Tuple[str, List[str]]:
+    """
+    Descarta, do arquivo gerado pelo Tester, os testes novos cujas verificações
+    já existem na suíte (ou em outro teste novo anterior no arquivo).
+
+    Só testes ausentes de `previous_tests` são candidatos: testes existentes
+    nunca são removidos aqui.
+
+    Returns:
+        (código sem os duplicados, nomes dos testes removidos)
+    """
+    try:
+        new_tree = ast.parse(new_tests)
+        previous_tree = ast.parse(previous_tests) if previous_tests.strip() else ast.Module(body=[], type_ignores=[])
+    except SyntaxError:
+        return new_tests, []
+
+    previous_names = {func.name for func in _test_functions(previous_tree)}
+    known: Set[str] = set()
+    for func in _test_functions(previous_tree):
+        known.update(assertion_signatures(func) or ())
+
+    duplicates = []
+    for func in _test_functions(new_tree):
+        signatures = assertion_signatures(func)
+        if func.name in previous_names or signatures is None:
+            known.update(signatures or ())
+            continue
+        if signatures <= known:
+            duplicates.append(func)
+        else:
+            known.update(signatures)
+
+    if not duplicates:
+        return new_tests, []
+    return _remove_functions(new_tests, duplicates), [func.name for func in duplicates]
+
+
+def _is_spec_example(func: ast.FunctionDef, specification: str) -> bool:
+    """Teste com alguma verificação cujos literais aparecem todos na especificação."""
+    for node in ast.walk(func):
+        if not isinstance(node, ast.Assert):
+            continue
+        literals = [
+            str(const.value) for const in ast.walk(node.test)
+            if isinstance(const, ast.Constant) and not isinstance(const.value, bool)
+            and isinstance(const.value, (str, int, float)) and str(const.value) != ""
+        ]
+        if literals and all(
+            re.search(rf"(?<!\w){re.escape(literal)}(?!\w)", specification) for literal in literals
+        ):
+            return True
+    return False
+
+
+def _coverage_items(entry: Dict[str, list]) -> Set[Tuple]:
+    return {("line", line) for line in entry.get("lines", [])} | {
+        ("arc", arc[0], arc[1]) for arc in entry.get("arcs", [])
+    }
+
+
+def minimize_suite(
+    tests_code: str,
+    coverage: Dict[str, Dict[str, list]],
+    specification: str = "",
+    passed: Optional[Set[str]] = None
+) -> Tuple[str, List[str]]:
+    """
+    Reduz a suíte preservando a cobertura de linhas e arcos da implementação
+    e os exemplos da especificação.
+
+    Mantém os testes que reproduzem exemplos da especificação e os que não têm
+    cobertura registrada (ou não passaram), e então escolhe de forma gulosa os
+    testes que mais acrescentam linhas/arcos até cobrir a união original.
+
+    Args:
+        tests_code: Arquivo de testes completo.
+        coverage: Cobertura por nodeid (saída de run_pytest_with_coverage).
+        specification: Texto da especificação (fonte dos exemplos a preservar).
+        passed: Nodeids que passaram (None considera todos os cobertos).
+
+    Returns:
+        (código minimizado, nomes dos testes removidos)
+    """
+    try:
+        tree = ast.parse(tests_code)
+    except SyntaxError:
+        return tests_code, []
+
+    # Cobertura por função (variações parametrizadas somadas)
+    per_function: Dict[str, Set[Tuple]] = {}
+    failed_functions = set()
+    for nodeid, entry in coverage.items():
+        name = nodeid.split("::")[-1].split("[")[0]
+        per_function.setdefault(name, set()).update(_coverage_items(entry))
+        if passed is not None and nodeid not in passed:
+            failed_functions.add(name)
+
+    functions = _test_functions(tree)
+    keep = set()
+    candidates = []
+    for func in functions:
+        if (
+            func.name not in per_function
+            or func.name in failed_functions
+            or _is_spec_example(func, specification)
+        ):
+            keep.add(func.name)
+        else:
+            candidates.append(func.name)
+
+    target = set().union(*per_function.values()) if per_function else set()
+    covered = set().union(*(per_function[name] for name in keep if name in per_function))
+    while candidates and not target <= covered:
+        best = max(candidates, key=lambda name: len(per_function[name] - covered))
+        if not per_function[best] - covered:
+            break
+        keep.add(best)
+        covered |= per_function[best]
+        candidates.remove(best)
+
+    removed = [func for func in functions if func.name not in keep]
+    if not removed:
+        return tests_code, []
+    return _remove_functions(tests_code, removed), [func.name for func in removed]
+
+
+def covered_by_existing(
+    coverage: Dict[str, Dict[str, list]],
+    new_tests: Iterable[str],
+    passed: Optional[Set[str]] = None
+) -> bool:
+    """
+    Indica se os testes novos (nodeids) passam exercitando só linhas e arcos da
+    implementação que os demais testes já cobrem.
+
+    Sem testes novos não há nada que mostre o sub-requisito atendido (retorna
+    False). Um teste novo que não passou (fora de `passed`, quando informado) ou
+    que não executa nenhuma linha da implementação também não conta como coberto.
+    """
+    new_tests = set(new_tests)
+    if not new_tests:
+        return False
+
+    existing: Set[Tuple] = set()
+    for nodeid, entry in coverage.items():
+        if nodeid not in new_tests:
+            existing |= _coverage_items(entry)
+
+    for nodeid in new_tests:
+        if passed is not None and nodeid not in passed:
+            return False
+        items = _coverage_items(coverage.get(nodeid, {}))
+        if not items or not items <= existing:
+            return False
+    return True
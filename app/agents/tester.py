@@ -1,22 +1,90 @@
 import re
 import ast
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 from app.config import Config
+from app.llm import GenerationAborted, stream_completion, select_model, create_chat_model
+from app.agents.developer import GenerationFailed
+import logging
+from typing import Optional
 
 def extract_code(text: str) -> str:
     """Extrai código Python de blocos markdown ou retorna o texto como está."""
     match = re.search(r'```(?:python)?\s*(.*?)\s*```', text, re.DOTALL)
     return match.group(1).strip() if match else text.strip()
 
+def _import_names(text: str) -> list:
+    """Nomes de um trecho 'a, b as c, (d' de import (sem parênteses, comentários e aliases)."""
+    text = text.split("#", 1)[0].replace("(", " ").replace(")", " ").replace("\\", " ")
+    return [name.split()[0] for name in text.split(",") if name.split()]
+
+def _tester_line_check(module_name: str, function_name: str):
+    """
+    Checagens baratas aplicadas a cada linha enquanto o Tester gera os testes.
+
+    Imports entre parênteses podem ocupar várias linhas: os nomes são acumulados
+    até o ')' antes de verificar se a função alvo está entre eles.
+    """
+    pending = None  # Import multilinha em andamento: (linha inicial, nomes até agora)
+
+    def check(line: str):
+        nonlocal pending
+        stripped = line.strip()
+        if pending is not None:
+            first_line, names = pending
+            names.extend(_import_names(stripped))
+            if ")" not in stripped.split("#", 1)[0]:
+                return None
+            pending = None
+            if function_name not in names:
+                return f"import incorreto: '{first_line}'"
+            return None
+
+        match = re.match(rf'from\s+{re.escape(module_name)}\s+import\s+(.+)', stripped)
+        if match:
+            clause = match.group(1).split("#", 1)[0]
+            if clause.lstrip().startswith("(") and ")" not in clause:
+                pending = (stripped, _import_names(clause))
+                return None
+            if function_name not in _import_names(clause):
+                return f"import incorreto: '{stripped}'"
+        return None
+
+    return check
+
+def _imports_function(code: str, module_name: str, function_name: str) -> bool:
+    """Se o código importa `function_name` de `module_name` (qualquer formatação do import)."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        # Código inválido é reportado pelo pre-flight; aqui basta procurar o import no texto
+        pattern = rf'from\s+{re.escape(module_name)}\s+import\s+\(?([^)]*)'
+        return any(function_name in _import_names(m.group(1)) for m in re.finditer(pattern, code))
+    return any(
+        isinstance(node, ast.ImportFrom) and node.module == module_name
+        and any(alias.name == function_name for alias in node.names)
+        for node in ast.walk(tree)
+    )
+
+def validate_test_code(code: str, module_name: str, function_name: str) -> str:
+    """Valida o código de teste gerado. Retorna a descrição do problema ou string vazia se válido."""
+    if not code.strip():
+        return "LLM retornou código vazio"
+
+    # ⚠️ VALIDAÇÃO: Verifica se a função correta está sendo usada
+    if not _imports_function(code, module_name, function_name):
+        return f"código de teste não importa a função {function_name} corretamente"
+
+    return ""
+
 def generate_test_for_sub_req(
     sub_requirement: str,
     function_name: str,
     all_tests_code: str = "",
-    feedback: str = ""
+    feedback: str = "",
+    model: Optional[str] = None
 ) -> str:
     """Gera um novo teste pytest para o sub-requisito ou REVISA testes existentes."""
-    llm = ChatOpenAI(model=Config.MODEL, temperature=0.2)
+    llm = create_chat_model("tester", model or select_model("tester"), temperature=0.2)
     module_name = Config.IMPLEMENTATION_MODULE
 
     # ⚠️ DETECTA SE É MODO DE REVISÃO DE TESTES
@@ -171,21 +239,42 @@ def generate_test_for_sub_req(
             f"⚠️ CRÍTICO: Consistência e correção são essenciais!"
         ))
 
-    # ==================== INVOCA LLM ====================
-    response = llm.invoke([system_msg, human_msg])
-    clean_code = extract_code(response.content.strip())
+    # ==================== INVOCA LLM (STREAMING) ====================
+    messages = [system_msg, human_msg]
+    max_chars = max(Config.TESTER_MAX_CHARS, 2 * len(all_tests_code) + 4000)
+    last_error = ""
 
-    if not clean_code:
-        raise ValueError("LLM retornou código vazio")
+    for attempt in range(1, Config.GENERATION_MAX_ATTEMPTS + 1):
+        try:
+            raw = stream_completion(
+                llm,
+                messages,
+                line_check=_tester_line_check(module_name, function_name),
+                max_chars=max_chars
+            )
+        except GenerationAborted as e:
+            last_error = f"geração abortada: {e.reason}"
+        else:
+            clean_code = extract_code(raw.strip())
 
-    if "import pytest" not in clean_code:
-        clean_code = "import pytest\n" + clean_code
+            if clean_code and "import pytest" not in clean_code:
+                clean_code = "import pytest\n" + clean_code
 
-    # ⚠️ VALIDAÇÃO: Verifica se a função correta está sendo usada
-    if f"from {module_name} import {function_name}" not in clean_code:
-        raise ValueError(
-            f"Código de teste não importa a função {function_name} corretamente.\n"
-            f"Código gerado:\n{clean_code}"
+            last_error = validate_test_code(clean_code, module_name, function_name)
+            if not last_error:
+                return clean_code
+
+        logging.warning(
+            f"⚠️ Tester: tentativa {attempt}/{Config.GENERATION_MAX_ATTEMPTS} rejeitada ({last_error})"
         )
+        messages = [system_msg, human_msg, HumanMessage(content=(
+            f"⚠️ A resposta anterior foi rejeitada: {last_error}.\n"
+            f"Use EXATAMENTE: from {module_name} import {function_name}"
+        ))]
+
+    # Orçamento local esgotado: mantém os testes existentes em vez de abortar o workflow
+    if all_tests_code and not validate_test_code(all_tests_code, module_name, function_name):
+        logging.error(f"❌ Tester esgotou as tentativas ({last_error}). Mantendo testes existentes.")
+        return all_tests_code
 
-    return clean_code
\ No newline at end of file
+    raise GenerationFailed(f"Tester falhou após {Config.GENERATION_MAX_ATTEMPTS} tentativas: {last_error}")
@@ -0,0 +1,56 @@
+"""
+Plugin pytest com limite de tempo por teste.
+
+Carregado pelo runner via `-p app.agents.timeout_plugin`. Cada teste recebe um
+alarme (SIGALRM); ao estourar, apenas o teste travado falha com uma mensagem
+TIMEOUT e a execução continua nos testes seguintes.
+"""
+import signal
+from typing import List
+import pytest
+
+TIMEOUT_MARKER = "⏱️ TIMEOUT"
+
+_hung_tests: List[str] = []
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--per-test-timeout",
+        action="store",
+        type=float,
+        default=0.0,
+        help="Limite de tempo (segundos) para cada teste. 0 desativa."
+    )
+
+
+def pytest_sessionstart(session):
+    # O plugin pode ser reutilizado por várias sessões no mesmo processo (workers do sandbox)
+    _hung_tests.clear()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    timeout = item.config.getoption("--per-test-timeout")
+    if not timeout or not hasattr(signal, "SIGALRM"):
+        yield
+        return
+
+    def on_timeout(signum, frame):
+        _hung_tests.append(item.nodeid)
+        pytest.fail(f"{TIMEOUT_MARKER}: {item.nodeid} excedeu {timeout:g}s (possível loop infinito)")
+
+    previous = signal.signal(signal.SIGALRM, on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _hung_tests:
+        terminalreporter.section("testes travados")
+        for nodeid in _hung_tests:
+            terminalreporter.write_line(f"{TIMEOUT_MARKER}: {nodeid}")
@@ -12,6 +12,164 @@ class Config:
 
     IMPLEMENTATION_MODULE = "app_code"  # Nome do arquivo de implementação (app_code.py)
     TEST_FILE = "test_app.py"          # Nome do arquivo de teste
-    # Chave para armazenar o estado do plano no Redis
+    # Chave da fila distribuída de jobs TDD no Redis (app/jobs)
     PLAN_KEY = "tdd_plan_queue"
 
+    # Geração em streaming com aborto antecipado
+    GENERATION_MAX_ATTEMPTS = 3        # Tentativas locais por chamada do Developer/Tester
+    DEVELOPER_MAX_CHARS = 8000         # Limite mínimo de tamanho da resposta do Developer
+    DEVELOPER_NAME_CHECK_LINES = 60    # Linhas sem 'def <função>' antes de abortar a geração do Developer
+    TESTER_MAX_CHARS = 20000           # Limite mínimo de tamanho da resposta do Tester
+
+    # Pre-flight estático antes do pytest
+    PREFLIGHT_MAX_TEST_ATTEMPTS = 3    # Falhas consecutivas do arquivo de testes antes de encerrar
+
+    # Runner
+    RUNNER_TIMEOUT = 30                # Timeout total da execução do pytest (segundos)
+    PER_TEST_TIMEOUT = 5.0             # Timeout padrão por teste (segundos); configurável por tarefa
+
+    # Sandbox de execução do código gerado
+    SANDBOX_ENABLED = True             # Executa os testes no pool de workers com limites de recursos
+    SANDBOX_WORKERS = 2                # Workers por processo orquestrador
+    SANDBOX_MAX_RUNS = 20              # Execuções por worker antes da reciclagem
+    SANDBOX_CPU_SECONDS = 20           # Limite de CPU por execução (segundos)
+    SANDBOX_MEMORY_MB = 1024           # Limite de espaço de endereçamento (MB)
+    SANDBOX_FILE_SIZE_MB = 16          # Tamanho máximo de arquivo escrito pelo código gerado (MB)
+
+    # Captura limitada da saída do pytest
+    RUNNER_OUTPUT_HEAD_CHARS = 4000    # Caracteres mantidos do início da saída
+    RUNNER_OUTPUT_TAIL_CHARS = 12000   # Caracteres mantidos do final da saída (ring buffer)
+    RUNNER_SPILL_OUTPUT = False        # Grava a saída completa em arquivo por tarefa
+    RUNNER_LOG_DIR = "runner_logs"     # Diretório dos arquivos de saída completa
+
+    # Fila distribuída de jobs (Redis)
+    WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "2"))  # Processos worker por host
+    JOB_LEASE_SECONDS = 60             # Duração do lease; renovado por heartbeat a cada 1/3
+    JOB_MAX_ATTEMPTS = 3               # Tentativas antes de marcar o job como 'failed'
+    JOB_POLL_INTERVAL = 2.0            # Espera entre consultas com a fila vazia (segundos)
+    JOB_LOCKED_RETRY_DELAY = 10        # Atraso para devolver à fila um job cuja tarefa está travada (segundos)
+
+    # Lock de tarefa (fencing tokens)
+    TASK_LOCK_TTL = 30                 # TTL do lock de posse da tarefa (segundos), renovado a cada 1/3
+
+    # Limite de taxa e retry das chamadas de modelo
+    LLM_RATE_LIMIT_BACKEND = os.getenv("LLM_RATE_LIMIT_BACKEND", "memory")  # "memory" (processo) ou "redis" (entre hosts)
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+    LLM_EXPECTED_COMPLETION_TOKENS = 1000  # Reserva de completion por chamada (corrigida após a resposta)
+    LLM_MAX_RETRIES = 6                # Novas tentativas em erros transitórios (429, timeouts, 5xx)
+    LLM_BACKOFF_BASE = 1.0             # Base do backoff exponencial (segundos)
+    LLM_BACKOFF_MAX = 60.0             # Teto do backoff (segundos)
+
+    # Escalonador fair-share entre tarefas concorrentes do processo
+    SCHEDULER_LLM_SLOTS = 8            # Chamadas de modelo simultâneas
+    SCHEDULER_RUNNER_SLOTS = SANDBOX_WORKERS  # Execuções do runner simultâneas
+    SCHEDULER_FAIRNESS_QUANTUM = 5.0   # Granularidade do fair share (segundos de slot consumidos)
+
+    # Orçamento padrão por tarefa (0 = ilimitado); sobrescrito via TDDOrchestrator(budget=...)
+    TASK_BUDGET = {
+        "wall_seconds": 0,             # Tempo de parede acumulado (inclui execuções anteriores)
+        "tokens": 0,                   # Tokens de prompt + completion
+        "llm_calls": 0,                # Chamadas de modelo
+        "runner_runs": 0,              # Execuções do pytest
+    }
+
+    # Roteamento de modelos por agente (escalonamento por iteração/falhas)
+    MODEL_TIERS = [MODEL, "gpt-4o"]    # Do mais rápido ao mais forte
+    AGENT_MODEL_TIERS = {              # Tier base de cada agente (índice em MODEL_TIERS)
+        "planner": 0,
+        "tester": 0,
+        "developer": 0,
+        "reviewer": 0,
+        "spec_context": 0,             # Extração de contexto da spec (reviewer CONTEXTUAL)
+    }
+    MODEL_ESCALATION_ITERATIONS = [4]  # Iterações a partir das quais sobe um tier
+    MODEL_ESCALATION_FAILURES = 2      # Falhas repetidas (RED/pre-flight) por tier adicional
+
+    # Backends de LLM (tipos: "openai", "openai_compatible", "fake")
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")  # Backend padrão de todos os agentes
+    LLM_BACKENDS = {
+        "openai": {"type": "openai"},
+        "local": {                     # Servidor compatível com a API da OpenAI no mesmo host
+            "type": "openai_compatible",
+            "base_url": os.getenv("LOCAL_LLM_BASE_URL", "http://localhost:8000/v1"),
+            "api_key": os.getenv("LOCAL_LLM_API_KEY"),
+            "model": os.getenv("LOCAL_LLM_MODEL"),  # Se definido, substitui o modelo roteado
+        },
+        "fake": {"type": "fake", "responses": []},  # Respostas fixas em processo
+    }
+    # Backend por agente (vazio = LLM_BACKEND), ex.: LLM_BACKEND_SPEC_CONTEXT=local
+    AGENT_LLM_BACKENDS = {
+        agent: os.getenv(f"LLM_BACKEND_{agent.upper()}", "")
+        for agent in ("planner", "tester", "developer", "reviewer", "spec_context")
+    }
+
+    # Detecção de loops travados no GREEN (fingerprints de falha)
+    FAILURE_FINGERPRINT_HISTORY = 6    # Fingerprints mantidos por sub-requisito
+    STUCK_LOOP_TEST_REVIEW = 2         # Loops detectados antes de mandar os testes para revisão
+
+    # Candidatos especulativos do Developer
+    DEVELOPER_CANDIDATES = 1           # Implementações geradas em paralelo por iteração (1 = desligado)
+    DEVELOPER_CANDIDATE_TEMPERATURES = [0.3, 0.7, 1.0]  # Temperatura de cada candidato (em ciclo)
+
+    # Geração antecipada de testes dos próximos passos do plano
+    TEST_PREFETCH_DEPTH = 2            # Passos à frente gerados em segundo plano (0 = desligado)
+    TEST_PREFETCH_WORKERS = 2          # Gerações simultâneas
+
+    # Execução paralela de ramos independentes do plano (DAG)
+    PLAN_PARALLEL_BRANCHES = 3         # Sub-requisitos independentes executados ao mesmo tempo (1 = sequencial)
+
+    # Planner em streaming (formato compacto: uma etapa JSON por linha)
+    PLANNER_STREAMING = True           # Inicia o primeiro ciclo TDD antes de o plano terminar
+
+    # Eliminação de testes duplicados e minimização da suíte
+    TEST_DEDUP_ENABLED = True          # Descarta testes novos com verificações já existentes na suíte
+    SUITE_MINIMIZE_AT_END = False      # Ao fim do plano, remove testes redundantes pela cobertura de linhas/arcos
+
+    # Detecção de sub-requisitos já atendidos (cobertura no RED)
+    RED_COVERAGE_SKIP = True           # Teste novo verde exercitando só código já coberto pula Developer/GREEN
+
+    # Verificação empírica de complexidade após o GREEN
+    PERF_CHECK_ENABLED = True          # Mede o crescimento do tempo quando há alvo (especificação ou tarefa)
+    PERF_CHECK_MAX_ATTEMPTS = 2        # Correções de desempenho por sub-requisito antes de seguir mesmo assim
+    PERF_CHECK_TIMEOUT = 15.0          # Limite de tempo do benchmark (segundos)
+    PERF_BENCHMARK_SECONDS = 5.0       # Tempo total de medição antes de parar de crescer a entrada
+    PERF_INPUT_KIND = ""               # Tipo da entrada: int, str ou list ("" = inferir dos testes)
+    PERF_START_SIZE = 16               # Primeiro tamanho de entrada
+    PERF_GROWTH_FACTOR = 4             # Multiplicador do tamanho a cada passo
+    PERF_MAX_STEPS = 30                # Tamanhos medidos no máximo
+    PERF_MAX_SEQUENCE_SIZE = 2_000_000 # Tamanho máximo de strings/listas geradas
+    PERF_MAX_CALL_SECONDS = 0.05       # Para de crescer quando uma chamada leva mais que isso
+    PERF_MIN_BATCH_SECONDS = 0.002     # Duração mínima de cada lote de chamadas medido
+    PERF_FIT_POINTS = 5                # Maiores tamanhos usados no ajuste log-log
+    PERF_EXPONENT_TOLERANCE = 0.35     # Folga sobre o expoente alvo (fatores log e ruído)
+
+    # Fase REFACTOR com verificação de regressão de desempenho
+    REFACTOR_ENABLED = False           # Pede ao Developer uma versão otimizada da implementação GREEN
+    REFACTOR_EVERY_STEPS = 0           # Também a cada N sub-requisitos concluídos (0 = só ao fim do plano)
+    REFACTOR_BENCHMARK_POINTS = 3      # Maiores tamanhos de entrada comparados no micro-benchmark
+    REFACTOR_MAX_SLOWDOWN = 0.10       # Lentidão relativa tolerada (ruído de medição) antes de reverter
+
+    # Armazenamento endereçado por conteúdo dos artefatos do estado (código, testes, especificação)
+    ARTIFACT_STORE = os.getenv("ARTIFACT_STORE", "auto")  # auto, redis, file, memory ou none
+    ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", ".artifacts")  # Diretório do store "file"
+    ARTIFACT_FIELDS = ["specification", "tests_code", "implementation_code", "last_green_code"]
+    ARTIFACT_MIN_BYTES = 256           # Campos menores ficam no próprio registro de estado
+    ARTIFACT_COMPRESSION_LEVEL = 6     # Nível zlib dos blobs
+    ARTIFACT_CACHE_SIZE = 256          # Blobs mantidos em memória por processo (imutáveis)
+    ARTIFACT_GC_GRACE_SECONDS = 3600   # Blobs sem referência tocados há menos que isso não são coletados
+    ARTIFACT_GC_INTERVAL = 3600        # Intervalo da coleta de lixo nos workers (0 = desligada)
+
+    # Persistência local em log estruturado (estratégia "file", implantações de um só nó)
+    LOG_PERSISTENCE_PATH = os.getenv("LOG_PERSISTENCE_PATH", "data/state.log")  # Arquivo de log (+ .lock)
+    LOG_SYNC_WRITES = True             # Escritas só retornam após o fsync do lote (group commit)
+    LOG_SYNC_INTERVAL = 0.005          # Janela de agrupamento de escritas por fsync (segundos)
+    LOG_COMPACT_CHECK_INTERVAL = 30.0  # Intervalo entre verificações de compactação (0 = desligada)
+    LOG_COMPACT_MIN_BYTES = 1_048_576  # Tamanho mínimo do log para compactar
+    LOG_COMPACT_GARBAGE_RATIO = 0.5    # Fração de registros obsoletos que dispara a compactação
+
+    # Cache local de estado na frente do Redis (estratégia "tiered")
+    PERSISTENCE_STRATEGY = os.getenv("PERSISTENCE_STRATEGY", "redis")  # redis, tiered, file ou memory (workers)
+    CACHE_MAX_KEYS = 1024              # Chaves mantidas no LRU de cada processo
+    CACHE_INVALIDATION_CHANNEL = "persistence:invalidate"  # Canal pub/sub de invalidação entre processos
+    CACHE_RECONNECT_DELAY = 2.0        # Espera antes de reassinar o canal após queda (cache desligado até lá)
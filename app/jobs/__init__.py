@@ -0,0 +1,8 @@
+from app.jobs.redis_queue import RedisJobQueue
+from app.jobs.worker import JobWorker, worker_process_main
+
+__all__ = [
+    "RedisJobQueue",
+    "JobWorker",
+    "worker_process_main",
+]
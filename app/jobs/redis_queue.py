@@ -0,0 +1,248 @@
+import redis
+import uuid
+from typing import Dict, Any, Optional, List
+from app.config import Config
+
+
+# Retira o próximo job da fila e registra o lease atomicamente
+_CLAIM_SCRIPT = """
+local job_id = redis.call('RPOP', KEYS[1])
+if not job_id then
+    return nil
+end
+local now = redis.call('TIME')
+local expires = tonumber(now[1]) + tonumber(ARGV[2])
+local job_key = ARGV[3] .. job_id
+redis.call('ZADD', KEYS[2], expires, job_id)
+redis.call('HSET', job_key, 'status', 'running', 'worker', ARGV[1], 'lease_expires', expires)
+redis.call('HINCRBY', job_key, 'attempts', 1)
+return job_id
+"""
+
+# Renova o lease apenas se o job ainda pertence a este worker
+_HEARTBEAT_SCRIPT = """
+local job_key = ARGV[3] .. ARGV[1]
+if redis.call('HGET', job_key, 'worker') ~= ARGV[2] then
+    return 0
+end
+local now = redis.call('TIME')
+local expires = tonumber(now[1]) + tonumber(ARGV[4])
+redis.call('ZADD', KEYS[1], 'XX', expires, ARGV[1])
+redis.call('HSET', job_key, 'lease_expires', expires)
+return 1
+"""
+
+# Finaliza o job apenas se ele ainda pertence a este worker
+_COMPLETE_SCRIPT = """
+local job_key = ARGV[3] .. ARGV[1]
+if redis.call('HGET', job_key, 'worker') ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HSET', job_key, 'status', ARGV[4], 'result_status', ARGV[5], 'worker', '')
+return 1
+"""
+
+# Devolve o job ao dono da fila com atraso (a tentativa não é contabilizada)
+_RELEASE_SCRIPT = """
+local job_key = ARGV[3] .. ARGV[1]
+if redis.call('HGET', job_key, 'worker') ~= ARGV[2] then
+    return 0
+end
+local now = redis.call('TIME')
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('ZADD', KEYS[2], tonumber(now[1]) + tonumber(ARGV[4]), ARGV[1])
+redis.call('HSET', job_key, 'status', 'delayed', 'worker', '')
+redis.call('HINCRBY', job_key, 'attempts', -1)
+return 1
+"""
+
+# Move para o fim da fila os jobs adiados cujo atraso já passou
+_PROMOTE_SCRIPT = """
+local now = redis.call('TIME')
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', tonumber(now[1]))
+for _, job_id in ipairs(due) do
+    redis.call('ZREM', KEYS[1], job_id)
+    redis.call('HSET', ARGV[1] .. job_id, 'status', 'queued')
+    redis.call('LPUSH', KEYS[2], job_id)
+end
+return #due
+"""
+
+# Devolve à fila os jobs cujo lease expirou (ou marca como 'failed' após o limite de tentativas)
+_REAP_SCRIPT = """
+local now = redis.call('TIME')
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', tonumber(now[1]))
+local requeued = 0
+for _, job_id in ipairs(expired) do
+    local job_key = ARGV[1] .. job_id
+    redis.call('ZREM', KEYS[1], job_id)
+    local attempts = tonumber(redis.call('HGET', job_key, 'attempts') or '0')
+    if attempts >= tonumber(ARGV[2]) then
+        redis.call('HSET', job_key, 'status', 'failed', 'result_status', 'lease_expired', 'worker', '')
+    else
+        redis.call('HSET', job_key, 'status', 'queued', 'worker', '')
+        redis.call('RPUSH', KEYS[2], job_id)
+        requeued = requeued + 1
+    end
+end
+return requeued
+"""
+
+
+class RedisJobQueue:
+    """
+    Fila distribuída de jobs TDD sobre Redis.
+
+    Produtores enfileiram (task_key, specification, function_name); workers em
+    qualquer host reivindicam jobs com lease, renovam via heartbeat e, se um
+    worker morre, o lease expira e o job volta para a fila.
+
+    Estrutura no Redis:
+        {queue_key}            lista de job_ids pendentes
+        {queue_key}:leases     zset job_id -> expiração do lease (epoch)
+        {queue_key}:delayed    zset job_id -> instante em que o job volta à fila (epoch)
+        {queue_key}:job:{id}   hash com os dados e status do job
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        queue_key: Optional[str] = None,
+        lease_seconds: Optional[int] = None,
+        max_attempts: Optional[int] = None
+    ):
+        self.client = redis.from_url(redis_url or Config.REDIS_URL, decode_responses=True)
+        self.queue_key = queue_key or Config.PLAN_KEY
+        self.leases_key = f"{self.queue_key}:leases"
+        self.delayed_key = f"{self.queue_key}:delayed"
+        self.job_prefix = f"{self.queue_key}:job:"
+        self.lease_seconds = lease_seconds or Config.JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or Config.JOB_MAX_ATTEMPTS
+
+        self._claim = self.client.register_script(_CLAIM_SCRIPT)
+        self._heartbeat = self.client.register_script(_HEARTBEAT_SCRIPT)
+        self._complete = self.client.register_script(_COMPLETE_SCRIPT)
+        self._reap = self.client.register_script(_REAP_SCRIPT)
+        self._release = self.client.register_script(_RELEASE_SCRIPT)
+        self._promote = self.client.register_script(_PROMOTE_SCRIPT)
+
+    def enqueue(self, task_key: str, specification: str, function_name: str, priority: float = 1.0) -> str:
+        """
+        Enfileira um novo job.
+        
+        Args:
+            priority: Peso da tarefa no escalonador fair-share do worker (maior = mais slots)
+
+        Returns:
+            Identificador do job
+        """
+        job_id = uuid.uuid4().hex
+        try:
+            pipe = self.client.pipeline()
+            pipe.hset(f"{self.job_prefix}{job_id}", mapping={
+                "job_id": job_id,
+                "task_key": task_key,
+                "specification": specification,
+                "function_name": function_name,
+                "priority": priority,
+                "status": "queued",
+                "attempts": 0,
+                "worker": ""
+            })
+            pipe.lpush(self.queue_key, job_id)
+            pipe.execute()
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to enqueue job: {str(e)}")
+        return job_id
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Reivindica o próximo job pendente. Retorna None se a fila estiver vazia."""
+        try:
+            job_id = self._claim(
+                keys=[self.queue_key, self.leases_key],
+                args=[worker_id, self.lease_seconds, self.job_prefix]
+            )
+            if not job_id:
+                return None
+            return self.get_job(job_id)
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to claim job: {str(e)}")
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Renova o lease do job. Retorna False se o worker perdeu a posse do job."""
+        try:
+            return bool(self._heartbeat(
+                keys=[self.leases_key],
+                args=[job_id, worker_id, self.job_prefix, self.lease_seconds]
+            ))
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to renew lease: {str(e)}")
+
+    def complete(self, job_id: str, worker_id: str, result_status: str, failed: bool = False) -> bool:
+        """Marca o job como concluído. Retorna False se o worker já não era o dono do job."""
+        try:
+            return bool(self._complete(
+                keys=[self.leases_key],
+                args=[job_id, worker_id, self.job_prefix, "failed" if failed else "done", result_status]
+            ))
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to complete job: {str(e)}")
+
+    def release(self, job_id: str, worker_id: str, delay: float) -> bool:
+        """
+        Devolve o job à fila após `delay` segundos, sem contar a tentativa.
+
+        Usado quando o job não pôde rodar agora (ex.: tarefa travada por outro
+        worker). Retorna False se o worker já não era o dono do job.
+        """
+        try:
+            return bool(self._release(
+                keys=[self.leases_key, self.delayed_key],
+                args=[job_id, worker_id, self.job_prefix, int(delay)]
+            ))
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to release job: {str(e)}")
+
+    def requeue_delayed(self) -> int:
+        """Devolve à fila os jobs adiados cujo atraso terminou. Retorna quantos foram re-enfileirados."""
+        try:
+            return int(self._promote(keys=[self.delayed_key, self.queue_key], args=[self.job_prefix]))
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to requeue delayed jobs: {str(e)}")
+
+    def requeue_expired(self) -> int:
+        """Devolve à fila os jobs com lease expirado. Retorna quantos foram re-enfileirados."""
+        try:
+            return int(self._reap(
+                keys=[self.leases_key, self.queue_key],
+                args=[self.job_prefix, self.max_attempts]
+            ))
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to requeue expired jobs: {str(e)}")
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna os dados do job ou None se não existir."""
+        try:
+            data = self.client.hgetall(f"{self.job_prefix}{job_id}")
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to load job: {str(e)}")
+        if not data:
+            return None
+        data["attempts"] = int(data.get("attempts", 0))
+        data["priority"] = float(data.get("priority", 1.0))
+        return data
+
+    def pending_count(self) -> int:
+        """Número de jobs aguardando na fila."""
+        try:
+            return int(self.client.llen(self.queue_key))
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to read queue length: {str(e)}")
+
+    def list_running(self) -> List[str]:
+        """Job_ids com lease ativo."""
+        try:
+            return list(self.client.zrange(self.leases_key, 0, -1))
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to list running jobs: {str(e)}")
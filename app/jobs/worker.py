@@ -0,0 +1,151 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional
+from app.config import Config
+from app.jobs.redis_queue import RedisJobQueue
+
+
+class JobWorker:
+    """
+    Worker que consome a fila distribuída e executa o TDDOrchestrator para cada job.
+
+    Enquanto o job roda, uma thread renova o lease periodicamente. Jobs de workers
+    que morreram têm o lease expirado e são re-enfileirados por qualquer worker vivo.
+    """
+
+    def __init__(
+        self,
+        job_queue: Optional[RedisJobQueue] = None,
+        worker_id: Optional[str] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.queue = job_queue or RedisJobQueue()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.poll_interval = poll_interval or Config.JOB_POLL_INTERVAL
+        self._stop = threading.Event()
+        self._persistence = None
+        # Coleta de artefatos sem referência, espaçada para não coincidir entre workers recém-iniciados
+        self._next_gc = time.monotonic() + Config.ARTIFACT_GC_INTERVAL
+
+    def stop(self) -> None:
+        """Pede o encerramento após o job atual."""
+        self._stop.set()
+
+    def _heartbeat_loop(self, job_id: str, done: threading.Event, lost: threading.Event) -> None:
+        interval = max(1.0, self.queue.lease_seconds / 3)
+        while not done.wait(interval):
+            try:
+                if not self.queue.heartbeat(job_id, self.worker_id):
+                    logging.error(f"❌ Worker {self.worker_id} perdeu o lease do job {job_id}")
+                    lost.set()
+                    return
+            except ConnectionError as e:
+                logging.warning(f"⚠️ Falha ao renovar lease do job {job_id}: {e}")
+
+    def persistence(self):
+        """Persistência compartilhada pelos jobs do worker (o cache local sobrevive entre jobs)."""
+        if self._persistence is None:
+            from app.persistence import PersistenceFactory
+            self._persistence = PersistenceFactory.create_persistence(Config.PERSISTENCE_STRATEGY)
+        return self._persistence
+
+    def process(self, job: Dict[str, Any]) -> str:
+        """Executa um job reivindicado e retorna o status final do workflow."""
+        from app.orchestrator import TDDOrchestrator
+
+        task_key = job["task_key"]
+        orchestrator = TDDOrchestrator(
+            task_key=task_key,
+            persistence=self.persistence(),
+            priority=job.get("priority", 1.0)
+        )
+
+        # Jobs re-enfileirados após lease expirado retomam do último estado salvo
+        resume = job["attempts"] > 1 and orchestrator.persistence.load_state(task_key) is not None
+        if resume:
+            logging.info(f"🔄 Job {job['job_id']} (tentativa {job['attempts']}): retomando '{task_key}'")
+            final_state = orchestrator.run(resume=True)
+        else:
+            final_state = orchestrator.run(
+                specification=job["specification"],
+                function_name=job["function_name"]
+            )
+        return final_state.get("status", "unknown")
+
+    def run_once(self) -> bool:
+        """Reivindica e processa um job. Retorna False se a fila estava vazia."""
+        self.queue.requeue_expired()
+        self.queue.requeue_delayed()
+        job = self.queue.claim(self.worker_id)
+        if not job:
+            return False
+
+        job_id = job["job_id"]
+        logging.info(f"📥 Worker {self.worker_id} assumiu o job {job_id} ('{job['task_key']}')")
+
+        done, lost = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(job_id, done, lost), daemon=True)
+        heartbeat.start()
+
+        try:
+            status = self.process(job)
+            failed = False
+        except Exception as e:
+            logging.error(f"❌ Job {job_id} falhou: {e}")
+            status, failed = "error", True
+        finally:
+            done.set()
+            heartbeat.join()
+
+        if status == "task_locked" and not lost.is_set():
+            # Outro worker está com a tarefa: tenta de novo mais tarde em vez de encerrar o job
+            if self.queue.release(job_id, self.worker_id, Config.JOB_LOCKED_RETRY_DELAY):
+                logging.info(
+                    f"🔒 Job {job_id}: tarefa '{job['task_key']}' em uso por outro worker; "
+                    f"devolvido à fila em {Config.JOB_LOCKED_RETRY_DELAY}s"
+                )
+            else:
+                logging.warning(f"⚠️ Job {job_id} não pertence mais a {self.worker_id}; resultado descartado.")
+            return True
+
+        if lost.is_set() or not self.queue.complete(job_id, self.worker_id, status, failed=failed):
+            logging.warning(f"⚠️ Job {job_id} não pertence mais a {self.worker_id}; resultado descartado.")
+        else:
+            logging.info(f"📤 Job {job_id} finalizado com status '{status}'")
+        return True
+
+    def collect_garbage(self) -> None:
+        """Remove blobs de artefatos que nenhum estado salvo referencia mais (a cada ARTIFACT_GC_INTERVAL)."""
+        if not Config.ARTIFACT_GC_INTERVAL or time.monotonic() < self._next_gc:
+            return
+        self._next_gc = time.monotonic() + Config.ARTIFACT_GC_INTERVAL
+
+        try:
+            deleted = self.persistence().collect_garbage()
+        except ConnectionError as e:
+            logging.warning(f"⚠️ Falha na coleta de artefatos: {e}")
+            return
+        if deleted:
+            logging.info(f"🧹 Coleta de artefatos: {deleted} blob(s) sem referência removido(s)")
+
+    def run_forever(self) -> None:
+        """Loop principal: processa jobs até stop() ser chamado."""
+        logging.info(f"👷 Worker {self.worker_id} iniciado (fila '{self.queue.queue_key}')")
+        while not self._stop.is_set():
+            try:
+                if not self.run_once():
+                    self.collect_garbage()
+                    self._stop.wait(self.poll_interval)
+            except ConnectionError as e:
+                logging.error(f"❌ Erro de conexão com a fila: {e}")
+                self._stop.wait(self.poll_interval)
+
+
+def worker_process_main(index: int) -> None:
+    """Ponto de entrada de um processo worker: workspace próprio para não colidir com outros processos."""
+    Config.WORKSPACE_PATH = os.path.join(Config.WORKSPACE_PATH, f"worker_{os.getpid()}_{index}")
+    JobWorker().run_forever()
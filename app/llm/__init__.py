@@ -0,0 +1,22 @@
+from app.llm.streaming import GenerationAborted, stream_completion
+from app.llm.calls import invoke_llm, is_transient_error
+from app.llm.rate_limiter import RateLimiter, TokenBucket, RedisTokenBucket, get_rate_limiter
+from app.llm.routing import ModelRouter, get_model_router, select_model
+from app.llm.backends import create_chat_model, register_backend_type, backend_for
+
+__all__ = [
+    "GenerationAborted",
+    "stream_completion",
+    "invoke_llm",
+    "is_transient_error",
+    "RateLimiter",
+    "TokenBucket",
+    "RedisTokenBucket",
+    "get_rate_limiter",
+    "ModelRouter",
+    "get_model_router",
+    "select_model",
+    "create_chat_model",
+    "register_backend_type",
+    "backend_for",
+]
@@ -0,0 +1,74 @@
+from typing import Any, Callable, Dict, Optional
+from langchain_core.language_models import BaseChatModel, FakeListChatModel
+from langchain_openai import ChatOpenAI
+from app.config import Config
+
+# Fábrica: (modelo, temperatura, configuração do backend) -> modelo de chat
+BackendFactory = Callable[[str, float, Dict[str, Any]], BaseChatModel]
+
+
+def _openai_backend(model: str, temperature: float, settings: Dict[str, Any]) -> BaseChatModel:
+    # max_retries=0: retries ficam a cargo de app.llm.calls (limitador compartilhado + backoff)
+    return ChatOpenAI(model=model, temperature=temperature, max_retries=0, timeout=settings.get("timeout"))
+
+
+def _openai_compatible_backend(model: str, temperature: float, settings: Dict[str, Any]) -> BaseChatModel:
+    """Qualquer servidor que fale a API da OpenAI (vLLM, llama.cpp, Ollama, LM Studio...)."""
+    if not settings.get("base_url"):
+        raise ValueError("Backend 'openai_compatible' requer 'base_url'")
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        max_retries=0,
+        base_url=settings["base_url"],
+        # Servidores locais costumam ignorar a chave, mas o cliente exige uma
+        api_key=settings.get("api_key") or "not-needed",
+        timeout=settings.get("timeout"),
+    )
+
+
+def _fake_backend(model: str, temperature: float, settings: Dict[str, Any]) -> BaseChatModel:
+    """Modelo em processo que devolve respostas fixas em ciclo (testes e execuções offline)."""
+    return FakeListChatModel(responses=list(settings.get("responses") or [""]))
+
+
+_BACKEND_TYPES: Dict[str, BackendFactory] = {
+    "openai": _openai_backend,
+    "openai_compatible": _openai_compatible_backend,
+    "fake": _fake_backend,
+}
+
+
+def register_backend_type(name: str, factory: BackendFactory) -> None:
+    """Registra um novo tipo de backend (disponível em Config.LLM_BACKENDS via 'type')."""
+    _BACKEND_TYPES[name] = factory
+
+
+def backend_for(agent: str) -> str:
+    """Nome do backend configurado para o agente (Config.AGENT_LLM_BACKENDS ou o padrão)."""
+    return Config.AGENT_LLM_BACKENDS.get(agent) or Config.LLM_BACKEND
+
+
+def create_chat_model(
+    agent: str,
+    model: str,
+    temperature: float = 0.0,
+    backend: Optional[str] = None
+) -> BaseChatModel:
+    """
+    Cria o modelo de chat do agente no backend configurado.
+
+    O modelo roteado (app.llm.routing) é usado, a menos que o backend fixe
+    o seu próprio 'model' (ex.: o nome do modelo servido localmente).
+    """
+    name = backend or backend_for(agent)
+    settings = Config.LLM_BACKENDS.get(name)
+    if settings is None:
+        raise ValueError(f"Backend de LLM desconhecido: '{name}'")
+
+    backend_type = settings.get("type", name)
+    factory = _BACKEND_TYPES.get(backend_type)
+    if factory is None:
+        raise ValueError(f"Tipo de backend de LLM desconhecido: '{backend_type}' (backend '{name}')")
+
+    return factory(settings.get("model") or model, temperature, settings)
@@ -0,0 +1,117 @@
+import logging
+import random
+import time
+from typing import Any, Callable, List, Optional, TypeVar
+from langchain_core.messages import BaseMessage
+from app.config import Config
+from app.llm.rate_limiter import get_rate_limiter
+from app.runtime.context import charge_task, check_task_budget
+from app.runtime.scheduler import get_scheduler
+
+T = TypeVar("T")
+
+_TRANSIENT_STATUS = {408, 409, 429}
+_TRANSIENT_NAMES = {
+    "RateLimitError",
+    "APITimeoutError",
+    "APIConnectionError",
+    "InternalServerError",
+    "ServiceUnavailableError",
+    "TimeoutError",
+    "ConnectionError",
+    "ReadTimeout",
+    "ConnectTimeout",
+}
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Erros que valem nova tentativa: 429, timeouts, falhas de conexão e 5xx do provedor."""
+    status = _status_code(error)
+    if status is not None:
+        return status in _TRANSIENT_STATUS or status >= 500
+    return type(error).__name__ in _TRANSIENT_NAMES
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Lê o cabeçalho Retry-After, quando o provedor o envia."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, error: Optional[Exception] = None) -> float:
+    """Backoff exponencial com jitter completo (respeita Retry-After se maior)."""
+    ceiling = min(Config.LLM_BACKOFF_MAX, Config.LLM_BACKOFF_BASE * (2 ** (attempt - 1)))
+    delay = random.uniform(0, ceiling)
+    retry_after = _retry_after(error) if error is not None else None
+    return max(delay, retry_after or 0.0)
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    """Estimativa grosseira (4 caracteres por token) do prompt + completion esperada."""
+    chars = sum(len(m.content) if isinstance(m.content, str) else 0 for m in messages)
+    return chars // 4 + Config.LLM_EXPECTED_COMPLETION_TOKENS
+
+
+def call_with_retries(call: Callable[[], T], description: str = "LLM") -> T:
+    """Executa `call` repetindo erros transitórios com backoff; erros definitivos propagam."""
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return call()
+        except Exception as e:
+            if not is_transient_error(e) or attempt > Config.LLM_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt, e)
+            logging.warning(
+                f"⚠️ {description}: erro transitório ({type(e).__name__}); "
+                f"nova tentativa {attempt}/{Config.LLM_MAX_RETRIES} em {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+
+def usage_tokens(message: Any) -> int:
+    """Tokens reais reportados pelo provedor (0 se indisponível)."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    return int(usage.get("total_tokens", 0)) if isinstance(usage, dict) else 0
+
+
+def invoke_llm(llm, messages: List[BaseMessage]):
+    """
+    Chama `llm.invoke` passando pelo escalonador de tarefas e pelo limitador
+    compartilhado de requisições/tokens, repetindo erros transitórios (429,
+    timeouts, 5xx) com backoff exponencial.
+    """
+    limiter = get_rate_limiter()
+
+    def call():
+        # Slot do escalonador liberado durante o backoff entre tentativas
+        # Orçamento verificado a cada tentativa: uma tarefa esgotada é preemptada aqui
+        check_task_budget()
+        estimated = estimate_tokens(messages)
+        # Cota reservada antes do slot: a espera no limitador não bloqueia as outras tarefas
+        limiter.acquire(estimated)
+        actual = estimated - Config.LLM_EXPECTED_COMPLETION_TOKENS
+        try:
+            with get_scheduler().slot("llm"):
+                response = llm.invoke(messages)
+                actual = usage_tokens(response) or estimated
+                charge_task("llm_calls")
+                charge_task("tokens", actual)
+                return response
+        finally:
+            # A reserva de completion é corrigida mesmo quando a chamada falha
+            limiter.record_usage(estimated, actual)
+
+    return call_with_retries(call)
@@ -0,0 +1,136 @@
+import threading
+import time
+from typing import Optional
+from app.config import Config
+
+
+class TokenBucket:
+    """Token bucket em memória, thread-safe (compartilhado por todas as tarefas do processo)."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def try_acquire(self, amount: float) -> float:
+        """Tenta consumir `amount`. Retorna 0 se concedido, ou os segundos a aguardar."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.refill_per_second
+
+    def adjust(self, delta: float) -> None:
+        """Corrige o saldo após conhecer o consumo real (delta positivo devolve tokens)."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + delta)
+
+
+# Bucket compartilhado entre hosts: refill e consumo atômicos no Redis
+_REDIS_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local amount = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(data[1]) or capacity
+local updated = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local wait = 0
+if ARGV[4] ~= '1' and tokens < amount then
+    wait = (amount - tokens) / rate
+else
+    tokens = math.min(capacity, tokens - amount)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) * 2 + 60)
+return tostring(wait)
+"""
+
+
+class RedisTokenBucket:
+    """Token bucket armazenado no Redis, compartilhado por todos os processos/hosts."""
+
+    def __init__(self, client, key: str, capacity: float, refill_per_second: float):
+        self.key = key
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._script = client.register_script(_REDIS_BUCKET_SCRIPT)
+
+    def try_acquire(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        return float(self._script(keys=[self.key], args=[self.capacity, self.refill_per_second, amount, 0]))
+
+    def adjust(self, delta: float) -> None:
+        """Corrige o saldo após conhecer o consumo real (delta positivo devolve tokens)."""
+        self._script(keys=[self.key], args=[self.capacity, self.refill_per_second, -delta, 1])
+
+
+class RateLimiter:
+    """
+    Limita requisições e tokens por minuto das chamadas de modelo.
+
+    Cada chamada reserva 1 requisição e uma estimativa de tokens; após a resposta,
+    a estimativa é corrigida com o consumo real via `record_usage`.
+    """
+
+    def __init__(self, requests_bucket, tokens_bucket):
+        self.requests = requests_bucket
+        self.tokens = tokens_bucket
+
+    def acquire(self, estimated_tokens: int) -> float:
+        """Bloqueia até haver cota. Retorna o tempo total aguardado (segundos)."""
+        waited = 0.0
+        while True:
+            wait = self.requests.try_acquire(1)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+            waited += wait
+        while True:
+            wait = self.tokens.try_acquire(estimated_tokens)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+            waited += wait
+        return waited
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Ajusta o bucket de tokens com a diferença entre estimativa e consumo real."""
+        if actual_tokens and actual_tokens != estimated_tokens:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Retorna o limitador compartilhado do processo (Redis se Config.LLM_RATE_LIMIT_BACKEND == 'redis')."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            rpm = Config.LLM_REQUESTS_PER_MINUTE
+            tpm = Config.LLM_TOKENS_PER_MINUTE
+            if Config.LLM_RATE_LIMIT_BACKEND == "redis":
+                import redis
+
+                client = redis.from_url(Config.REDIS_URL, decode_responses=True)
+                _limiter = RateLimiter(
+                    RedisTokenBucket(client, "ratelimit:llm:requests", rpm, rpm / 60),
+                    RedisTokenBucket(client, "ratelimit:llm:tokens", tpm, tpm / 60)
+                )
+            else:
+                _limiter = RateLimiter(TokenBucket(rpm, rpm / 60), TokenBucket(tpm, tpm / 60))
+        return _limiter
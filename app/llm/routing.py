@@ -0,0 +1,71 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence
+from app.config import Config
+
+
+class ModelRouter:
+    """
+    Escolhe o modelo de cada agente a partir de uma escada de tiers
+    (Config.MODEL_TIERS, do mais rápido ao mais forte).
+
+    Cada agente parte do seu tier base (Config.AGENT_MODEL_TIERS) e sobe um
+    tier para cada limiar de iteração cruzado, a cada N falhas repetidas e a
+    cada loop travado detectado (mesmo fingerprint de falha repetido).
+    Como o orquestrador zera iteração e contadores de falha após o GREEN,
+    o próximo sub-requisito volta automaticamente ao tier base.
+    """
+
+    def __init__(
+        self,
+        tiers: Optional[Sequence[str]] = None,
+        agent_tiers: Optional[Dict[str, int]] = None,
+        iteration_thresholds: Optional[Sequence[int]] = None,
+        failure_threshold: Optional[int] = None
+    ):
+        self.tiers: List[str] = list(tiers or Config.MODEL_TIERS)
+        self.agent_tiers = dict(Config.AGENT_MODEL_TIERS if agent_tiers is None else agent_tiers)
+        self.iteration_thresholds = sorted(
+            Config.MODEL_ESCALATION_ITERATIONS if iteration_thresholds is None else iteration_thresholds
+        )
+        self.failure_threshold = Config.MODEL_ESCALATION_FAILURES if failure_threshold is None else failure_threshold
+
+    def base_tier(self, agent: str) -> int:
+        """Tier inicial do agente (0 se não configurado)."""
+        return min(max(int(self.agent_tiers.get(agent, 0)), 0), len(self.tiers) - 1)
+
+    def tier_for(self, agent: str, iteration: int = 0, failures: int = 0, stuck: int = 0) -> int:
+        """Tier do agente considerando iteração atual, falhas repetidas e loops detectados."""
+        steps = sum(1 for threshold in self.iteration_thresholds if iteration >= threshold)
+        if self.failure_threshold:
+            steps += failures // self.failure_threshold
+        steps += max(stuck, 0)
+        return min(self.base_tier(agent) + steps, len(self.tiers) - 1)
+
+    def select(self, agent: str, iteration: int = 0, failures: int = 0, stuck: int = 0) -> str:
+        """Modelo a usar pelo agente nesta chamada."""
+        tier = self.tier_for(agent, iteration, failures, stuck)
+        if tier > self.base_tier(agent):
+            logging.info(
+                f"⬆️ Escalando {agent} para '{self.tiers[tier]}' "
+                f"(iteração {iteration}, falhas repetidas {failures}, loops {stuck})"
+            )
+        return self.tiers[tier]
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Retorna o roteador de modelos compartilhado do processo."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
+
+
+def select_model(agent: str, iteration: int = 0, failures: int = 0, stuck: int = 0) -> str:
+    """Atalho para get_model_router().select(...)."""
+    return get_model_router().select(agent, iteration, failures, stuck)
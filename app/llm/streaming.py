@@ -0,0 +1,124 @@
+from typing import Callable, List, Optional
+from langchain_core.messages import BaseMessage
+from app.config import Config
+from app.llm.calls import call_with_retries, estimate_tokens
+from app.llm.rate_limiter import get_rate_limiter
+from app.runtime.context import charge_task, check_task_budget
+from app.runtime.scheduler import get_scheduler
+
+
+class GenerationAborted(Exception):
+    """Geração interrompida durante o streaming por violar uma checagem estrutural."""
+
+    def __init__(self, reason: str, partial: str = ""):
+        super().__init__(reason)
+        self.reason = reason
+        self.partial = partial
+
+
+# Recebe cada linha completa do stream; retorna o motivo do aborto ou None
+LineCheck = Callable[[str], Optional[str]]
+
+
+def stream_completion(
+    llm,
+    messages: List[BaseMessage],
+    line_check: Optional[LineCheck] = None,
+    max_chars: Optional[int] = None
+) -> str:
+    """
+    Consome a resposta do modelo token a token, validando cada linha assim que ela se completa.
+
+    Ao detectar uma violação, o stream é fechado imediatamente (cancelando a geração
+    no provedor) e GenerationAborted é lançada. A chamada passa pelo escalonador
+    de tarefas e pelo limitador compartilhado; erros transitórios reiniciam o
+    stream com backoff.
+
+    Args:
+        llm: Modelo de chat LangChain com suporte a .stream()
+        messages: Mensagens do prompt
+        line_check: Checagem aplicada a cada linha completa
+        max_chars: Limite de tamanho da resposta (proteção contra geração descontrolada)
+
+    Returns:
+        Texto completo gerado
+    """
+    limiter = get_rate_limiter()
+
+    def consume() -> str:
+        check_task_budget()
+        estimated = estimate_tokens(messages)
+        prompt_tokens = estimated - Config.LLM_EXPECTED_COMPLETION_TOKENS
+        # Cota reservada antes do slot: a espera no limitador não bloqueia as outras tarefas
+        limiter.acquire(estimated)
+        actual = prompt_tokens
+        try:
+            with get_scheduler().slot("llm"):
+                charge_task("llm_calls")
+                try:
+                    text = _consume_stream(llm, messages, line_check, max_chars)
+                except GenerationAborted as e:
+                    # Gerações abortadas também consomem tokens (até o ponto do aborto)
+                    actual = prompt_tokens + len(e.partial) // 4
+                    charge_task("tokens", actual)
+                    raise
+                actual = prompt_tokens + len(text) // 4
+                charge_task("tokens", actual)
+                return text
+        finally:
+            # A reserva de completion é corrigida mesmo em abortos e erros transitórios
+            limiter.record_usage(estimated, actual)
+
+    # Erros transitórios (429/5xx/timeouts) reiniciam o stream; GenerationAborted propaga
+    return call_with_retries(consume)
+
+
+def _consume_stream(
+    llm,
+    messages: List[BaseMessage],
+    line_check: Optional[LineCheck],
+    max_chars: Optional[int]
+) -> str:
+    parts: List[str] = []
+    size = 0
+    pending = ""
+    stream = llm.stream(messages)
+
+    try:
+        for chunk in stream:
+            piece = chunk.content if isinstance(chunk.content, str) else ""
+            if not piece:
+                continue
+
+            parts.append(piece)
+            size += len(piece)
+
+            if max_chars is not None and size > max_chars:
+                raise GenerationAborted(
+                    f"resposta excedeu {max_chars} caracteres", "".join(parts)
+                )
+
+            if line_check is None:
+                continue
+
+            pending += piece
+            if "\n" not in pending:
+                continue
+
+            *complete_lines, pending = pending.split("\n")
+            for line in complete_lines:
+                reason = line_check(line)
+                if reason:
+                    raise GenerationAborted(reason, "".join(parts))
+
+        # Última linha da resposta (sem quebra de linha final)
+        if line_check is not None and pending:
+            reason = line_check(pending)
+            if reason:
+                raise GenerationAborted(reason, "".join(parts))
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+
+    return "".join(parts)
@@ -3,14 +3,28 @@ import re
 import logging
 from typing import TypedDict, Optional, List, Dict, Any
 from langgraph.graph import StateGraph, END, START
-from app.agents.planner import generate_plan
+from app.agents.planner import generate_plan_graph, StreamingPlan
 from app.agents.tester import generate_test_for_sub_req
-from app.agents.developer import generate_code_incremental
-from app.agents.runner import run_pytest
+from app.agents.developer import GenerationFailed, generate_code_incremental, refactor_code
+from app.agents.speculative import generate_speculative_code
+from app.agents.prefetch import TestPrefetcher, merge_prefetched_tests
+from app.agents.suite import remove_duplicate_tests, minimize_suite, covered_by_existing
+from app.agents.performance import check_complexity, parse_complexity_target, compare_performance
+from app.agents.runner import is_runner_error, run_pytest, run_pytest_with_coverage
 from app.agents.reviewer import analyze_failures
+from app.agents.preflight import check_tests, check_implementation, format_preflight_report
+from app.agents.fingerprint import failure_fingerprint, detect_stuck_loop, parse_test_results, failure_messages
 from app.config import Config
-from app.persistence import PersistenceStrategy, PersistenceFactory
+from app.llm import select_model
+from app.persistence import PersistenceStrategy, PersistenceFactory, StaleWriteError
+from app.runtime import TaskContext, TaskBudget, BudgetExceededError, task_scope, get_scheduler
+import contextvars
 import shutil
+import socket
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
@@ -27,42 +41,137 @@ class AgentState(TypedDict):
     status: str
     max_retries: int
     red_attempts: int
+    preflight_attempts: int
+    per_test_timeout: float
+    budget: Dict[str, Any]
+    failure_fingerprints: List[str]
+    stuck_escalations: int
+    last_green_code: str
+    last_green_passed: List[str]
+    plan_dependencies: List[List[int]]
+    branch_steps: List[int]
+    sequential_until: int
+    plan_streaming: bool
+    resume_node: str
+    resume_status: str
+    phase: str
+    verified_output: str
+    complexity_target: str
+    perf_attempts: int
+    refactor_due: bool
+    error_message: str
 
 class TDDOrchestrator:
     def __init__(
         self, 
         task_key: str = "tdd_task",
         persistence: Optional[PersistenceStrategy] = None,
-        max_retries: int = 10
+        max_retries: int = 10,
+        per_test_timeout: Optional[float] = None,
+        priority: float = 1.0,
+        budget: Optional[Dict[str, float]] = None,
+        workspace_path: Optional[str] = None,
+        complexity_target: Optional[str] = None
     ):
         self.persistence = persistence or PersistenceFactory.create_persistence("redis")
         self.state_key = f"state:{task_key}"
         self.task_key = task_key
         self.max_retries = max_retries
+        self.per_test_timeout = per_test_timeout if per_test_timeout is not None else Config.PER_TEST_TIMEOUT
+        self.workspace_path = workspace_path or Config.WORKSPACE_PATH
+        # Contexto visto pelo escalonador fair-share (prioridade e sub-requisitos restantes)
+        self.task_context = TaskContext(task_key, priority=priority)
+        self.test_prefetcher: Optional[TestPrefetcher] = None
+        self.plan_stream: Optional[StreamingPlan] = None
+        # Minimização da suíte ao fim do plano (desligada nos ramos: o join usa a suíte completa)
+        self.minimize_suite = Config.SUITE_MINIMIZE_AT_END
+        # Alvo de complexidade da tarefa (ex.: "O(n)"); sem ele, é extraído da especificação
+        self.complexity_target = complexity_target
+        # Verificação de desempenho após o GREEN (nos ramos, fica para o join)
+        self.performance_check = Config.PERF_CHECK_ENABLED
+        # Fase REFACTOR (nos ramos, fica para a tarefa principal)
+        self.refactor = Config.REFACTOR_ENABLED
+        # Limites de orçamento: wall_seconds, tokens, llm_calls, runner_runs (0/ausente = ilimitado)
+        self.budget_limits = dict(Config.TASK_BUDGET if budget is None else budget)
+        # Posse da tarefa: lock com TTL + fencing token verificado em toda escrita de estado
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.fencing_token: Optional[int] = None
+        self._lock_renewal_stop: Optional[threading.Event] = None
         self.graph = self._build_graph()
 
+    def _acquire_ownership(self) -> bool:
+        """Adquire o lock da tarefa e inicia a renovação periódica do TTL."""
+        try:
+            token = self.persistence.acquire_task_lock(self.task_key, self.owner_id, Config.TASK_LOCK_TTL)
+        except NotImplementedError:
+            logging.warning("⚠️ Persistência sem suporte a lock de tarefa; executando sem proteção de concorrência.")
+            return True
+        
+        if token is None:
+            return False
+        
+        self.fencing_token = token
+        logging.info(f"🔒 Lock da tarefa '{self.task_key}' adquirido (fencing token {token})")
+        
+        if self._lock_renewal_stop is None:
+            stop = threading.Event()
+            self._lock_renewal_stop = stop
+            
+            def renew():
+                while not stop.wait(Config.TASK_LOCK_TTL / 3):
+                    try:
+                        if not self.persistence.renew_task_lock(self.task_key, self.owner_id, Config.TASK_LOCK_TTL):
+                            logging.error(f"❌ Lock da tarefa '{self.task_key}' perdido; escritas serão rejeitadas.")
+                            return
+                    except ConnectionError as e:
+                        logging.warning(f"⚠️ Falha ao renovar lock da tarefa: {e}")
+            
+            threading.Thread(target=renew, daemon=True).start()
+        return True
+
+    def _release_ownership(self):
+        """Para a renovação e libera o lock da tarefa."""
+        if self._lock_renewal_stop is not None:
+            self._lock_renewal_stop.set()
+            self._lock_renewal_stop = None
+        if self.fencing_token is None:
+            return
+        try:
+            self.persistence.release_task_lock(self.task_key, self.owner_id)
+        except (NotImplementedError, ConnectionError) as e:
+            logging.warning(f"⚠️ Falha ao liberar lock da tarefa: {e}")
+        self.fencing_token = None
+
     def _setup_workspace(self, clean: bool = True):
         """Configura o diretório de trabalho."""
-        if clean and os.path.exists(Config.WORKSPACE_PATH):
-            shutil.rmtree(Config.WORKSPACE_PATH)
+        if clean and os.path.exists(self.workspace_path):
+            shutil.rmtree(self.workspace_path)
         
-        os.makedirs(Config.WORKSPACE_PATH, exist_ok=True)
+        os.makedirs(self.workspace_path, exist_ok=True)
         
-        impl_path = os.path.join(Config.WORKSPACE_PATH, f"{Config.IMPLEMENTATION_MODULE}.py")
+        impl_path = os.path.join(self.workspace_path, f"{Config.IMPLEMENTATION_MODULE}.py")
         if not os.path.exists(impl_path) or clean:
             with open(impl_path, "w", encoding="utf-8") as f:
                 f.write("# Implementação incremental via TDD\n")
         
-        test_path = os.path.join(Config.WORKSPACE_PATH, Config.TEST_FILE)
+        test_path = os.path.join(self.workspace_path, Config.TEST_FILE)
         if not os.path.exists(test_path) or clean:
             with open(test_path, "w", encoding="utf-8") as f:
                 f.write("import pytest\n")
         
-        logging.info(f"✅ Workspace '{Config.WORKSPACE_PATH}' configurado.")
+        logging.info(f"✅ Workspace '{self.workspace_path}' configurado.")
+
+    def _runner_spill_path(self) -> Optional[str]:
+        """Arquivo com a saída completa do pytest desta tarefa (se habilitado)."""
+        if not Config.RUNNER_SPILL_OUTPUT:
+            return None
+        return os.path.join(Config.RUNNER_LOG_DIR, f"{self.task_key}.log")
 
     def _save_state(self, state: AgentState):
-        """Persiste o estado atual."""
-        self.persistence.save_state(self.task_key, state)
+        """Persiste o estado atual (incluindo o consumo de orçamento)."""
+        state["budget"] = self.task_context.budget.snapshot()
+        self.persistence.save_state(self.task_key, state, fencing_token=self.fencing_token)
+        self.task_context.update_progress(state.get('plan', []), state.get('plan_index', 0))
         current = state.get('plan_index', 0) + 1
         total = len(state.get('plan', []))
         logging.info(f"💾 Estado salvo: [{current}/{total}] {state.get('status')}")
@@ -79,37 +188,207 @@ class TDDOrchestrator:
     def _restore_files_from_state(self, state: AgentState):
         """Restaura arquivos de teste e implementação do estado."""
         if state.get("tests_code"):
-            test_path = os.path.join(Config.WORKSPACE_PATH, Config.TEST_FILE)
+            test_path = os.path.join(self.workspace_path, Config.TEST_FILE)
             with open(test_path, "w", encoding="utf-8") as f:
                 f.write(state["tests_code"])
             logging.info(f"📋 Testes restaurados: {len(state['tests_code'])} chars")
         
         if state.get("implementation_code"):
-            impl_path = os.path.join(Config.WORKSPACE_PATH, f"{Config.IMPLEMENTATION_MODULE}.py")
+            impl_path = os.path.join(self.workspace_path, f"{Config.IMPLEMENTATION_MODULE}.py")
             with open(impl_path, "w", encoding="utf-8") as f:
                 f.write(state["implementation_code"])
             logging.info(f"💻 Código restaurado: {len(state['implementation_code'])} chars")
 
+    def _refresh_streamed_plan(self, state: AgentState, needed: int) -> AgentState:
+        """Atualiza o plano com as etapas já recebidas do Planner em streaming (aguardando até `needed`)."""
+        if self.plan_stream is None:
+            if not state.get("plan_streaming"):
+                return state
+            # Retomada (ou stream anterior com erro): gera o plano de novo, mantendo as etapas já recebidas
+            logging.warning("⚠️ Plano em streaming incompleto; gerando novamente as etapas restantes.")
+            received = (state.get("plan", []), state.get("plan_dependencies") or [])
+            self.plan_stream = StreamingPlan(state["specification"], received=received).start()
+        
+        self.plan_stream.wait_for(needed)
+        plan, dependencies = self.plan_stream.snapshot()
+        if len(plan) > len(state.get("plan", [])):
+            logging.info(f"🧠 Plano atualizado: {len(plan)} sub-requisitos recebidos")
+        # Stream com erro: o plano pode estar truncado e continua marcado como incompleto
+        streaming = not self.plan_stream.done or self.plan_stream.error is not None
+        return {**state, "plan": plan, "plan_dependencies": dependencies, "plan_streaming": streaming}
+
+    def _independent_batch(self, state: AgentState, start: int) -> List[int]:
+        """Passos consecutivos a partir de `start` que não dependem uns dos outros."""
+        plan = state.get("plan", [])
+        dependencies = state.get("plan_dependencies") or []
+        if len(dependencies) != len(plan) or start < state.get("sequential_until", 0):
+            return [start]
+        
+        batch = []
+        for index in range(start, len(plan)):
+            if len(batch) >= Config.PLAN_PARALLEL_BRANCHES:
+                break
+            # Depende de um passo ainda não concluído (o próprio lote): encerra o lote
+            if any(dep >= start for dep in dependencies[index]):
+                break
+            batch.append(index)
+        return batch or [start]
+
+    def _run_branch(self, state: AgentState, index: int, budget: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Executa um sub-requisito isolado (tarefa filha com workspace próprio) a partir do estado atual.
+
+        `budget` é a fração do saldo da tarefa reservada ao ramo; o consumo real
+        é somado ao orçamento da tarefa no join. O workspace do ramo é temporário:
+        o resultado (testes e implementação) volta no estado final.
+        """
+        plan = state["plan"]
+        with tempfile.TemporaryDirectory(prefix=f"tdd_branch_{index}_") as workspace:
+            branch = TDDOrchestrator(
+                task_key=f"{self.task_key}:branch:{index}",
+                persistence=self.persistence,
+                max_retries=state.get("max_retries", self.max_retries),
+                per_test_timeout=state.get("per_test_timeout", self.per_test_timeout),
+                priority=self.task_context.priority,
+                budget=budget,
+                workspace_path=workspace
+            )
+            branch.minimize_suite = False
+            branch.performance_check = False
+            branch.refactor = False
+            seed = {
+                **state,
+                "plan": [plan[index]],
+                "plan_dependencies": [[]],
+                "plan_streaming": False,
+                "plan_index": 0,
+                "current_sub_req": plan[index],
+                "status": "branch_ready",
+                "feedback": "",
+                "iteration": 0,
+                "red_attempts": 0,
+                "preflight_attempts": 0,
+                "failure_fingerprints": [],
+                "stuck_escalations": 0,
+                "budget": {}
+            }
+            self.persistence.save_state(branch.task_key, seed)
+            try:
+                return branch.run(resume=True)
+            finally:
+                self.persistence.delete_state(branch.task_key)
+
+    def _performance_target(self, state: AgentState) -> Optional[str]:
+        """Alvo de complexidade a verificar após o GREEN (None = sem verificação)."""
+        if not self.performance_check:
+            return None
+        target = state.get("complexity_target") or state.get("specification", "")
+        return target if parse_complexity_target(target) else None
+
+    def _minimize_suite(self, state: AgentState) -> AgentState:
+        """Remove testes redundantes da suíte final, preservando cobertura e exemplos da especificação."""
+        tests_code = state.get("tests_code", "")
+        files = {
+            Config.TEST_FILE: tests_code,
+            f"{Config.IMPLEMENTATION_MODULE}.py": state.get("implementation_code", "")
+        }
+        output, coverage = run_pytest_with_coverage(per_test_timeout=state.get("per_test_timeout"), files=files)
+        if not coverage:
+            logging.warning("⚠️ Minimização da suíte: cobertura indisponível; mantendo todos os testes")
+            return state
+        
+        passed = {nodeid for nodeid, outcome in parse_test_results(output).items() if outcome == "PASSED"}
+        minimized, removed = minimize_suite(tests_code, coverage, state.get("specification", ""), passed)
+        if not removed:
+            logging.info("✂️ Minimização da suíte: nenhum teste redundante")
+            return state
+        
+        # A suíte reduzida precisa continuar verde com a implementação final
+        check = run_pytest(
+            per_test_timeout=state.get("per_test_timeout"),
+            files={**files, Config.TEST_FILE: minimized}
+        )
+        if "failed" in check.lower() or "error" in check.lower() or "passed" not in check.lower():
+            logging.warning("⚠️ Suíte minimizada não passou; mantendo a suíte original")
+            return state
+        
+        with open(os.path.join(self.workspace_path, Config.TEST_FILE), "w", encoding="utf-8") as f:
+            f.write(minimized)
+        logging.info(f"✂️ Suíte minimizada: {len(removed)} teste(s) redundante(s) removido(s): {removed}")
+        return {**state, "tests_code": minimized}
+
     def _build_graph(self):
         
+        def guarded(name, node):
+            """Verifica o orçamento antes do nó e converte a preempção em 'budget_exceeded'."""
+            def run_node(state: AgentState) -> AgentState:
+                if state.get("status") == "budget_exceeded" and state.get("resume_node") == name:
+                    # Retomada: o nó volta a ver o status que tinha antes da preempção
+                    state = {**state, "status": state.get("resume_status", ""), "resume_node": "", "resume_status": ""}
+                try:
+                    self.task_context.budget.check()
+                    return node(state)
+                except BudgetExceededError as e:
+                    logging.warning("=" * 70)
+                    logging.warning(f"⛔ ORÇAMENTO ESGOTADO em '{name}': {e}")
+                    logging.warning("💾 Estado persistido para retomada (run(resume=True))")
+                    logging.warning("=" * 70)
+                    new_state = {
+                        **state,
+                        "status": "budget_exceeded",
+                        "resume_node": name,
+                        "resume_status": state.get("status", ""),
+                        "error_message": str(e)
+                    }
+                    self._save_state(new_state)
+                    return new_state
+            return run_node
+        
+        def stop_on_budget(router):
+            """Encerra o grafo se o nó anterior esgotou o orçamento."""
+            def route(state: AgentState) -> str:
+                if state.get("status") == "budget_exceeded":
+                    logging.error("🔀 Rota: → END (orçamento esgotado)")
+                    return END
+                return router(state)
+            return route
+        
         def plan_task(state: AgentState) -> AgentState:
             logging.info("=" * 70)
             logging.info("🧠 FASE 1: PLANNER - Gerando plano de sub-requisitos TDD")
             logging.info("=" * 70)
             
-            plan = generate_plan(state["specification"])
+            streaming = False
+            if Config.PLANNER_STREAMING:
+                # O ciclo TDD começa na primeira etapa; as demais chegam em segundo plano
+                stream = StreamingPlan(state["specification"]).start()
+                if stream.wait_for(1):
+                    self.plan_stream = stream
+                    plan, dependencies = stream.snapshot()
+                    streaming = not stream.done
+                else:
+                    logging.warning("⚠️ Planner em streaming não produziu etapas; gerando plano completo.")
+                    plan, dependencies = generate_plan_graph(state["specification"])
+            else:
+                plan, dependencies = generate_plan_graph(state["specification"])
             
             if not plan:
                 logging.error("❌ Planner falhou ao gerar o plano.")
                 return {**state, "status": "plan_failed", "plan": []}
             
-            logging.info(f"✅ Plano TDD gerado com {len(plan)} sub-requisitos:")
-            for idx, step in enumerate(plan, 1):
-                logging.info(f"  {idx}. {step}")
+            if streaming:
+                logging.info(f"✅ Primeira(s) etapa(s) do plano recebida(s); o restante chega em streaming:")
+            else:
+                logging.info(f"✅ Plano TDD gerado com {len(plan)} sub-requisitos:")
+            for idx, (step, deps) in enumerate(zip(plan, dependencies), 1):
+                after = f" (depende de {', '.join(str(d + 1) for d in deps)})" if deps else ""
+                logging.info(f"  {idx}. {step}{after}")
             
             new_state = {
                 **state,
                 "plan": plan,
+                "plan_dependencies": dependencies,
+                "plan_streaming": streaming,
                 "plan_index": 0,
                 "current_sub_req": plan[0],
                 "iteration": 0,
@@ -133,14 +412,36 @@ class TDDOrchestrator:
             logging.info(f"📊 Testes existentes: {len([l for l in tests_code.split('\\n') if 'def test_' in l])} funções")
             logging.info("=" * 70)
             
-            new_tests_code = generate_test_for_sub_req(
-                sub_requirement=sub_req,
-                function_name=function_name,
-                all_tests_code=tests_code,
-                feedback=feedback
-            )
+            # Passo novo (sem feedback): aproveita os testes pré-gerados, se compatíveis
+            new_tests_code = None
+            if self.test_prefetcher and not feedback:
+                new_tests_code = self.test_prefetcher.take(plan_idx, tests_code)
+            
+            try:
+                new_tests_code = new_tests_code or generate_test_for_sub_req(
+                    sub_requirement=sub_req,
+                    function_name=function_name,
+                    all_tests_code=tests_code,
+                    feedback=feedback,
+                    # Testes que não falham no RED ou reprovam no pre-flight contam como falhas repetidas
+                    model=select_model(
+                        "tester",
+                        failures=state.get("red_attempts", 0) + state.get("preflight_attempts", 0)
+                    )
+                )
+            except GenerationFailed as e:
+                # Sem testes anteriores válidos para manter: encerra com status próprio
+                logging.error(f"❌ Tester não gerou testes válidos: {e}")
+                new_state = {**state, "status": "tester_failed", "error_message": str(e)}
+                self._save_state(new_state)
+                return new_state
+            
+            if Config.TEST_DEDUP_ENABLED:
+                new_tests_code, duplicates = remove_duplicate_tests(tests_code, new_tests_code)
+                if duplicates:
+                    logging.info(f"🧹 Testes duplicados descartados (mesmas verificações já na suíte): {duplicates}")
             
-            test_path = os.path.join(Config.WORKSPACE_PATH, Config.TEST_FILE)
+            test_path = os.path.join(self.workspace_path, Config.TEST_FILE)
             with open(test_path, "w", encoding="utf-8") as f:
                 f.write(new_tests_code)
             
@@ -151,7 +452,8 @@ class TDDOrchestrator:
                 **state,
                 "tests_code": new_tests_code,
                 "feedback": "",
-                "status": "test_written"
+                "status": "test_written",
+                "phase": "red"
             }
             self._save_state(new_state)
             return new_state
@@ -170,10 +472,33 @@ class TDDOrchestrator:
             logging.info(f"🔄 Tentativa RED: {red_attempts + 1}/3")
             logging.info("=" * 70)
             
-            output = run_pytest()
+            # Com uma implementação GREEN anterior, a cobertura mostra se o novo teste exercita código novo
+            use_coverage = Config.RED_COVERAGE_SKIP and bool(state.get("last_green_code"))
+            coverage = {}
+            if use_coverage:
+                output, coverage = run_pytest_with_coverage(
+                    per_test_timeout=state.get("per_test_timeout", self.per_test_timeout),
+                    spill_path=self._runner_spill_path(),
+                    workspace=self.workspace_path
+                )
+            else:
+                output = run_pytest(
+                    per_test_timeout=state.get("per_test_timeout", self.per_test_timeout),
+                    spill_path=self._runner_spill_path(),
+                    workspace=self.workspace_path
+                )
             logging.info(f"📊 Resultado pytest:\n{output}")
             
+            if is_runner_error(output):
+                # Falha do runner não é um teste falhando: não confirma o RED
+                logging.error(f"❌ Runner não executou os testes: {output}")
+                new_state = {**state, "status": "runner_error", "error_message": output}
+                self._save_state(new_state)
+                return new_state
+            
             has_failures = "failed" in output.lower() or "error" in output.lower()
+            results = parse_test_results(output)
+            new_tests = [t for t in results if t not in state.get("last_green_passed", [])]
             
             if has_failures:
                 logging.info("✅ 🔴 RED confirmado! O novo teste falha como esperado.")
@@ -197,8 +522,26 @@ class TDDOrchestrator:
                 
                 new_red_attempts = red_attempts + 1
                 
+                # Testes novos passam exercitando só código já coberto: sub-requisito já atendido
+                passed = {t for t, outcome in results.items() if outcome == "PASSED"}
+                if coverage and covered_by_existing(coverage, new_tests, passed):
+                    logging.info("=" * 70)
+                    logging.info(f"✅ Sub-requisito [{plan_idx + 1}] já atendido pela implementação atual")
+                    logging.info(f"📈 Testes novos {new_tests} só exercitam linhas/arcos já cobertos")
+                    logging.info("⏭️ Pulando Developer e GREEN")
+                    logging.info("=" * 70)
+                    new_state = {
+                        **state,
+                        "status": "already_satisfied",
+                        "feedback": "",
+                        "iteration": 0,
+                        "red_attempts": 0,
+                        "last_green_code": state.get("implementation_code", ""),
+                        "last_green_passed": [t for t, outcome in results.items() if outcome == "PASSED"]
+                    }
+                
                 # ⚠️ PROTEÇÃO: Após 3 tentativas no RED sem falhas
-                if new_red_attempts >= 3:
+                elif new_red_attempts >= 3:
                     logging.warning("=" * 70)
                     logging.warning(f"⚠️ 3 TENTATIVAS NO RED SEM FALHAS DETECTADAS")
                     logging.warning("⚠️ Comportamento já implementado ou teste inadequado")
@@ -229,7 +572,7 @@ class TDDOrchestrator:
                     }
                     
                 # Primeira ou segunda tentativa no primeiro sub-requisito
-                elif plan_idx == 0 and new_red_attempts < 3:
+                elif plan_idx == 0 and not state.get("last_green_code") and new_red_attempts < 3:
                     feedback = (
                         f"⚠️ Tentativa {new_red_attempts}/3 no RED:\n\n"
                         f"O teste passou sem implementação.\n"
@@ -264,6 +607,18 @@ class TDDOrchestrator:
                         "red_attempts": 0  # ⚠️ Reset contador
                     }
             
+            # RED confirmado: testes dos próximos passos são gerados enquanto o Developer trabalha
+            if self.test_prefetcher and new_state["status"] == "red_confirmed":
+                # Próximo lote independente roda em ramos, que geram os próprios testes
+                next_batch = self._independent_batch(state, plan_idx + 1)
+                self.test_prefetcher.schedule(
+                    plan=state.get("plan", []),
+                    start_index=plan_idx + 1,
+                    function_name=state.get("function_name", "process"),
+                    base_tests=state.get("tests_code", ""),
+                    skip=next_batch if len(next_batch) > 1 else ()
+                )
+            
             self._save_state(new_state)
             return new_state
             
@@ -284,15 +639,41 @@ class TDDOrchestrator:
             tests_code = state["tests_code"]
             feedback = state["feedback"]
             previous_code = state.get("implementation_code", "")
+            # Loop travado (mesma falha repetida) também sobe o tier do modelo
+            model = select_model("developer", iteration=iteration, stuck=state.get("stuck_escalations", 0))
+            # Saída do pytest do candidato especulativo vencedor (poupa a reexecução no RUNNER GREEN)
+            verified_output = None
             
-            new_code = generate_code_incremental(
-                test_code=tests_code,
-                function_name=function_name,
-                feedback=feedback,
-                previous_code=previous_code
-            )
+            try:
+                if Config.DEVELOPER_CANDIDATES > 1:
+                    # Modo especulativo: K candidatos em paralelo, vence o primeiro GREEN
+                    temperatures = Config.DEVELOPER_CANDIDATE_TEMPERATURES
+                    logging.info(f"🔀 Gerando {Config.DEVELOPER_CANDIDATES} candidatos em paralelo")
+                    new_code, verified_output = generate_speculative_code(
+                        test_code=tests_code,
+                        function_name=function_name,
+                        feedback=feedback,
+                        previous_code=previous_code,
+                        model=model,
+                        temperatures=[temperatures[i % len(temperatures)] for i in range(Config.DEVELOPER_CANDIDATES)],
+                        per_test_timeout=state.get("per_test_timeout", self.per_test_timeout)
+                    )
+                else:
+                    new_code = generate_code_incremental(
+                        test_code=tests_code,
+                        function_name=function_name,
+                        feedback=feedback,
+                        previous_code=previous_code,
+                        model=model
+                    )
+            except GenerationFailed as e:
+                # Sem código anterior válido para manter: encerra com status próprio
+                logging.error(f"❌ Developer não gerou código válido: {e}")
+                new_state = {**state, "iteration": iteration, "status": "developer_failed", "error_message": str(e)}
+                self._save_state(new_state)
+                return new_state
             
-            impl_path = os.path.join(Config.WORKSPACE_PATH, f"{Config.IMPLEMENTATION_MODULE}.py")
+            impl_path = os.path.join(self.workspace_path, f"{Config.IMPLEMENTATION_MODULE}.py")
             with open(impl_path, "w", encoding="utf-8") as f:
                 f.write(new_code)
             
@@ -303,11 +684,56 @@ class TDDOrchestrator:
                 "implementation_code": new_code,
                 "iteration": iteration,
                 "feedback": "",
-                "status": "code_written"
+                "status": "code_written",
+                "phase": "green",
+                "verified_output": verified_output or ""
             }
             self._save_state(new_state)
             return new_state
 
+        def execute_preflight(state: AgentState) -> AgentState:
+            is_green_phase = state.get("phase") == "green"
+            tests_code = state.get("tests_code", "")
+            
+            logging.info("=" * 70)
+            logging.info(f"🛫 PRE-FLIGHT ({'GREEN' if is_green_phase else 'RED'}) - Checagem estática antes do pytest")
+            logging.info("=" * 70)
+            
+            problems = check_tests(tests_code)
+            if is_green_phase and not problems:
+                problems = check_implementation(
+                    tests_code=tests_code,
+                    implementation_code=state.get("implementation_code", ""),
+                    function_name=state.get("function_name", "")
+                )
+            
+            if not problems:
+                logging.info("✅ Pre-flight OK")
+                new_state = {
+                    **state,
+                    "status": "preflight_green_ok" if is_green_phase else "preflight_red_ok",
+                    "preflight_attempts": 0
+                }
+                self._save_state(new_state)
+                return new_state
+            
+            feedback = format_preflight_report(problems)
+            for line in feedback.split('\n'):
+                logging.warning(line)
+            
+            if is_green_phase:
+                iteration = state.get("iteration", 0)
+                max_retries = state.get("max_retries", self.max_retries)
+                status = "max_retries_exceeded" if iteration >= max_retries else "preflight_failed"
+                new_state = {**state, "status": status, "feedback": feedback}
+            else:
+                attempts = state.get("preflight_attempts", 0) + 1
+                status = "preflight_tests_invalid" if attempts >= Config.PREFLIGHT_MAX_TEST_ATTEMPTS else "invalid_test"
+                new_state = {**state, "status": status, "feedback": feedback, "preflight_attempts": attempts}
+            
+            self._save_state(new_state)
+            return new_state
+
         def execute_runner_green(state: AgentState) -> AgentState:
             sub_req = state["current_sub_req"]
             iteration = state.get("iteration", 0)
@@ -320,9 +746,25 @@ class TDDOrchestrator:
             logging.info(f"🎯 Sub-requisito [{plan_idx + 1}]: '{sub_req}'")
             logging.info("=" * 70)
             
-            output = run_pytest()
+            output = state.get("verified_output")
+            if output:
+                logging.info("♻️ Reaproveitando a execução do candidato especulativo vencedor (mesmo código e testes)")
+                state = {**state, "verified_output": ""}
+            else:
+                output = run_pytest(
+                    per_test_timeout=state.get("per_test_timeout", self.per_test_timeout),
+                    spill_path=self._runner_spill_path(),
+                    workspace=self.workspace_path
+                )
             logging.info(f"📊 Resultado pytest:\n{output}")
             
+            if is_runner_error(output):
+                # Falha do runner não é regressão nem falha do código: não aciona Reviewer/rollback
+                logging.error(f"❌ Runner não executou os testes: {output}")
+                new_state = {**state, "status": "runner_error", "error_message": output}
+                self._save_state(new_state)
+                return new_state
+            
             all_passed = "passed" in output.lower() and "failed" not in output.lower() and "error" not in output.lower()
             
             if all_passed:
@@ -330,10 +772,86 @@ class TDDOrchestrator:
                 logging.info("✅✅✅ GREEN COMPLETO! TODOS OS TESTES PASSARAM! ✅✅✅")
                 logging.info(f"✅ Sub-requisito [{plan_idx + 1}] completado com sucesso!")
                 logging.info("=" * 70)
-                new_state = {**state, "status": "green_passed", "feedback": "", "iteration": 0}
+                # Último GREEN: base para detectar (e desfazer) regressões nos próximos passos
+                passed = [t for t, outcome in parse_test_results(output).items() if outcome == "PASSED"]
+                new_state = {
+                    **state,
+                    "status": "green_passed",
+                    "feedback": "",
+                    "iteration": 0,
+                    "failure_fingerprints": [],
+                    "stuck_escalations": 0,
+                    "last_green_code": state.get("implementation_code", ""),
+                    "last_green_passed": passed
+                }
             else:
-                # ⚠️ NOVO: Após 5 iterações, volta ao Tester para revisar testes
-                if iteration >= 5 and iteration < max_retries:
+                # Fingerprint da falha: mesma falha repetida ou oscilando = loop travado
+                fingerprint = failure_fingerprint(output)
+                history = state.get("failure_fingerprints", [])
+                loop = detect_stuck_loop(history, fingerprint)
+                stuck_escalations = state.get("stuck_escalations", 0) + (1 if loop else 0)
+                history = (history + [fingerprint])[-Config.FAILURE_FINGERPRINT_HISTORY:]
+                # Loop detectado: o Reviewer vai direto para a análise ARCHITECTURAL
+                feedback_mode = "ARCHITECTURAL" if stuck_escalations else None
+                state = {**state, "failure_fingerprints": history, "stuck_escalations": stuck_escalations}
+                
+                if loop:
+                    logging.warning(
+                        f"🔁 Loop detectado ({loop}): fingerprint {fingerprint} já visto "
+                        f"neste sub-requisito (escalonamento {stuck_escalations})"
+                    )
+                
+                # Regressão: testes que passavam no último GREEN agora falham
+                results = parse_test_results(output)
+                last_green_code = state.get("last_green_code", "")
+                regressions = [
+                    t for t in state.get("last_green_passed", [])
+                    if results.get(t) in ("FAILED", "ERROR")
+                ]
+                can_rollback = (
+                    regressions and last_green_code
+                    and last_green_code != state.get("implementation_code", "")
+                )
+                
+                # ⚠️ Após 5 iterações (ou loop persistente após a análise ARCHITECTURAL), volta ao Tester
+                stuck = stuck_escalations >= Config.STUCK_LOOP_TEST_REVIEW
+                if can_rollback and iteration < max_retries:
+                    logging.warning("=" * 70)
+                    logging.warning(f"⏪ REGRESSÃO! {len(regressions)} teste(s) que passavam no último GREEN falharam:")
+                    for test in regressions:
+                        logging.warning(f"   - {test}")
+                    logging.warning("⏪ Restaurando a implementação do último GREEN...")
+                    logging.warning("=" * 70)
+                    
+                    impl_path = os.path.join(self.workspace_path, f"{Config.IMPLEMENTATION_MODULE}.py")
+                    with open(impl_path, "w", encoding="utf-8") as f:
+                        f.write(last_green_code)
+                    
+                    # Re-prompt apenas com os testes novos (sem chamada ao Reviewer)
+                    messages = failure_messages(output)
+                    new_failures = [
+                        t for t, outcome in results.items()
+                        if outcome in ("FAILED", "ERROR") and t not in regressions
+                    ]
+                    failure_lines = "\n".join(
+                        f"- {t}: {messages.get(t) or 'falhou'}" for t in new_failures
+                    ) or f"- Sub-requisito: {sub_req}"
+                    feedback = (
+                        f"⏪ ROLLBACK POR REGRESSÃO:\n\n"
+                        f"A tentativa anterior quebrou testes que já passavam "
+                        f"({', '.join(regressions)}) e foi descartada.\n"
+                        f"O CÓDIGO ANTERIOR abaixo é a última versão em que todos esses testes passavam.\n\n"
+                        f"FAÇA PASSAR APENAS:\n{failure_lines}\n\n"
+                        f"Mantenha intacto o comportamento que já funciona."
+                    )
+                    new_state = {
+                        **state,
+                        "status": "regression_rolled_back",
+                        "implementation_code": last_green_code,
+                        "feedback": feedback
+                    }
+                    
+                elif (iteration >= 5 or stuck) and iteration < max_retries:
                     logging.warning("=" * 70)
                     logging.warning(f"⚠️ REVISÃO DE TESTES NECESSÁRIA!")
                     logging.warning(f"🔄 Tentativa {iteration}/{max_retries} - Falhas persistentes")
@@ -347,7 +865,8 @@ class TDDOrchestrator:
                         iteration=iteration,
                         max_retries=max_retries,
                         current_code=state.get("implementation_code", ""),
-                        test_code=state.get("tests_code", "")
+                        test_code=state.get("tests_code", ""),
+                        feedback_mode=feedback_mode
                     )
                     
                     # Adiciona contexto específico para revisão de testes
@@ -374,7 +893,14 @@ class TDDOrchestrator:
                         logging.info(line)
                     logging.info("=" * 70)
 
-                    new_state = {**state, "status": "test_review_needed", "feedback": test_review_feedback}
+                    # Testes revisados geram falhas novas: histórico recomeça
+                    new_state = {
+                        **state,
+                        "status": "test_review_needed",
+                        "feedback": test_review_feedback,
+                        "failure_fingerprints": [],
+                        "stuck_escalations": 0
+                    }
                     
                 elif iteration >= max_retries:
                     logging.error("=" * 70)
@@ -389,7 +915,8 @@ class TDDOrchestrator:
                         iteration=iteration,
                         max_retries=max_retries,
                         current_code=state.get("implementation_code", ""),
-                        test_code=state.get("tests_code", "")
+                        test_code=state.get("tests_code", ""),
+                        feedback_mode=feedback_mode
                     )
 
                     logging.info("=" * 70)
@@ -414,7 +941,8 @@ class TDDOrchestrator:
                         iteration=iteration,
                         max_retries=max_retries,
                         current_code=state.get("implementation_code", ""),
-                        test_code=state.get("tests_code", "")
+                        test_code=state.get("tests_code", ""),
+                        feedback_mode=feedback_mode
                     )
 
                     logging.info("=" * 70)
@@ -430,6 +958,94 @@ class TDDOrchestrator:
             return new_state
 
 
+        def execute_performance_check(state: AgentState) -> AgentState:
+            plan_idx = state.get("plan_index", 0)
+            target = self._performance_target(state)
+            attempts = state.get("perf_attempts", 0)
+            
+            logging.info("=" * 70)
+            logging.info(f"⏱️ FASE 5b: DESEMPENHO - Sub-requisito [{plan_idx + 1}] (alvo {parse_complexity_target(target)[0]})")
+            logging.info("=" * 70)
+            
+            ok, report = check_complexity(
+                implementation_code=state.get("implementation_code", ""),
+                function_name=state.get("function_name", "process"),
+                tests_code=state.get("tests_code", ""),
+                target=target
+            )
+            
+            if ok is False and attempts < Config.PERF_CHECK_MAX_ATTEMPTS:
+                logging.warning(f"🐢 Implementação correta, mas lenta (correção {attempts + 1}/{Config.PERF_CHECK_MAX_ATTEMPTS})")
+                logging.warning(report)
+                new_state = {
+                    **state,
+                    "status": "performance_failed",
+                    "feedback": report,
+                    "perf_attempts": attempts + 1
+                }
+            else:
+                if ok:
+                    logging.info(f"✅ Desempenho dentro do alvo. {report}")
+                elif ok is None:
+                    logging.info(f"ℹ️ Verificação de desempenho inconclusiva: {report}")
+                else:
+                    logging.warning(f"⚠️ Desempenho ainda abaixo do alvo após {attempts} correção(ões); seguindo")
+                new_state = {**state, "status": "performance_ok", "perf_attempts": 0}
+            
+            self._save_state(new_state)
+            return new_state
+
+        def execute_refactor(state: AgentState) -> AgentState:
+            function_name = state.get("function_name", "process")
+            tests_code = state.get("tests_code", "")
+            current_code = state.get("implementation_code", "")
+            
+            logging.info("=" * 70)
+            logging.info("🔵 FASE 7: REFACTOR - Otimizando a implementação GREEN")
+            logging.info("=" * 70)
+            
+            new_state = {**state, "refactor_due": False}
+            candidate = refactor_code(
+                test_code=tests_code,
+                function_name=function_name,
+                current_code=current_code,
+                specification=state.get("specification", "")
+            )
+            if candidate.strip() == current_code.strip():
+                logging.info("ℹ️ Refactor não propôs mudanças")
+                self._save_state(new_state)
+                return new_state
+            
+            problems = check_implementation(tests_code, candidate, function_name)
+            output = "" if problems else run_pytest(
+                per_test_timeout=state.get("per_test_timeout", self.per_test_timeout),
+                files={Config.TEST_FILE: tests_code, f"{Config.IMPLEMENTATION_MODULE}.py": candidate}
+            )
+            green = not problems and "passed" in output.lower() and "failed" not in output.lower() and "error" not in output.lower()
+            if not green:
+                logging.warning("↩️ Refactor revertido: a suíte completa não passou com a nova versão")
+                self._save_state(new_state)
+                return new_state
+            
+            faster, report = compare_performance(current_code, candidate, function_name, tests_code)
+            if faster is not True:
+                # Benchmark inconclusivo também reverte: só aceita com desempenho comprovado
+                reason = "regressão de desempenho" if faster is False else "desempenho não comprovado"
+                logging.warning(f"↩️ Refactor revertido: {reason}\n{report}")
+                self._save_state(new_state)
+                return new_state
+            
+            with open(os.path.join(self.workspace_path, f"{Config.IMPLEMENTATION_MODULE}.py"), "w", encoding="utf-8") as f:
+                f.write(candidate)
+            logging.info(f"✅ Refactor aceito (suíte verde, sem regressão de desempenho)\n{report}")
+            new_state = {
+                **new_state,
+                "implementation_code": candidate,
+                "last_green_code": candidate
+            }
+            self._save_state(new_state)
+            return new_state
+
         def execute_progress_evaluator(state: AgentState) -> AgentState:
             logging.info("=" * 70)
             logging.info("♻️  FASE 6: PROGRESS EVALUATOR - Verificando progresso atual do plano TDD")
@@ -437,12 +1053,19 @@ class TDDOrchestrator:
             
             current_index = state["plan_index"]
             next_index = current_index + 1
+            # Planner em streaming: espera a próxima etapa (se ainda não chegou) antes de decidir
+            state = self._refresh_streamed_plan(state, next_index + 1)
             plan = state["plan"]
             total = len(plan)
             
             logging.info(f"✅ Sub-requisito [{current_index + 1}/{total}] COMPLETO!")
             
-            if next_index < total:
+            batch = self._independent_batch(state, next_index) if next_index < total else []
+            if len(batch) > 1:
+                logging.info(f"🌿 Sub-requisitos independentes {[i + 1 for i in batch]}: executando em paralelo")
+                logging.info("=" * 70)
+                new_state = {**state, "status": "branches_ready", "branch_steps": batch, "feedback": "", "iteration": 0}
+            elif next_index < total:
                 next_req = plan[next_index]
                 logging.info(f"⏭️  Avançando para o próximo sub-requisito [{next_index + 1}/{total}]")
                 logging.info(f"📝 Próximo: '{next_req}'")
@@ -456,6 +1079,11 @@ class TDDOrchestrator:
                     "feedback": "",
                     "iteration": 0
                 }
+            elif state.get("plan_streaming"):
+                # O Planner falhou antes de enviar todas as etapas: não há como saber se o plano acabou
+                logging.error("❌ Plano em streaming interrompido por erro; execução encerrada com o plano incompleto.")
+                logging.error("💾 Estado persistido: run(resume=True) gera novamente as etapas restantes")
+                new_state = {**state, "status": "plan_incomplete"}
             else:
                 logging.info("=" * 70)
                 logging.info("🎉 🎉 🎉 PLANO COMPLETO! 🎉 🎉 🎉")
@@ -463,12 +1091,168 @@ class TDDOrchestrator:
                 logging.info("✅ Todos os testes passam cumulativamente!")
                 logging.info("=" * 70)
                 new_state = {**state, "status": "plan_complete"}
+                if self.minimize_suite:
+                    new_state = self._minimize_suite(new_state)
+            
+            # REFACTOR ao fim do plano ou a cada REFACTOR_EVERY_STEPS sub-requisitos concluídos
+            every = Config.REFACTOR_EVERY_STEPS
+            new_state["refactor_due"] = self.refactor and (
+                new_state["status"] == "plan_complete" or bool(every and next_index % every == 0)
+            )
             
             self._save_state(new_state)
             return new_state
 
+        def execute_branches(state: AgentState) -> AgentState:
+            plan = state["plan"]
+            steps = state["branch_steps"]
+            base_tests = state.get("tests_code", "")
+            
+            logging.info("=" * 70)
+            logging.info(f"🌿 BRANCHES - {len(steps)} sub-requisitos em workspaces separados")
+            for index in steps:
+                logging.info(f"  {index + 1}. {plan[index]}")
+            logging.info("=" * 70)
+            
+            # Rascunhos do prefetch foram gerados sobre a suíte anterior aos ramos
+            if self.test_prefetcher:
+                self.test_prefetcher.discard()
+            
+            # Saldo da tarefa dividido entre os ramos; o tempo de parede corre em paralelo e não é dividido
+            self.task_context.budget.check()
+            branch_budget = {
+                resource: left if resource == "wall_seconds" else left / len(steps)
+                for resource, left in self.task_context.budget.remaining().items()
+            }
+            
+            # Cada ramo herda o contexto da tarefa (escalonador) e roda como tarefa filha
+            with ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix="branch") as pool:
+                futures = {
+                    index: pool.submit(contextvars.copy_context().run, self._run_branch, state, index, branch_budget)
+                    for index in steps
+                }
+            results = {}
+            for index, future in futures.items():
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    logging.error(f"❌ Ramo [{index + 1}] falhou: {e}")
+                    results[index] = {"status": "error", "error_message": str(e)}
+            
+            # Consumo dos ramos conta no orçamento da tarefa
+            for result in results.values():
+                usage = result.get("budget", {}).get("usage", {})
+                for resource in ("tokens", "llm_calls", "runner_runs"):
+                    self.task_context.budget.record(resource, usage.get(resource, 0))
+            
+            def run_sequentially(reason: str) -> AgentState:
+                logging.warning(f"⚠️ {reason}; executando os sub-requisitos {[i + 1 for i in steps]} em sequência")
+                new_state = {
+                    **state,
+                    "status": "next_req",
+                    "plan_index": steps[0],
+                    "current_sub_req": plan[steps[0]],
+                    "sequential_until": steps[-1] + 1
+                }
+                self._save_state(new_state)
+                return new_state
+            
+            failed = [index + 1 for index in steps if results[index].get("status") != "plan_complete"]
+            if failed:
+                return run_sequentially(f"Ramos {failed} não completaram")
+            
+            # JOIN 1: testes novos de cada ramo anexados ao arquivo base
+            merged_tests = base_tests
+            for index in steps:
+                merged = merge_prefetched_tests(base_tests, results[index].get("tests_code", ""), merged_tests)
+                if merged is None:
+                    return run_sequentially(f"Testes do ramo [{index + 1}] conflitam com os demais")
+                merged_tests = merged
+            
+            test_path = os.path.join(self.workspace_path, Config.TEST_FILE)
+            with open(test_path, "w", encoding="utf-8") as f:
+                f.write(merged_tests)
+            
+            # JOIN 2: suíte completa contra a implementação de cada ramo
+            module_file = f"{Config.IMPLEMENTATION_MODULE}.py"
+            candidates = list(dict.fromkeys(results[index].get("implementation_code", "") for index in steps))
+            best_code, best_passed = candidates[0], -1
+            for code in candidates:
+                output = run_pytest(
+                    per_test_timeout=state.get("per_test_timeout", self.per_test_timeout),
+                    files={Config.TEST_FILE: merged_tests, module_file: code}
+                )
+                results_by_test = parse_test_results(output)
+                passed = [t for t, outcome in results_by_test.items() if outcome == "PASSED"]
+                if "passed" in output.lower() and "failed" not in output.lower() and "error" not in output.lower():
+                    logging.info("✅ Join GREEN: uma implementação de ramo passa na suíte completa")
+                    impl_path = os.path.join(self.workspace_path, module_file)
+                    with open(impl_path, "w", encoding="utf-8") as f:
+                        f.write(code)
+                    new_state = {
+                        **state,
+                        "status": "green_passed",
+                        "tests_code": merged_tests,
+                        "implementation_code": code,
+                        "plan_index": steps[-1],
+                        "current_sub_req": plan[steps[-1]],
+                        "feedback": "",
+                        "iteration": 0,
+                        "failure_fingerprints": [],
+                        "stuck_escalations": 0,
+                        "last_green_code": code,
+                        "last_green_passed": passed
+                    }
+                    self._save_state(new_state)
+                    return new_state
+                if len(passed) > best_passed:
+                    best_code, best_passed = code, len(passed)
+            
+            # Nenhum ramo cobre tudo: o Developer combina as implementações
+            logging.warning("⚠️ Join: nenhuma implementação passa na suíte completa; Developer vai combiná-las")
+            impl_path = os.path.join(self.workspace_path, module_file)
+            with open(impl_path, "w", encoding="utf-8") as f:
+                f.write(best_code)
+            branch_codes = "\n\n".join(
+                f"RAMO [{index + 1}] - {plan[index]}:\n```python\n{results[index].get('implementation_code', '')}\n```"
+                for index in steps
+            )
+            feedback = (
+                f"🌿 JOIN DE RAMOS PARALELOS:\n\n"
+                f"Os sub-requisitos abaixo foram implementados em paralelo, cada um passando nos próprios testes.\n"
+                f"Nenhuma das implementações passa sozinha na suíte completa.\n\n"
+                f"{branch_codes}\n\n"
+                f"AÇÃO REQUERIDA:\n"
+                f"Combine as implementações em uma única função que faça TODOS os testes passarem."
+            )
+            new_state = {
+                **state,
+                "status": "red_confirmed",
+                "tests_code": merged_tests,
+                "implementation_code": best_code,
+                "plan_index": steps[-1],
+                "current_sub_req": plan[steps[-1]],
+                "feedback": feedback,
+                "iteration": 0
+            }
+            self._save_state(new_state)
+            return new_state
+
         # ==================== ROTAS DO GRAFO ====================
         
+        def route_from_start(state: AgentState) -> str:
+            if state.get("status") == "branch_ready":
+                logging.info("🔀 Rota: START → TESTER (ramo paralelo do plano)")
+                return "execute_tester"
+            if state.get("status") == "plan_incomplete":
+                logging.info("🔀 Rota: START → PROGRESS_EVALUATOR (gerando as etapas restantes do plano)")
+                return "execute_progress_evaluator"
+            resume_node = state.get("resume_node")
+            if state.get("status") == "budget_exceeded" and resume_node:
+                logging.info(f"🔀 Rota: START → {resume_node} (retomando após orçamento esgotado)")
+                return resume_node
+            return "plan_task"
+        
         def route_after_planner(state: AgentState) -> str:
             status = state.get("status")
             has_plan = state.get("plan") and len(state.get("plan", [])) > 0
@@ -481,8 +1265,11 @@ class TDDOrchestrator:
                 return END
 
         def route_after_tester(state: AgentState) -> str:
-            logging.info("🔀 Rota: TESTER → RUNNER_RED")
-            return "execute_runner_red"
+            if state.get("status") == "tester_failed":
+                logging.error("🔀 Rota: TESTER → END (nenhum teste válido gerado)")
+                return END
+            logging.info("🔀 Rota: TESTER → PRE-FLIGHT")
+            return "execute_preflight"
         
         def route_after_red(state: AgentState) -> str:
             status = state.get("status")
@@ -493,18 +1280,46 @@ class TDDOrchestrator:
             elif status == "invalid_test":
                 logging.info("🔀 Rota: RUNNER_RED → TESTER (corrigir teste)")
                 return "execute_tester"
+            elif status == "already_satisfied":
+                logging.info("🔀 Rota: RUNNER_RED → PROGRESS EVALUATOR (sub-requisito já atendido)")
+                return "execute_progress_evaluator"
             else:
                 logging.error(f"🔀 Rota: RUNNER_RED → END (status: {status})")
                 return END
         
         def route_after_developer(state: AgentState) -> str:
-            logging.info("🔀 Rota: DEVELOPER → RUNNER_GREEN")
-            return "execute_runner_green"
+            if state.get("status") == "developer_failed":
+                logging.error("🔀 Rota: DEVELOPER → END (nenhum código válido gerado)")
+                return END
+            logging.info("🔀 Rota: DEVELOPER → PRE-FLIGHT")
+            return "execute_preflight"
+        
+        def route_after_preflight(state: AgentState) -> str:
+            status = state.get("status")
+            
+            if status == "preflight_red_ok":
+                logging.info("🔀 Rota: PRE-FLIGHT → RUNNER_RED")
+                return "execute_runner_red"
+            elif status == "preflight_green_ok":
+                logging.info("🔀 Rota: PRE-FLIGHT → RUNNER_GREEN")
+                return "execute_runner_green"
+            elif status == "invalid_test":
+                logging.info("🔀 Rota: PRE-FLIGHT → TESTER (corrigir teste)")
+                return "execute_tester"
+            elif status == "preflight_failed":
+                logging.info("🔀 Rota: PRE-FLIGHT → DEVELOPER (corrigir código)")
+                return "execute_developer"
+            else:
+                logging.error(f"🔀 Rota: PRE-FLIGHT → END (status: {status})")
+                return END
         
         def route_after_green(state: AgentState) -> str:
             status = state.get("status")
             
-            if status == "green_passed":
+            if status == "green_passed" and self._performance_target(state):
+                logging.info("🔀 Rota: RUNNER_GREEN → DESEMPENHO (testes passaram!)")
+                return "execute_performance_check"
+            elif status == "green_passed":
                 logging.info("🔀 Rota: RUNNER_GREEN → PROGRESS_EVALUATOR (testes passaram!)")
                 return "execute_progress_evaluator"
             elif status == "test_review_needed":
@@ -513,6 +1328,9 @@ class TDDOrchestrator:
             elif status == "green_failed":
                 logging.info("🔀 Rota: RUNNER_GREEN → DEVELOPER (corrigir código)")
                 return "execute_developer"
+            elif status == "regression_rolled_back":
+                logging.info("🔀 Rota: RUNNER_GREEN → DEVELOPER (regressão desfeita, foco no teste novo)")
+                return "execute_developer"
             elif status == "max_retries_exceeded":
                 logging.error("🔀 Rota: RUNNER_GREEN → END (excedeu tentativas)")
                 return END
@@ -520,12 +1338,31 @@ class TDDOrchestrator:
                 logging.error(f"🔀 Rota: RUNNER_GREEN → END (status: {status})")
                 return END
 
+        def route_after_performance(state: AgentState) -> str:
+            status = state.get("status")
+            
+            if status == "performance_ok":
+                logging.info("🔀 Rota: DESEMPENHO → PROGRESS_EVALUATOR")
+                return "execute_progress_evaluator"
+            elif status == "performance_failed":
+                logging.info("🔀 Rota: DESEMPENHO → DEVELOPER (otimizar)")
+                return "execute_developer"
+            else:
+                logging.error(f"🔀 Rota: DESEMPENHO → END (status: {status})")
+                return END
+
         def route_after_progress_evaluator(state: AgentState) -> str:
             status = state.get("status")
             
-            if status == "next_req":
+            if state.get("refactor_due"):
+                logging.info("🔀 Rota: PROGRESS_EVALUATOR → REFACTOR")
+                return "execute_refactor"
+            elif status == "next_req":
                 logging.info("🔀 Rota: PROGRESS_EVALUATOR → TESTER (próximo sub-requisito)")
                 return "execute_tester"
+            elif status == "branches_ready":
+                logging.info("🔀 Rota: PROGRESS_EVALUATOR → BRANCHES (ramos paralelos)")
+                return "execute_branches"
             elif status == "plan_complete":
                 logging.info("🔀 Rota: PROGRESS_EVALUATOR → END (plano completo!)")
                 return END
@@ -533,25 +1370,53 @@ class TDDOrchestrator:
                 logging.error(f"🔀 Rota: PROGRESS_EVALUATOR → END (status: {status})")
                 return END
 
+        def route_after_branches(state: AgentState) -> str:
+            status = state.get("status")
+            
+            if status == "green_passed" and self._performance_target(state):
+                logging.info("🔀 Rota: BRANCHES → DESEMPENHO (join GREEN)")
+                return "execute_performance_check"
+            elif status == "green_passed":
+                logging.info("🔀 Rota: BRANCHES → PROGRESS_EVALUATOR (join GREEN)")
+                return "execute_progress_evaluator"
+            elif status == "red_confirmed":
+                logging.info("🔀 Rota: BRANCHES → DEVELOPER (reconciliar implementações)")
+                return "execute_developer"
+            elif status == "next_req":
+                logging.info("🔀 Rota: BRANCHES → TESTER (ramos descartados, execução sequencial)")
+                return "execute_tester"
+            else:
+                logging.error(f"🔀 Rota: BRANCHES → END (status: {status})")
+                return END
+
         # ==================== CONSTRUÇÃO DO GRAFO ====================
         
         workflow = StateGraph(AgentState)
         
-        workflow.add_node("plan_task", plan_task)
-        workflow.add_node("execute_tester", execute_tester)
-        workflow.add_node("execute_runner_red", execute_runner_red)
-        workflow.add_node("execute_developer", execute_developer)
-        workflow.add_node("execute_runner_green", execute_runner_green)
-        workflow.add_node("execute_progress_evaluator", execute_progress_evaluator)
+        workflow.add_node("plan_task", guarded("plan_task", plan_task))
+        workflow.add_node("execute_tester", guarded("execute_tester", execute_tester))
+        workflow.add_node("execute_preflight", guarded("execute_preflight", execute_preflight))
+        workflow.add_node("execute_runner_red", guarded("execute_runner_red", execute_runner_red))
+        workflow.add_node("execute_developer", guarded("execute_developer", execute_developer))
+        workflow.add_node("execute_runner_green", guarded("execute_runner_green", execute_runner_green))
+        workflow.add_node("execute_performance_check", guarded("execute_performance_check", execute_performance_check))
+        workflow.add_node("execute_progress_evaluator", guarded("execute_progress_evaluator", execute_progress_evaluator))
+        workflow.add_node("execute_refactor", guarded("execute_refactor", execute_refactor))
+        workflow.add_node("execute_branches", guarded("execute_branches", execute_branches))
         
-        workflow.add_edge(START, "plan_task")
+        workflow.add_conditional_edges(START, route_from_start)
         
-        workflow.add_conditional_edges("plan_task", route_after_planner)
-        workflow.add_conditional_edges("execute_tester", route_after_tester)
-        workflow.add_conditional_edges("execute_runner_red", route_after_red)
-        workflow.add_conditional_edges("execute_developer", route_after_developer)
-        workflow.add_conditional_edges("execute_runner_green", route_after_green)
-        workflow.add_conditional_edges("execute_progress_evaluator", route_after_progress_evaluator)
+        workflow.add_conditional_edges("plan_task", stop_on_budget(route_after_planner))
+        workflow.add_conditional_edges("execute_tester", stop_on_budget(route_after_tester))
+        workflow.add_conditional_edges("execute_preflight", stop_on_budget(route_after_preflight))
+        workflow.add_conditional_edges("execute_runner_red", stop_on_budget(route_after_red))
+        workflow.add_conditional_edges("execute_developer", stop_on_budget(route_after_developer))
+        workflow.add_conditional_edges("execute_runner_green", stop_on_budget(route_after_green))
+        workflow.add_conditional_edges("execute_performance_check", stop_on_budget(route_after_performance))
+        workflow.add_conditional_edges("execute_progress_evaluator", stop_on_budget(route_after_progress_evaluator))
+        # Depois do REFACTOR, o fluxo segue como a decisão do Progress Evaluator
+        workflow.add_conditional_edges("execute_refactor", stop_on_budget(route_after_progress_evaluator))
+        workflow.add_conditional_edges("execute_branches", stop_on_budget(route_after_branches))
         
         return workflow.compile()
 
@@ -559,6 +1424,9 @@ class TDDOrchestrator:
         """
         Executa o workflow TDD incremental e cumulativo.
         
+        A tarefa é executada sob um lock exclusivo; se outro worker já a possui,
+        retorna imediatamente com status 'task_locked'.
+        
         Args:
             specification: Especificação completa do projeto (obrigatória se resume=False)
             resume: Se True, retoma do estado salvo
@@ -567,7 +1435,18 @@ class TDDOrchestrator:
         Returns:
             Estado final do workflow
         """
+        if not self._acquire_ownership():
+            logging.error(f"❌ Tarefa '{self.task_key}' já está em execução por outro worker.")
+            return {"status": "task_locked", "error_message": f"Task '{self.task_key}' is locked by another worker"}
         
+        try:
+            with task_scope(self.task_context):
+                return self._run_owned(specification, resume, function_name)
+        finally:
+            get_scheduler().forget(self.task_key)
+            self._release_ownership()
+
+    def _run_owned(self, specification: str, resume: bool, function_name: str) -> Dict[str, Any]:
         if resume:
             logging.info("🔄 RETOMANDO WORKFLOW TDD INCREMENTAL DO ESTADO SALVO")
             logging.info("🚀 " * 25)
@@ -582,6 +1461,7 @@ class TDDOrchestrator:
             self._restore_files_from_state(saved_state)
             
             initial_state = saved_state
+            self.task_context.update_progress(saved_state.get("plan", []), saved_state.get("plan_index", 0))
             
         else:
             logging.info("🚀 INICIANDO WORKFLOW TDD INCREMENTAL E CUMULATIVO")
@@ -607,15 +1487,30 @@ class TDDOrchestrator:
                 "plan_index": 0,
                 "status": "starting",
                 "max_retries": self.max_retries,
-                "red_attempts": 0 
+                "red_attempts": 0,
+                "preflight_attempts": 0,
+                "per_test_timeout": self.per_test_timeout,
+                "complexity_target": self.complexity_target or ""
             }
         
+        # Consumo anterior (de execuções interrompidas) continua contando
+        budget = TaskBudget(self.budget_limits, usage=initial_state.get("budget", {}).get("usage"))
+        self.task_context.budget = budget
+        budget.start()
+        
+        if Config.TEST_PREFETCH_DEPTH > 0:
+            self.test_prefetcher = TestPrefetcher()
+        
         final_state = None
         
         try:
             config = {"recursion_limit": 1000}
             final_state = self.graph.invoke(initial_state, config=config)
             
+        except StaleWriteError as e:
+            logging.error(f"❌ Outro worker assumiu a tarefa; execução interrompida: {e}")
+            final_state = {**initial_state, "status": "lock_lost", "error_message": str(e)}
+            
         except Exception as e:
             logging.error(f"❌ Erro crítico no workflow: {e}")
             import traceback
@@ -623,6 +1518,14 @@ class TDDOrchestrator:
             final_state = {**initial_state, "status": "error", "error_message": str(e)}
             self._save_state(final_state)
         
+        if self.test_prefetcher:
+            self.test_prefetcher.shutdown()
+            self.test_prefetcher = None
+        self.plan_stream = None
+        
+        budget.stop()
+        final_state = {**final_state, "budget": budget.snapshot()}
+        
         logging.info("\n" + "=" * 70)
         logging.info("📊 RESULTADO FINAL DO WORKFLOW TDD INCREMENTAL")
         logging.info("=" * 70)
@@ -632,28 +1535,41 @@ class TDDOrchestrator:
         if final_state.get('status') == 'plan_complete':
             completed = total
         logging.info(f"🔢 Sub-requisitos completos: {completed}/{total}")
-        logging.info(f"📄 Implementação: {Config.WORKSPACE_PATH}/{Config.IMPLEMENTATION_MODULE}.py")
-        logging.info(f"📋 Testes: {Config.WORKSPACE_PATH}/{Config.TEST_FILE}")
+        logging.info(f"📄 Implementação: {self.workspace_path}/{Config.IMPLEMENTATION_MODULE}.py")
+        logging.info(f"📋 Testes: {self.workspace_path}/{Config.TEST_FILE}")
+        usage = final_state["budget"]["usage"]
+        logging.info(
+            f"⏱️ Consumo: {usage['wall_seconds']:.1f}s, {int(usage['tokens'])} tokens, "
+            f"{int(usage['llm_calls'])} chamadas LLM, {int(usage['runner_runs'])} execuções do runner"
+        )
         logging.info("=" * 70)
         
         return final_state
     
     def continue_from_sub_req(self, sub_req_index: int) -> Dict[str, Any]:
-        saved_state = self._load_state()
-        
-        if not saved_state:
-            return {"status": "error", "error_message": "No saved state"}
-        
-        plan = saved_state.get("plan", [])
-        if sub_req_index >= len(plan):
-            return {"status": "error", "error_message": f"Invalid index {sub_req_index}"}
+        if not self._acquire_ownership():
+            return {"status": "task_locked", "error_message": f"Task '{self.task_key}' is locked by another worker"}
         
-        saved_state["plan_index"] = sub_req_index
-        saved_state["current_sub_req"] = plan[sub_req_index]
-        saved_state["status"] = "next_req"
-        saved_state["iteration"] = 0
-        saved_state["feedback"] = ""
-        
-        self._save_state(saved_state)
-        
-        return self.run(resume=True)
\ No newline at end of file
+        try:
+            saved_state = self._load_state()
+            
+            if not saved_state:
+                return {"status": "error", "error_message": "No saved state"}
+            
+            plan = saved_state.get("plan", [])
+            if sub_req_index >= len(plan):
+                return {"status": "error", "error_message": f"Invalid index {sub_req_index}"}
+            
+            saved_state["plan_index"] = sub_req_index
+            saved_state["current_sub_req"] = plan[sub_req_index]
+            saved_state["status"] = "next_req"
+            saved_state["iteration"] = 0
+            saved_state["feedback"] = ""
+            
+            # Preserva o consumo acumulado ao regravar o estado
+            self.task_context.budget = TaskBudget(self.budget_limits, usage=saved_state.get("budget", {}).get("usage"))
+            self._save_state(saved_state)
+            
+            return self.run(resume=True)
+        finally:
+            self._release_ownership()
\ No newline at end of file
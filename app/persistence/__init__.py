@@ -1,12 +1,22 @@
-from app.persistence.abstract_persistence import PersistenceStrategy, VectorPersistenceStrategy
+from app.persistence.abstract_persistence import PersistenceStrategy, VectorPersistenceStrategy, StaleWriteError
+from app.persistence.artifact_store import ArtifactStore, RedisArtifactStore, FileArtifactStore, InMemoryArtifactStore
 from app.persistence.redis_persistence import RedisPersistence
+from app.persistence.tiered_persistence import TieredRedisPersistence
 from app.persistence.memory_persistence import InMemoryPersistence
+from app.persistence.log_persistence import LogStructuredPersistence
 from app.persistence.factory import PersistenceFactory
 
 __all__ = [
     "PersistenceStrategy",
     "VectorPersistenceStrategy",
+    "StaleWriteError",
+    "ArtifactStore",
+    "RedisArtifactStore",
+    "FileArtifactStore",
+    "InMemoryArtifactStore",
     "RedisPersistence",
+    "TieredRedisPersistence",
     "InMemoryPersistence",
+    "LogStructuredPersistence",
     "PersistenceFactory",
 ]
\ No newline at end of file
@@ -1,9 +1,22 @@
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, TYPE_CHECKING
+from app.config import Config
+
+if TYPE_CHECKING:
+    from app.persistence.artifact_store import ArtifactStore
+
+class StaleWriteError(Exception):
+    """Raised when a state write carries a fencing token that is no longer current."""
+    pass
+
 
 class PersistenceStrategy(ABC):
     """Abstract base class for persistence strategies following DIP."""
     
+    # Optional content-addressed store for large state fields (see attach_artifact_store)
+    artifact_store: Optional["ArtifactStore"] = None
+    
     @abstractmethod
     def save(self, key: str, data: Dict[str, Any]) -> None:
         """Save data to the persistence layer."""
@@ -30,16 +43,24 @@ class PersistenceStrategy(ABC):
         pass
     
     # High-level methods for TDD workflow state management
-    def save_state(self, task_key: str, state: Dict[str, Any]) -> None:
+    def save_state(self, task_key: str, state: Dict[str, Any], fencing_token: Optional[int] = None) -> None:
         """
         Save TDD workflow state.
         
         Args:
             task_key: Unique identifier for the task
             state: Complete state dictionary
+            fencing_token: Token returned by acquire_task_lock. When given, the write
+                is rejected with StaleWriteError unless it is still the current token.
         """
         key = f"state:{task_key}"
-        self.save(key, state)
+        if self.artifact_store is not None:
+            # Blobs are written before the record that references them
+            state = self.artifact_store.externalize(state, Config.ARTIFACT_FIELDS, Config.ARTIFACT_MIN_BYTES)
+        if fencing_token is None:
+            self.save(key, state)
+        else:
+            self.save_fenced(task_key, key, state, fencing_token)
     
     def load_state(self, task_key: str) -> Optional[Dict[str, Any]]:
         """
@@ -54,7 +75,10 @@ class PersistenceStrategy(ABC):
         key = f"state:{task_key}"
         if not self.exists(key):
             return None
-        return self.load(key)
+        state = self.load(key)
+        if self.artifact_store is not None:
+            state = self.artifact_store.resolve(state)
+        return state
     
     def delete_state(self, task_key: str) -> None:
         """
@@ -66,6 +90,75 @@ class PersistenceStrategy(ABC):
         key = f"state:{task_key}"
         self.delete(key)
     
+    # Content-addressed artifacts
+    def attach_artifact_store(self, store: Optional["ArtifactStore"]) -> None:
+        """
+        Store large state fields (Config.ARTIFACT_FIELDS) as content-addressed
+        blobs; state records then hold only their digests.
+        
+        Records saved without a store (plain strings) remain readable.
+        """
+        self.artifact_store = store
+    
+    def collect_garbage(self, grace_seconds: Optional[float] = None) -> int:
+        """
+        Mark-and-sweep collection of artifacts no longer referenced by any saved state.
+        
+        Args:
+            grace_seconds: Blobs touched more recently than this are kept even if
+                unreferenced, covering saves in flight (None uses Config.ARTIFACT_GC_GRACE_SECONDS)
+        
+        Returns:
+            Number of blobs deleted
+        """
+        if self.artifact_store is None:
+            return 0
+        from app.persistence.artifact_store import artifact_refs
+        
+        grace = Config.ARTIFACT_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        cutoff = time.time() - grace
+        live = set()
+        for task_key in self.list_tasks():
+            live |= artifact_refs(self.load(f"state:{task_key}"))
+        return self.artifact_store.sweep(live, older_than=cutoff)
+    
+    # Task ownership (locking with fencing tokens)
+    def acquire_task_lock(self, task_key: str, owner: str, ttl_seconds: int) -> Optional[int]:
+        """
+        Acquire exclusive ownership of a task.
+        
+        Args:
+            task_key: Unique identifier for the task
+            owner: Unique identifier of the acquiring worker
+            ttl_seconds: Lock expiration; must be renewed with renew_task_lock
+            
+        Returns:
+            A new, monotonically increasing fencing token, or None if another owner holds the lock
+        """
+        raise NotImplementedError("acquire_task_lock must be implemented by concrete persistence classes")
+    
+    def renew_task_lock(self, task_key: str, owner: str, ttl_seconds: int) -> bool:
+        """
+        Extend the lock TTL.
+        
+        Returns:
+            False if the lock is no longer held by owner
+        """
+        raise NotImplementedError("renew_task_lock must be implemented by concrete persistence classes")
+    
+    def release_task_lock(self, task_key: str, owner: str) -> None:
+        """Release the lock if it is still held by owner."""
+        raise NotImplementedError("release_task_lock must be implemented by concrete persistence classes")
+    
+    def save_fenced(self, task_key: str, key: str, data: Dict[str, Any], fencing_token: int) -> None:
+        """
+        Atomically save data only if fencing_token is the task's current token.
+        
+        Raises:
+            StaleWriteError: If a newer owner acquired the task
+        """
+        raise NotImplementedError("save_fenced must be implemented by concrete persistence classes")
+    
     def list_tasks(self) -> List[str]:
         """
         List all saved task keys.
@@ -0,0 +1,357 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import redis
+
+from app.config import Config
+
+# Marker used in state records in place of an externalized field value
+ARTIFACT_REF = "$artifact"
+
+
+def artifact_digest(content: str) -> str:
+    """SHA-256 of the UTF-8 content (the artifact's address)."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def is_artifact_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and isinstance(value.get(ARTIFACT_REF), str)
+
+
+def artifact_refs(state: Dict[str, Any]) -> Set[str]:
+    """Digests referenced by a stored state record."""
+    return {value[ARTIFACT_REF] for value in state.values() if is_artifact_ref(value)}
+
+
+class ArtifactStore(ABC):
+    """
+    Content-addressed blob store (digest -> zlib-compressed content).
+
+    Blobs are immutable, so reads are served from a bounded in-process cache.
+    Every put refreshes the blob's "last touched" time; garbage collection is
+    mark-and-sweep: blobs not referenced by any live state and not touched
+    within the grace period are deleted.
+    """
+
+    def __init__(self, cache_size: Optional[int] = None):
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_size = Config.ARTIFACT_CACHE_SIZE if cache_size is None else cache_size
+        self._cache_lock = threading.Lock()
+
+    # Backend primitives
+    @abstractmethod
+    def _touch_existing(self, digests: List[str], now: float) -> Set[str]:
+        """Refresh the touch time of the digests that exist; return the ones that exist."""
+        pass
+
+    @abstractmethod
+    def _write(self, blobs: Dict[str, bytes], now: float) -> None:
+        """Store new compressed blobs."""
+        pass
+
+    @abstractmethod
+    def _read(self, digests: List[str]) -> Dict[str, bytes]:
+        """Fetch compressed blobs (missing digests are omitted)."""
+        pass
+
+    @abstractmethod
+    def _sweep(self, live: Set[str], cutoff: float) -> int:
+        """Delete blobs not in `live` last touched before `cutoff`; return how many were deleted."""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Delete every blob."""
+        pass
+
+    def _remember(self, digest: str, content: str) -> None:
+        if self._cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[digest] = content
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def put_many(self, contents: List[str]) -> List[str]:
+        """Store contents, uploading only blobs the store does not have yet. Returns their digests."""
+        digests = [artifact_digest(content) for content in contents]
+        unique = list(dict.fromkeys(digests))
+        now = time.time()
+        existing = self._touch_existing(unique, now)
+        missing = {}
+        for digest, content in zip(digests, contents):
+            if digest not in existing and digest not in missing:
+                missing[digest] = zlib.compress(content.encode("utf-8"), Config.ARTIFACT_COMPRESSION_LEVEL)
+            self._remember(digest, content)
+        if missing:
+            self._write(missing, now)
+        return digests
+
+    def put(self, content: str) -> str:
+        return self.put_many([content])[0]
+
+    def get_many(self, digests: Iterable[str]) -> Dict[str, str]:
+        """Fetch contents by digest."""
+        found: Dict[str, str] = {}
+        wanted = []
+        with self._cache_lock:
+            for digest in dict.fromkeys(digests):
+                if digest in self._cache:
+                    self._cache.move_to_end(digest)
+                    found[digest] = self._cache[digest]
+                else:
+                    wanted.append(digest)
+        if wanted:
+            for digest, blob in self._read(wanted).items():
+                content = zlib.decompress(blob).decode("utf-8")
+                found[digest] = content
+                self._remember(digest, content)
+        return found
+
+    def get(self, digest: str) -> str:
+        content = self.get_many([digest]).get(digest)
+        if content is None:
+            raise KeyError(f"Artifact '{digest}' not found")
+        return content
+
+    def sweep(self, live: Set[str], older_than: float) -> int:
+        """Delete unreferenced blobs last touched before `older_than` (epoch seconds)."""
+        deleted = self._sweep(live, older_than)
+        with self._cache_lock:
+            for digest in [d for d in self._cache if d not in live]:
+                del self._cache[digest]
+        return deleted
+
+    # State records
+    def externalize(self, state: Dict[str, Any], fields: Iterable[str], min_bytes: int = 0) -> Dict[str, Any]:
+        """Copy of `state` with the given string fields replaced by artifact references."""
+        names = [
+            name for name in fields
+            if isinstance(state.get(name), str) and len(state[name].encode("utf-8")) >= min_bytes
+        ]
+        if not names:
+            return state
+        digests = self.put_many([state[name] for name in names])
+        return {**state, **{name: {ARTIFACT_REF: digest} for name, digest in zip(names, digests)}}
+
+    def resolve(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of `state` with artifact references replaced by their content."""
+        refs = {name: value[ARTIFACT_REF] for name, value in state.items() if is_artifact_ref(value)}
+        if not refs:
+            return state
+        contents = self.get_many(refs.values())
+        missing = [name for name, digest in refs.items() if digest not in contents]
+        if missing:
+            raise ValueError(f"Missing artifacts for fields: {', '.join(missing)}")
+        return {**state, **{name: contents[digest] for name, digest in refs.items()}}
+
+
+class InMemoryArtifactStore(ArtifactStore):
+    """In-process artifact store (for tests and the memory persistence strategy)."""
+
+    def __init__(self, cache_size: Optional[int] = None):
+        super().__init__(cache_size)
+        self._blobs: Dict[str, bytes] = {}
+        self._touched: Dict[str, float] = {}
+        self._mutex = threading.Lock()
+
+    def _touch_existing(self, digests: List[str], now: float) -> Set[str]:
+        with self._mutex:
+            existing = {digest for digest in digests if digest in self._blobs}
+            for digest in existing:
+                self._touched[digest] = now
+            return existing
+
+    def _write(self, blobs: Dict[str, bytes], now: float) -> None:
+        with self._mutex:
+            for digest, blob in blobs.items():
+                self._blobs[digest] = blob
+                self._touched[digest] = now
+
+    def _read(self, digests: List[str]) -> Dict[str, bytes]:
+        with self._mutex:
+            return {digest: self._blobs[digest] for digest in digests if digest in self._blobs}
+
+    def _sweep(self, live: Set[str], cutoff: float) -> int:
+        with self._mutex:
+            dead = [d for d, touched in self._touched.items() if d not in live and touched < cutoff]
+            for digest in dead:
+                del self._blobs[digest]
+                del self._touched[digest]
+            return len(dead)
+
+    def clear(self) -> None:
+        with self._mutex:
+            self._blobs.clear()
+            self._touched.clear()
+
+
+class FileArtifactStore(ArtifactStore):
+    """
+    Artifact store on local disk: one file per blob under `root/<2 hex>/<digest>`.
+
+    Writes go through a temporary file and an atomic rename; the file mtime is
+    the blob's touch time. Sweeps are not atomic per blob, so the grace period
+    must comfortably exceed the time between a put and the state write that
+    references it.
+    """
+
+    def __init__(self, root: Optional[str] = None, cache_size: Optional[int] = None):
+        super().__init__(cache_size)
+        self.root = root or Config.ARTIFACT_DIR
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _touch_existing(self, digests: List[str], now: float) -> Set[str]:
+        existing = set()
+        for digest in digests:
+            try:
+                os.utime(self._path(digest), (now, now))
+                existing.add(digest)
+            except FileNotFoundError:
+                pass
+        return existing
+
+    def _write(self, blobs: Dict[str, bytes], now: float) -> None:
+        for digest, blob in blobs.items():
+            directory = os.path.dirname(self._path(digest))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(blob)
+                os.replace(tmp_path, self._path(digest))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def _read(self, digests: List[str]) -> Dict[str, bytes]:
+        blobs = {}
+        for digest in digests:
+            try:
+                with open(self._path(digest), "rb") as f:
+                    blobs[digest] = f.read()
+            except FileNotFoundError:
+                pass
+        return blobs
+
+    def _sweep(self, live: Set[str], cutoff: float) -> int:
+        deleted = 0
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    # Leftover temporary files from interrupted writes are collected as well
+                    if name not in live and os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        deleted += 1
+                except FileNotFoundError:
+                    pass
+        return deleted
+
+    def clear(self) -> None:
+        self._sweep(set(), float("inf"))
+
+
+# Refresh the touch time of the blobs that exist; return a 0/1 flag per digest
+_TOUCH_SCRIPT = """
+local found = {}
+for i, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('ZADD', ARGV[1], ARGV[2], ARGV[i + 2])
+        found[i] = 1
+    else
+        found[i] = 0
+    end
+end
+return found
+"""
+
+# Delete a blob only if it was not touched again since the sweep read its score
+_SWEEP_SCRIPT = """
+local score = redis.call('ZSCORE', ARGV[1], ARGV[2])
+if score and tonumber(score) < tonumber(ARGV[3]) then
+    redis.call('DEL', KEYS[1])
+    redis.call('ZREM', ARGV[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+class RedisArtifactStore(ArtifactStore):
+    """
+    Artifact store in Redis: blobs at `artifact:<digest>`, touch times in the
+    sorted set `artifacts:touched`.
+
+    A put is one round trip when every blob already exists, plus one pipelined
+    write for the new ones.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None, cache_size: Optional[int] = None):
+        super().__init__(cache_size)
+        # Binary client: blobs are compressed bytes
+        self.client = redis.from_url(redis_url or Config.REDIS_URL)
+        self.index_key = "artifacts:touched"
+        self._touch = self.client.register_script(_TOUCH_SCRIPT)
+        self._sweep_one = self.client.register_script(_SWEEP_SCRIPT)
+
+    def _key(self, digest: str) -> str:
+        return f"artifact:{digest}"
+
+    def _touch_existing(self, digests: List[str], now: float) -> Set[str]:
+        try:
+            flags = self._touch(keys=[self._key(d) for d in digests], args=[self.index_key, now] + digests)
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to touch artifacts in Redis: {str(e)}")
+        return {digest for digest, flag in zip(digests, flags) if flag}
+
+    def _write(self, blobs: Dict[str, bytes], now: float) -> None:
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            for digest, blob in blobs.items():
+                pipe.set(self._key(digest), blob)
+            pipe.zadd(self.index_key, {digest: now for digest in blobs})
+            pipe.execute()
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to save artifacts to Redis: {str(e)}")
+
+    def _read(self, digests: List[str]) -> Dict[str, bytes]:
+        try:
+            values = self.client.mget([self._key(d) for d in digests])
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to load artifacts from Redis: {str(e)}")
+        return {digest: blob for digest, blob in zip(digests, values) if blob is not None}
+
+    def _sweep(self, live: Set[str], cutoff: float) -> int:
+        try:
+            candidates = [
+                digest.decode("utf-8") if isinstance(digest, bytes) else digest
+                for digest in self.client.zrangebyscore(self.index_key, "-inf", f"({cutoff}")
+            ]
+            return sum(
+                int(self._sweep_one(keys=[self._key(digest)], args=[self.index_key, digest, cutoff]))
+                for digest in candidates if digest not in live
+            )
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to sweep artifacts in Redis: {str(e)}")
+
+    def clear(self) -> None:
+        try:
+            keys = list(self.client.scan_iter("artifact:*"))
+            if keys:
+                self.client.delete(*keys)
+            self.client.delete(self.index_key)
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to clear artifacts in Redis: {str(e)}")
@@ -1,7 +1,11 @@
 from typing import Optional
+from app.config import Config
 from app.persistence.abstract_persistence import PersistenceStrategy
+from app.persistence.artifact_store import ArtifactStore, FileArtifactStore, InMemoryArtifactStore, RedisArtifactStore
 from app.persistence.redis_persistence import RedisPersistence
+from app.persistence.tiered_persistence import TieredRedisPersistence
 from app.persistence.memory_persistence import InMemoryPersistence
+from app.persistence.log_persistence import LogStructuredPersistence
 
 
 class PersistenceFactory:
@@ -10,24 +14,63 @@ class PersistenceFactory:
     @staticmethod
     def create_persistence(
         strategy: str = "redis",
-        redis_url: Optional[str] = None
+        redis_url: Optional[str] = None,
+        artifacts: Optional[str] = None,
+        path: Optional[str] = None
     ) -> PersistenceStrategy:
         """
         Create a persistence strategy instance.
         
         Args:
-            strategy: Type of persistence ("redis" or "memory")
-            redis_url: Redis connection URL (only for redis strategy)
+            strategy: Type of persistence ("redis", "tiered", "memory" or "file")
+            redis_url: Redis connection URL (only for redis/tiered strategies and redis artifacts)
+            artifacts: Artifact store for large state fields ("redis", "file", "memory",
+                "none", or "auto" to match the strategy). None uses Config.ARTIFACT_STORE
+            path: Log file path (only for file strategy). None uses Config.LOG_PERSISTENCE_PATH
         
         Returns:
             PersistenceStrategy instance
         
         Raises:
-            ValueError: If strategy is not supported
+            ValueError: If strategy or artifact store is not supported
         """
         if strategy == "redis":
-            return RedisPersistence(redis_url)
+            persistence = RedisPersistence(redis_url)
+        elif strategy == "tiered":
+            persistence = TieredRedisPersistence(redis_url)
         elif strategy == "memory":
-            return InMemoryPersistence()
+            persistence = InMemoryPersistence()
+        elif strategy == "file":
+            persistence = LogStructuredPersistence(path)
+        else:
+            raise ValueError(f"Unsupported persistence strategy: {strategy}")
+        
+        persistence.attach_artifact_store(
+            PersistenceFactory.create_artifact_store(artifacts or Config.ARTIFACT_STORE, strategy, redis_url)
+        )
+        return persistence
+    
+    @staticmethod
+    def create_artifact_store(
+        kind: str,
+        strategy: str = "redis",
+        redis_url: Optional[str] = None
+    ) -> Optional[ArtifactStore]:
+        """
+        Create the artifact store for a persistence strategy.
+        
+        "auto" keeps artifacts next to the state: in Redis for the redis/tiered strategies,
+        on local disk for the file strategy, none for the memory strategy.
+        """
+        if kind == "auto":
+            kind = {"redis": "redis", "tiered": "redis", "file": "file"}.get(strategy, "none")
+        if kind == "redis":
+            return RedisArtifactStore(redis_url)
+        elif kind == "file":
+            return FileArtifactStore()
+        elif kind == "memory":
+            return InMemoryArtifactStore()
+        elif kind in ("none", ""):
+            return None
         else:
-            raise ValueError(f"Unsupported persistence strategy: {strategy}")
\ No newline at end of file
+            raise ValueError(f"Unsupported artifact store: {kind}")
\ No newline at end of file
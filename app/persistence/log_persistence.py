@@ -0,0 +1,446 @@
+import contextlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from app.persistence.abstract_persistence import PersistenceStrategy, StaleWriteError
+from app.config import Config
+
+try:
+    import fcntl  # noqa: F401  (POSIX only)
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+# Record framing: payload length, CRC32 of the payload, then the JSON payload
+_HEADER = struct.Struct("<II")
+
+
+class LogStructuredPersistence(PersistenceStrategy):
+    """
+    Append-only log file implementation of the PersistenceStrategy.
+
+    Every write appends a CRC-framed JSON record; an in-memory index maps each
+    key to its latest record, which is read back through a memory map. Writes
+    are fsynced in batches by a background thread (group commit): a writer
+    returns once the batch containing its record is durable.
+
+    On open the log is replayed to rebuild the index, and a torn tail left by a
+    crash is truncated. A background thread compacts the log (rewriting only
+    live records and swapping the file atomically) once enough of it is garbage.
+
+    Several processes on the same node may share a log: appends and compaction
+    are serialized by an exclusive lock on `<path>.lock`, and each process
+    replays records appended by the others (or reloads after a compaction)
+    before serving a request.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        sync_interval: Optional[float] = None,
+        compact_interval: Optional[float] = None
+    ):
+        """
+        Open (or create) the log and start the sync and compaction threads.
+
+        Args:
+            path: Log file path. If None, uses Config.LOG_PERSISTENCE_PATH
+            sync_interval: Batching window of the fsync thread in seconds (None uses Config.LOG_SYNC_INTERVAL)
+            compact_interval: Seconds between compaction checks (None uses Config.LOG_COMPACT_CHECK_INTERVAL, 0 disables)
+        """
+        self.path = path or Config.LOG_PERSISTENCE_PATH
+        self.sync_interval = Config.LOG_SYNC_INTERVAL if sync_interval is None else sync_interval
+        self.compact_interval = Config.LOG_COMPACT_CHECK_INTERVAL if compact_interval is None else compact_interval
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._mutex = threading.RLock()
+        self._lock_fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._inode: Optional[int] = None
+        self._end = 0
+        self._garbage = 0
+        # key -> (record offset, record size)
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._locks: Dict[str, Tuple[str, float]] = {}
+        self._fences: Dict[str, int] = {}
+        # task key -> size of its latest lock/fence record
+        self._meta_sizes: Dict[str, int] = {}
+
+        # Group commit: sequence of appended batches vs. sequence known to be on disk
+        self._seq = 0
+        self._synced_seq = 0
+        self._sync_cond = threading.Condition()
+        self._stop = threading.Event()
+
+        with self._mutex, self._file_lock():
+            self._open(recover=True)
+
+        self._sync_thread = threading.Thread(target=self._sync_loop, name="log-persistence-sync", daemon=True)
+        self._sync_thread.start()
+        self._compact_thread = None
+        if self.compact_interval:
+            self._compact_thread = threading.Thread(
+                target=self._compact_loop, name="log-persistence-compact", daemon=True
+            )
+            self._compact_thread.start()
+
+    # Log file handling
+    @contextlib.contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Exclusive cross-process lock (no-op where fcntl is unavailable)."""
+        if not HAS_FCNTL:
+            yield
+            return
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    @contextlib.contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Hold the process mutex and the file lock, with the index caught up to the log."""
+        with self._mutex, self._file_lock():
+            self._refresh()
+            yield
+
+    def _open(self, recover: bool = False) -> None:
+        """(Re)open the log file and rebuild the index by replaying it."""
+        self._close_file()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._inode = os.fstat(self._fd).st_ino
+        self._end = 0
+        self._garbage = 0
+        self._index.clear()
+        self._locks.clear()
+        self._fences.clear()
+        self._meta_sizes.clear()
+        self._scan(recover=recover)
+
+    def _close_file(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _remap(self, size: int) -> None:
+        if size == 0 or (self._map is not None and len(self._map) >= size):
+            return
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._fd, size, access=mmap.ACCESS_READ)
+
+    def _scan(self, recover: bool = False) -> None:
+        """
+        Apply the records after the current end of the index.
+
+        Scanning stops at the first incomplete or corrupt record. With `recover`
+        (only while holding the file lock) that torn tail is truncated.
+        """
+        size = os.fstat(self._fd).st_size
+        self._remap(size)
+        offset = self._end
+        while offset + _HEADER.size <= size:
+            length, crc = _HEADER.unpack_from(self._map, offset)
+            end = offset + _HEADER.size + length
+            if end > size:
+                break
+            payload = self._map[offset + _HEADER.size:end]
+            if zlib.crc32(payload) != crc:
+                break
+            try:
+                record = json.loads(payload)
+            except ValueError:
+                break
+            self._apply(record, offset, end - offset)
+            offset = end
+
+        if recover and offset < size:
+            logging.warning(f"Log '{self.path}': truncating {size - offset} bytes of torn tail at offset {offset}")
+            os.ftruncate(self._fd, offset)
+            os.fsync(self._fd)
+        self._end = offset
+
+    def _refresh(self) -> None:
+        """Catch up with records appended (or a compaction done) by other processes."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._end:
+            self._open()
+        elif stat.st_size > self._end:
+            self._scan()
+
+    def _apply(self, record: Dict[str, Any], offset: int, size: int) -> None:
+        """Update the in-memory index with one log record."""
+        op = record.get("op")
+        key = record.get("k")
+        if op == "set":
+            previous = self._index.get(key)
+            if previous:
+                self._garbage += previous[1]
+            self._index[key] = (offset, size)
+            return
+
+        if op in ("del", "clear"):
+            # Tombstones are dropped by the next compaction
+            self._garbage += size
+        else:
+            # Only the latest lock/fence record of a task is live
+            self._garbage += self._meta_sizes.get(key, 0)
+            self._meta_sizes[key] = size
+        if op == "del":
+            previous = self._index.pop(key, None)
+            if previous:
+                self._garbage += previous[1]
+        elif op == "clear":
+            self._garbage += sum(entry[1] for entry in self._index.values())
+            self._index.clear()
+        elif op == "lock":
+            self._locks[key] = (record["owner"], record["exp"])
+            if "fence" in record:
+                self._fences[key] = record["fence"]
+        elif op == "unlock":
+            self._locks.pop(key, None)
+        elif op == "fence":
+            self._fences[key] = record["fence"]
+
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> bytes:
+        payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def _append(self, records: List[Dict[str, Any]]) -> int:
+        """Append records (caller holds _exclusive) and return the batch sequence to wait for."""
+        frames = [self._encode(record) for record in records]
+        os.write(self._fd, b"".join(frames))
+        offset = self._end
+        self._remap(offset + sum(len(frame) for frame in frames))
+        for record, frame in zip(records, frames):
+            self._apply(record, offset, len(frame))
+            offset += len(frame)
+        self._end = offset
+
+        with self._sync_cond:
+            self._seq += 1
+            self._sync_cond.notify_all()
+            return self._seq
+
+    def _wait_synced(self, seq: int) -> None:
+        """Block until the batch `seq` is on disk (when Config.LOG_SYNC_WRITES)."""
+        if not Config.LOG_SYNC_WRITES:
+            return
+        with self._sync_cond:
+            while self._synced_seq < seq and not self._stop.is_set():
+                self._sync_cond.wait()
+
+    def _sync_loop(self) -> None:
+        while not self._stop.is_set():
+            with self._sync_cond:
+                while self._synced_seq >= self._seq and not self._stop.is_set():
+                    self._sync_cond.wait()
+            # Batching window: writes arriving meanwhile share the same fsync
+            self._stop.wait(self.sync_interval)
+            self._sync()
+
+    def _sync(self) -> None:
+        with self._mutex:
+            target = self._seq
+            if self._fd is not None:
+                os.fsync(self._fd)
+        with self._sync_cond:
+            self._synced_seq = max(self._synced_seq, target)
+            self._sync_cond.notify_all()
+
+    def _read_record(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        offset, size = entry
+        return json.loads(self._map[offset + _HEADER.size:offset + size])
+
+    # Compaction
+    def garbage_ratio(self) -> float:
+        """Fraction of the log occupied by superseded records."""
+        with self._mutex:
+            return self._garbage / self._end if self._end else 0.0
+
+    def _compact_loop(self) -> None:
+        while not self._stop.wait(self.compact_interval):
+            try:
+                with self._mutex:
+                    due = self._end >= Config.LOG_COMPACT_MIN_BYTES and self.garbage_ratio() >= Config.LOG_COMPACT_GARBAGE_RATIO
+                if due:
+                    self.compact()
+            except OSError as e:
+                logging.warning(f"Log '{self.path}': compaction failed: {e}")
+
+    def compact(self) -> None:
+        """Rewrite the log with only live records and swap it in atomically."""
+        with self._exclusive():
+            before = self._end
+            now = time.time()
+            tmp_path = self.path + ".compact"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                chunk = []
+                for offset, size in self._index.values():
+                    chunk.append(self._map[offset:offset + size])
+                    if len(chunk) >= 256:
+                        os.write(fd, b"".join(chunk))
+                        chunk = []
+                # Fencing tokens must never go backwards; unexpired locks keep their owner
+                for task_key, fence in self._fences.items():
+                    holder = self._locks.get(task_key)
+                    if holder and holder[1] > now:
+                        record = {"op": "lock", "k": task_key, "owner": holder[0], "exp": holder[1], "fence": fence}
+                    else:
+                        record = {"op": "fence", "k": task_key, "fence": fence}
+                    chunk.append(self._encode(record))
+                os.write(fd, b"".join(chunk))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, self.path)
+            dir_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+            self._open()
+            # Everything appended so far is in the fsynced compacted file
+            with self._sync_cond:
+                self._synced_seq = self._seq
+                self._sync_cond.notify_all()
+            logging.info(f"Log '{self.path}' compacted: {before} -> {self._end} bytes")
+
+    def close(self) -> None:
+        """Stop the background threads, flush pending writes and close the log (idempotent)."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        with self._sync_cond:
+            self._sync_cond.notify_all()
+        self._sync_thread.join(timeout=5)
+        if self._compact_thread is not None:
+            self._compact_thread.join(timeout=5)
+        with self._mutex:
+            if self._fd is not None:
+                os.fsync(self._fd)
+            self._close_file()
+            os.close(self._lock_fd)
+
+    # PersistenceStrategy
+    def save(self, key: str, data: Dict[str, Any]) -> None:
+        """Append the data as a JSON record."""
+        try:
+            with self._exclusive():
+                seq = self._append([{"op": "set", "k": key, "v": data}])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Failed to serialize data for key '{key}': {str(e)}")
+        self._wait_synced(seq)
+
+    def load(self, key: str) -> Dict[str, Any]:
+        """Load data through the memory-mapped log."""
+        with self._mutex:
+            self._refresh()
+            record = self._read_record(key)
+        return record["v"] if record else {}
+
+    def delete(self, key: str) -> None:
+        """Append a delete record for the key."""
+        with self._exclusive():
+            if key not in self._index:
+                return
+            seq = self._append([{"op": "del", "k": key}])
+        self._wait_synced(seq)
+
+    def exists(self, key: str) -> bool:
+        """Check if key exists in the index."""
+        with self._mutex:
+            self._refresh()
+            return key in self._index
+
+    def clear_all(self) -> None:
+        """Drop all data keys (task locks and fencing tokens are kept)."""
+        with self._exclusive():
+            seq = self._append([{"op": "clear"}])
+        self._wait_synced(seq)
+
+    def load_state(self, task_key: str) -> Optional[Dict[str, Any]]:
+        """Load TDD workflow state with a single index lookup."""
+        with self._mutex:
+            self._refresh()
+            record = self._read_record(f"state:{task_key}")
+        if record is None:
+            return None
+        state = record["v"]
+        if self.artifact_store is not None:
+            state = self.artifact_store.resolve(state)
+        return state
+
+    def acquire_task_lock(self, task_key: str, owner: str, ttl_seconds: int) -> Optional[int]:
+        """Acquire the task lock and return a new fencing token (None if held by another owner)."""
+        with self._exclusive():
+            now = time.time()
+            holder = self._locks.get(task_key)
+            if holder and holder[0] != owner and holder[1] > now:
+                return None
+            fence = self._fences.get(task_key, 0) + 1
+            seq = self._append([{"op": "lock", "k": task_key, "owner": owner, "exp": now + ttl_seconds, "fence": fence}])
+        self._wait_synced(seq)
+        return fence
+
+    def renew_task_lock(self, task_key: str, owner: str, ttl_seconds: int) -> bool:
+        """Extend the task lock TTL if still owned."""
+        with self._exclusive():
+            now = time.time()
+            holder = self._locks.get(task_key)
+            if not holder or holder[0] != owner or holder[1] <= now:
+                return False
+            seq = self._append([{"op": "lock", "k": task_key, "owner": owner, "exp": now + ttl_seconds}])
+        self._wait_synced(seq)
+        return True
+
+    def release_task_lock(self, task_key: str, owner: str) -> None:
+        """Release the task lock if still owned."""
+        with self._exclusive():
+            holder = self._locks.get(task_key)
+            if not holder or holder[0] != owner:
+                return
+            seq = self._append([{"op": "unlock", "k": task_key}])
+        self._wait_synced(seq)
+
+    def save_fenced(self, task_key: str, key: str, data: Dict[str, Any], fencing_token: int) -> None:
+        """Append the data only if fencing_token is still current (checked under the file lock)."""
+        try:
+            with self._exclusive():
+                if self._fences.get(task_key) != fencing_token:
+                    raise StaleWriteError(f"Rejected write to '{key}': fencing token {fencing_token} is stale")
+                seq = self._append([{"op": "set", "k": key, "v": data}])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Failed to serialize data for key '{key}': {str(e)}")
+        self._wait_synced(seq)
+
+    def list_tasks(self) -> List[str]:
+        """
+        List all saved TDD task keys.
+
+        Returns:
+            List of task keys (without 'state:' prefix)
+        """
+        with self._mutex:
+            self._refresh()
+            return [key[len("state:"):] for key in self._index if key.startswith("state:")]
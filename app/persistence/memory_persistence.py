@@ -1,5 +1,7 @@
-from typing import Dict, Any, List
-from app.persistence.abstract_persistence import PersistenceStrategy
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from app.persistence.abstract_persistence import PersistenceStrategy, StaleWriteError
 
 
 class InMemoryPersistence(PersistenceStrategy):
@@ -8,6 +10,9 @@ class InMemoryPersistence(PersistenceStrategy):
     def __init__(self):
         """Initialize in-memory storage."""
         self._storage: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, Tuple[str, float]] = {}
+        self._fences: Dict[str, int] = {}
+        self._mutex = threading.Lock()
     
     def save(self, key: str, data: Dict[str, Any]) -> None:
         """Save data to in-memory dictionary."""
@@ -30,6 +35,39 @@ class InMemoryPersistence(PersistenceStrategy):
         """Clear all data from in-memory storage."""
         self._storage.clear()
     
+    def acquire_task_lock(self, task_key: str, owner: str, ttl_seconds: int) -> Optional[int]:
+        """Acquire the task lock and return a new fencing token (None if held by another owner)."""
+        with self._mutex:
+            holder = self._locks.get(task_key)
+            if holder and holder[0] != owner and holder[1] > time.monotonic():
+                return None
+            self._locks[task_key] = (owner, time.monotonic() + ttl_seconds)
+            self._fences[task_key] = self._fences.get(task_key, 0) + 1
+            return self._fences[task_key]
+    
+    def renew_task_lock(self, task_key: str, owner: str, ttl_seconds: int) -> bool:
+        """Extend the task lock TTL if still owned."""
+        with self._mutex:
+            holder = self._locks.get(task_key)
+            if not holder or holder[0] != owner or holder[1] <= time.monotonic():
+                return False
+            self._locks[task_key] = (owner, time.monotonic() + ttl_seconds)
+            return True
+    
+    def release_task_lock(self, task_key: str, owner: str) -> None:
+        """Release the task lock if still owned."""
+        with self._mutex:
+            holder = self._locks.get(task_key)
+            if holder and holder[0] == owner:
+                del self._locks[task_key]
+    
+    def save_fenced(self, task_key: str, key: str, data: Dict[str, Any], fencing_token: int) -> None:
+        """Save data only if fencing_token is still current."""
+        with self._mutex:
+            if self._fences.get(task_key) != fencing_token:
+                raise StaleWriteError(f"Rejected write to '{key}': fencing token {fencing_token} is stale")
+            self._storage[key] = data.copy()
+    
     def list_tasks(self) -> List[str]:
         """
         List all saved TDD task keys.
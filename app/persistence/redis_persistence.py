@@ -1,10 +1,45 @@
 import redis
 import json
 from typing import Dict, Any, Optional, List
-from app.persistence.abstract_persistence import PersistenceStrategy
+from app.persistence.abstract_persistence import PersistenceStrategy, StaleWriteError
 from app.config import Config
 
 
+# Take the lock (or re-enter it) and issue a new fencing token
+_ACQUIRE_LOCK_SCRIPT = """
+local holder = redis.call('GET', KEYS[1])
+if holder and holder ~= ARGV[1] then
+    return nil
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return redis.call('INCR', KEYS[2])
+"""
+
+_RENEW_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Write only if the caller's token is still the current one
+_FENCED_SET_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2])
+return 1
+"""
+
+
 class RedisPersistence(PersistenceStrategy):
     """Redis implementation of the PersistenceStrategy."""
     
@@ -17,6 +52,10 @@ class RedisPersistence(PersistenceStrategy):
         """
         url = redis_url or Config.REDIS_URL
         self.client = redis.from_url(url, decode_responses=True)
+        self._acquire_lock = self.client.register_script(_ACQUIRE_LOCK_SCRIPT)
+        self._renew_lock = self.client.register_script(_RENEW_LOCK_SCRIPT)
+        self._release_lock = self.client.register_script(_RELEASE_LOCK_SCRIPT)
+        self._fenced_set = self.client.register_script(_FENCED_SET_SCRIPT)
     
     def save(self, key: str, data: Dict[str, Any]) -> None:
         """Save data to Redis as JSON."""
@@ -28,17 +67,36 @@ class RedisPersistence(PersistenceStrategy):
         except redis.RedisError as e:
             raise ConnectionError(f"Failed to save to Redis: {str(e)}")
     
-    def load(self, key: str) -> Dict[str, Any]:
-        """Load data from Redis."""
+    def _get(self, key: str) -> Optional[str]:
+        """Raw JSON stored under key (None if missing)."""
+        try:
+            return self.client.get(key)
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to load from Redis: {str(e)}")
+    
+    @staticmethod
+    def _decode(key: str, raw: Optional[str]) -> Dict[str, Any]:
         try:
-            raw = self.client.get(key)
             if raw:
                 return json.loads(raw)
             return {}
         except json.JSONDecodeError as e:
             raise ValueError(f"Failed to deserialize data for key '{key}': {str(e)}")
-        except redis.RedisError as e:
-            raise ConnectionError(f"Failed to load from Redis: {str(e)}")
+    
+    def load(self, key: str) -> Dict[str, Any]:
+        """Load data from Redis."""
+        return self._decode(key, self._get(key))
+    
+    def load_state(self, task_key: str) -> Optional[Dict[str, Any]]:
+        """Load TDD workflow state with a single GET (a missing key means no state)."""
+        key = f"state:{task_key}"
+        raw = self._get(key)
+        if raw is None:
+            return None
+        state = self._decode(key, raw)
+        if self.artifact_store is not None:
+            state = self.artifact_store.resolve(state)
+        return state
     
     def delete(self, key: str) -> None:
         """Delete a key from Redis."""
@@ -61,6 +119,43 @@ class RedisPersistence(PersistenceStrategy):
         except redis.RedisError as e:
             raise ConnectionError(f"Failed to clear Redis: {str(e)}")
     
+    def acquire_task_lock(self, task_key: str, owner: str, ttl_seconds: int) -> Optional[int]:
+        """Acquire the task lock and return a new fencing token (None if held by another owner)."""
+        try:
+            token = self._acquire_lock(
+                keys=[f"lock:{task_key}", f"fence:{task_key}"],
+                args=[owner, int(ttl_seconds * 1000)]
+            )
+            return int(token) if token is not None else None
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to acquire task lock: {str(e)}")
+    
+    def renew_task_lock(self, task_key: str, owner: str, ttl_seconds: int) -> bool:
+        """Extend the task lock TTL if still owned."""
+        try:
+            return bool(self._renew_lock(keys=[f"lock:{task_key}"], args=[owner, int(ttl_seconds * 1000)]))
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to renew task lock: {str(e)}")
+    
+    def release_task_lock(self, task_key: str, owner: str) -> None:
+        """Release the task lock if still owned."""
+        try:
+            self._release_lock(keys=[f"lock:{task_key}"], args=[owner])
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to release task lock: {str(e)}")
+    
+    def save_fenced(self, task_key: str, key: str, data: Dict[str, Any], fencing_token: int) -> None:
+        """Save data as JSON only if fencing_token is still current (checked atomically)."""
+        try:
+            serialized = json.dumps(data, indent=2)
+            accepted = self._fenced_set(keys=[f"fence:{task_key}", key], args=[fencing_token, serialized])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Failed to serialize data for key '{key}': {str(e)}")
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to save to Redis: {str(e)}")
+        if not accepted:
+            raise StaleWriteError(f"Rejected write to '{key}': fencing token {fencing_token} is stale")
+    
     def list_tasks(self) -> List[str]:
         """
         List all saved TDD task keys.
@@ -0,0 +1,218 @@
+import json
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import redis
+from app.persistence.abstract_persistence import StaleWriteError
+from app.persistence.redis_persistence import RedisPersistence
+from app.config import Config
+
+
+# Fenced write that also announces the change to peer caches
+_FENCED_SET_PUBLISH_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2])
+redis.call('PUBLISH', ARGV[3], ARGV[4])
+return 1
+"""
+
+# Key sent in an invalidation message to drop every cached entry
+_ALL_KEYS = "*"
+
+
+class TieredRedisPersistence(RedisPersistence):
+    """
+    Two-tier persistence: a bounded in-process LRU in front of Redis.
+
+    Reads are served from the local cache when possible (misses are cached too,
+    so exists + load is a single lookup). Writes go through to Redis and publish
+    an invalidation on Config.CACHE_INVALIDATION_CHANNEL in the same round trip;
+    every other instance drops the key from its cache when the message arrives.
+
+    The cache is only used while the invalidation subscription is confirmed: on
+    disconnect it is cleared and reads fall back to Redis until resubscribed.
+    A per-instance epoch, bumped by every peer invalidation, keeps a value read
+    (or written) concurrently with an invalidation from being cached.
+
+    Task locks, fencing tokens and list_tasks always go to Redis.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        max_keys: Optional[int] = None,
+        channel: Optional[str] = None
+    ):
+        """
+        Initialize the Redis client and start the invalidation listener.
+
+        Args:
+            redis_url: Redis connection URL. If None, uses Config.REDIS_URL
+            max_keys: Keys kept in the local cache. If None, uses Config.CACHE_MAX_KEYS
+            channel: Pub/sub invalidation channel. If None, uses Config.CACHE_INVALIDATION_CHANNEL
+        """
+        super().__init__(redis_url)
+        self.max_keys = max_keys or Config.CACHE_MAX_KEYS
+        self.channel = channel or Config.CACHE_INVALIDATION_CHANNEL
+        self._id = uuid.uuid4().hex
+        # key -> raw JSON (None caches a missing key)
+        self._cache: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._mutex = threading.Lock()
+        self._epoch = 0
+        self._online = False
+        self._stop = threading.Event()
+        self._fenced_set_publish = self.client.register_script(_FENCED_SET_PUBLISH_SCRIPT)
+        self._listener = threading.Thread(target=self._listen, name="persistence-invalidation", daemon=True)
+        self._listener.start()
+
+    # Invalidation
+    def _message(self, key: str) -> str:
+        return f"{self._id} {key}"
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            pubsub = self.client.pubsub()
+            try:
+                pubsub.subscribe(self.channel)
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    if message["type"] == "subscribe":
+                        self._set_online(True)
+                    elif message["type"] == "message":
+                        self._on_invalidation(message["data"])
+            except redis.RedisError as e:
+                log = logging.warning if self._online else logging.debug
+                log(f"Cache invalidation channel unavailable, reading through to Redis: {e}")
+            finally:
+                self._set_online(False)
+                pubsub.close()
+            self._stop.wait(Config.CACHE_RECONNECT_DELAY)
+
+    def _set_online(self, online: bool) -> None:
+        # Messages may have been missed while unsubscribed
+        with self._mutex:
+            self._cache.clear()
+            self._epoch += 1
+            self._online = online
+
+    def _on_invalidation(self, data: str) -> None:
+        sender, _, key = data.partition(" ")
+        if sender == self._id:
+            return
+        with self._mutex:
+            self._epoch += 1
+            if key == _ALL_KEYS:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    # Local cache
+    def _current_epoch(self) -> int:
+        with self._mutex:
+            return self._epoch
+
+    def _remember(self, key: str, raw: Optional[str], epoch: int) -> None:
+        """Cache raw unless a peer invalidation arrived since `epoch` was read."""
+        with self._mutex:
+            if not self._online or epoch != self._epoch:
+                self._cache.pop(key, None)
+                return
+            self._cache[key] = raw
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_keys:
+                self._cache.popitem(last=False)
+
+    def _forget(self, key: str) -> None:
+        with self._mutex:
+            self._cache.pop(key, None)
+
+    def _get(self, key: str) -> Optional[str]:
+        """Raw JSON from the local cache, or from Redis on a miss."""
+        with self._mutex:
+            if self._online and key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            epoch = self._epoch
+        raw = super()._get(key)
+        self._remember(key, raw, epoch)
+        return raw
+
+    # PersistenceStrategy
+    def save(self, key: str, data: Dict[str, Any]) -> None:
+        """Save data to Redis as JSON and invalidate peer caches."""
+        try:
+            serialized = json.dumps(data, indent=2)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Failed to serialize data for key '{key}': {str(e)}")
+        epoch = self._current_epoch()
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(key, serialized)
+            pipe.publish(self.channel, self._message(key))
+            pipe.execute()
+        except redis.RedisError as e:
+            self._forget(key)
+            raise ConnectionError(f"Failed to save to Redis: {str(e)}")
+        self._remember(key, serialized, epoch)
+
+    def delete(self, key: str) -> None:
+        """Delete a key from Redis and invalidate peer caches."""
+        epoch = self._current_epoch()
+        try:
+            pipe = self.client.pipeline()
+            pipe.delete(key)
+            pipe.publish(self.channel, self._message(key))
+            pipe.execute()
+        except redis.RedisError as e:
+            self._forget(key)
+            raise ConnectionError(f"Failed to delete from Redis: {str(e)}")
+        self._remember(key, None, epoch)
+
+    def exists(self, key: str) -> bool:
+        """Check if key exists (served from the local cache when possible)."""
+        return self._get(key) is not None
+
+    def clear_all(self) -> None:
+        """Clear all keys from the current Redis database and every peer cache."""
+        try:
+            pipe = self.client.pipeline()
+            pipe.flushdb()
+            pipe.publish(self.channel, self._message(_ALL_KEYS))
+            pipe.execute()
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to clear Redis: {str(e)}")
+        finally:
+            with self._mutex:
+                self._cache.clear()
+                self._epoch += 1
+
+    def save_fenced(self, task_key: str, key: str, data: Dict[str, Any], fencing_token: int) -> None:
+        """Save data as JSON only if fencing_token is still current, invalidating peer caches."""
+        epoch = self._current_epoch()
+        try:
+            serialized = json.dumps(data, indent=2)
+            accepted = self._fenced_set_publish(
+                keys=[f"fence:{task_key}", key],
+                args=[fencing_token, serialized, self.channel, self._message(key)]
+            )
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Failed to serialize data for key '{key}': {str(e)}")
+        except redis.RedisError as e:
+            self._forget(key)
+            raise ConnectionError(f"Failed to save to Redis: {str(e)}")
+        if not accepted:
+            # Another owner took over the task; whatever is cached may be stale
+            self._forget(key)
+            raise StaleWriteError(f"Rejected write to '{key}': fencing token {fencing_token} is stale")
+        self._remember(key, serialized, epoch)
+
+    def close(self) -> None:
+        """Stop the invalidation listener (the cache is disabled afterwards)."""
+        self._stop.set()
+        self._listener.join(timeout=5)
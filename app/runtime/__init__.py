@@ -0,0 +1,15 @@
+from app.runtime.budget import TaskBudget, BudgetExceededError
+from app.runtime.context import TaskContext, get_current_task, task_scope, check_task_budget, charge_task
+from app.runtime.scheduler import FairShareScheduler, get_scheduler
+
+__all__ = [
+    "TaskBudget",
+    "BudgetExceededError",
+    "TaskContext",
+    "get_current_task",
+    "task_scope",
+    "check_task_budget",
+    "charge_task",
+    "FairShareScheduler",
+    "get_scheduler",
+]
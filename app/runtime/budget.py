@@ -0,0 +1,85 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class BudgetExceededError(Exception):
+    """Lançada quando a tarefa esgota um dos seus orçamentos."""
+
+    def __init__(self, resource: str, used: float, limit: float):
+        super().__init__(f"Orçamento de '{resource}' esgotado ({used:g}/{limit:g})")
+        self.resource = resource
+        self.used = used
+        self.limit = limit
+
+
+class TaskBudget:
+    """
+    Orçamentos por tarefa: tempo de parede, tokens, chamadas de modelo e execuções do runner.
+
+    Limites ausentes ou 0 significam ilimitado. O consumo sobrevive a retomadas:
+    é salvo no estado (`snapshot`) e restaurado com `usage`.
+    """
+
+    RESOURCES = ("wall_seconds", "tokens", "llm_calls", "runner_runs")
+
+    def __init__(self, limits: Optional[Dict[str, float]] = None, usage: Optional[Dict[str, float]] = None):
+        self.limits = {k: float(v) for k, v in (limits or {}).items() if k in self.RESOURCES and v}
+        self.usage: Dict[str, float] = {k: 0.0 for k in self.RESOURCES}
+        for key, value in (usage or {}).items():
+            if key in self.usage:
+                self.usage[key] = float(value)
+        self._started: Optional[float] = None
+        self._wall_base = self.usage["wall_seconds"]
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Começa a contar o tempo de parede desta execução."""
+        with self._lock:
+            self._wall_base = self.usage["wall_seconds"]
+            self._started = time.monotonic()
+
+    def stop(self) -> None:
+        """Consolida o tempo de parede desta execução."""
+        with self._lock:
+            self._refresh_wall()
+            self._started = None
+
+    def _refresh_wall(self) -> None:
+        if self._started is not None:
+            self.usage["wall_seconds"] = self._wall_base + (time.monotonic() - self._started)
+
+    def record(self, resource: str, amount: float = 1) -> None:
+        """Registra consumo de um recurso."""
+        with self._lock:
+            self.usage[resource] += amount
+
+    def exceeded(self) -> Optional[BudgetExceededError]:
+        """Retorna o primeiro orçamento esgotado (ou None)."""
+        with self._lock:
+            self._refresh_wall()
+            for resource, limit in self.limits.items():
+                if self.usage[resource] >= limit:
+                    return BudgetExceededError(resource, self.usage[resource], limit)
+        return None
+
+    def remaining(self) -> Dict[str, float]:
+        """Saldo de cada orçamento limitado (nunca negativo)."""
+        with self._lock:
+            self._refresh_wall()
+            return {resource: max(limit - self.usage[resource], 0.0) for resource, limit in self.limits.items()}
+
+    def check(self) -> None:
+        """Lança BudgetExceededError se algum orçamento estiver esgotado."""
+        error = self.exceeded()
+        if error:
+            raise error
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Limites e consumo atuais (serializável no estado)."""
+        with self._lock:
+            self._refresh_wall()
+            return {
+                "limits": dict(self.limits),
+                "usage": {k: round(v, 3) for k, v in self.usage.items()},
+            }
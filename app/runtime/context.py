@@ -0,0 +1,53 @@
+import contextlib
+import contextvars
+from typing import Iterator, List, Optional
+from app.runtime.budget import TaskBudget
+
+
+class TaskContext:
+    """
+    Informações da tarefa TDD em execução, visíveis para as camadas compartilhadas
+    (chamadas de modelo, runner) sem precisar passá-las por parâmetro.
+    """
+
+    def __init__(self, task_key: str, priority: float = 1.0, budget: Optional[TaskBudget] = None):
+        self.task_key = task_key
+        self.priority = max(priority, 0.01)
+        self.remaining_steps = 0
+        self.budget = budget or TaskBudget()
+
+    def update_progress(self, plan: List[str], plan_index: int) -> None:
+        """Atualiza o número de sub-requisitos restantes (usado no shortest-remaining-plan-first)."""
+        self.remaining_steps = max(len(plan) - plan_index, 0)
+
+
+_current_task: contextvars.ContextVar[Optional[TaskContext]] = contextvars.ContextVar("current_task", default=None)
+
+
+def get_current_task() -> Optional[TaskContext]:
+    """Retorna o contexto da tarefa corrente (None fora de uma execução do orquestrador)."""
+    return _current_task.get()
+
+
+@contextlib.contextmanager
+def task_scope(context: TaskContext) -> Iterator[TaskContext]:
+    """Define a tarefa corrente durante o bloco (propagado para os nós do LangGraph)."""
+    token = _current_task.set(context)
+    try:
+        yield context
+    finally:
+        _current_task.reset(token)
+
+
+def check_task_budget() -> None:
+    """Interrompe (BudgetExceededError) se a tarefa corrente esgotou algum orçamento."""
+    context = _current_task.get()
+    if context is not None:
+        context.budget.check()
+
+
+def charge_task(resource: str, amount: float = 1) -> None:
+    """Registra consumo de recurso no orçamento da tarefa corrente."""
+    context = _current_task.get()
+    if context is not None:
+        context.budget.record(resource, amount)
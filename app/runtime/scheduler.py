@@ -0,0 +1,102 @@
+import contextlib
+import itertools
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional
+from app.config import Config
+from app.runtime.context import TaskContext, get_current_task
+
+
+class _Waiter:
+    def __init__(self, context: Optional[TaskContext], seq: int):
+        self.context = context
+        self.seq = seq
+
+
+class FairShareScheduler:
+    """
+    Escalonador de slots compartilhados (chamadas de modelo e execuções do runner)
+    entre as tarefas concorrentes do processo.
+
+    Quando há mais pedidos que slots livres, o próximo a ser atendido é escolhido por:
+        1. Fair share ponderado: menor tempo de slot já consumido / prioridade,
+           quantizado em Config.SCHEDULER_FAIRNESS_QUANTUM segundos;
+        2. Shortest-remaining-plan-first: menos sub-requisitos restantes no plano;
+        3. Ordem de chegada.
+    """
+
+    def __init__(self, capacities: Dict[str, int], quantum: Optional[float] = None):
+        self.capacities = dict(capacities)
+        self.quantum = quantum or Config.SCHEDULER_FAIRNESS_QUANTUM
+        self._cond = threading.Condition()
+        self._in_use: Dict[str, int] = defaultdict(int)
+        self._waiting: Dict[str, List[_Waiter]] = defaultdict(list)
+        self._usage: Dict[str, float] = defaultdict(float)
+        self._seq = itertools.count()
+
+    def _rank(self, waiter: _Waiter):
+        context = waiter.context
+        if context is None:
+            return (0, 0, waiter.seq)
+        share = int(self._usage[context.task_key] / context.priority / self.quantum)
+        return (share, context.remaining_steps, waiter.seq)
+
+    def _next(self, resource: str) -> Optional[_Waiter]:
+        waiting = self._waiting[resource]
+        return min(waiting, key=self._rank) if waiting else None
+
+    @contextlib.contextmanager
+    def slot(self, resource: str) -> Iterator[None]:
+        """Bloqueia até a tarefa corrente receber um slot do recurso e o libera ao final do bloco."""
+        capacity = self.capacities.get(resource)
+        if not capacity:
+            yield
+            return
+
+        context = get_current_task()
+        waiter = _Waiter(context, next(self._seq))
+        with self._cond:
+            self._waiting[resource].append(waiter)
+            while self._in_use[resource] >= capacity or self._next(resource) is not waiter:
+                self._cond.wait()
+            self._waiting[resource].remove(waiter)
+            self._in_use[resource] += 1
+            # Com mais de um slot livre, o próximo da fila também pode prosseguir
+            self._cond.notify_all()
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_use[resource] -= 1
+                if context is not None:
+                    self._usage[context.task_key] += time.monotonic() - started
+                self._cond.notify_all()
+
+    def forget(self, task_key: str) -> None:
+        """Descarta o histórico de consumo de uma tarefa encerrada."""
+        with self._cond:
+            self._usage.pop(task_key, None)
+
+    def usage(self, task_key: str) -> float:
+        """Segundos de slot consumidos pela tarefa."""
+        with self._cond:
+            return self._usage.get(task_key, 0.0)
+
+
+_scheduler: Optional[FairShareScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> FairShareScheduler:
+    """Retorna o escalonador compartilhado do processo."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FairShareScheduler({
+                "llm": Config.SCHEDULER_LLM_SLOTS,
+                "runner": Config.SCHEDULER_RUNNER_SLOTS,
+            })
+        return _scheduler
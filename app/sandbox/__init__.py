@@ -0,0 +1,7 @@
+from app.sandbox.pool import SandboxPool, SandboxWorker, get_sandbox_pool
+
+__all__ = [
+    "SandboxPool",
+    "SandboxWorker",
+    "get_sandbox_pool",
+]
@@ -0,0 +1,175 @@
+import logging
+import multiprocessing
+import queue
+import shutil
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+from app.config import Config
+from app.sandbox.worker import worker_main
+
+
+class SandboxWorker:
+    """Handle de um processo worker com limites de recursos e diretório temporário próprio."""
+
+    def __init__(self, cpu_seconds: int, memory_mb: int, file_size_mb: int):
+        ctx = multiprocessing.get_context("spawn")
+        self.scratch_dir = tempfile.mkdtemp(prefix="tdd_sandbox_")
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=worker_main,
+            args=(child_conn, self.scratch_dir, cpu_seconds, memory_mb, file_size_mb),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.runs = 0
+        self.timed_out = False
+
+    def run(self, job: Dict[str, Any], timeout: float) -> Optional[Dict[str, Any]]:
+        """Envia um job e aguarda o resultado. Retorna None se o worker travou ou morreu."""
+        self.runs += 1
+        self.timed_out = False
+        try:
+            self.conn.send(job)
+            if not self.conn.poll(timeout):
+                self.timed_out = True
+                return None
+            return self.conn.recv()
+        except (EOFError, OSError, BrokenPipeError):
+            self.process.join(timeout=1)
+            return None
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def stop(self) -> None:
+        """Encerra o worker e remove o diretório temporário."""
+        try:
+            if self.process.is_alive():
+                try:
+                    self.conn.send(None)
+                except (OSError, BrokenPipeError):
+                    pass
+                self.process.join(timeout=1)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join(timeout=1)
+        finally:
+            self.conn.close()
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+class SandboxPool:
+    """
+    Pool de processos sandbox para executar código gerado.
+
+    Cada worker roda com limites de CPU, memória (espaço de endereçamento) e tamanho
+    de arquivo, em um diretório temporário próprio. Workers são reciclados após
+    `max_runs` execuções, em timeout ou quando um limite é violado.
+    """
+
+    def __init__(
+        self,
+        size: int = None,
+        max_runs: int = None,
+        cpu_seconds: int = None,
+        memory_mb: int = None,
+        file_size_mb: int = None
+    ):
+        self.size = size or Config.SANDBOX_WORKERS
+        self.max_runs = max_runs or Config.SANDBOX_MAX_RUNS
+        self.cpu_seconds = cpu_seconds if cpu_seconds is not None else Config.SANDBOX_CPU_SECONDS
+        self.memory_mb = memory_mb if memory_mb is not None else Config.SANDBOX_MEMORY_MB
+        self.file_size_mb = file_size_mb if file_size_mb is not None else Config.SANDBOX_FILE_SIZE_MB
+
+        # Slots livres: None significa "worker ainda não criado" (inicialização preguiçosa)
+        self._idle: "queue.Queue[Optional[SandboxWorker]]" = queue.Queue()
+        for _ in range(self.size):
+            self._idle.put(None)
+        self._all: List[SandboxWorker] = []
+        self._lock = threading.Lock()
+
+    def _spawn(self) -> SandboxWorker:
+        worker = SandboxWorker(self.cpu_seconds, self.memory_mb, self.file_size_mb)
+        with self._lock:
+            self._all.append(worker)
+        return worker
+
+    def _retire(self, worker: SandboxWorker) -> None:
+        worker.stop()
+        with self._lock:
+            if worker in self._all:
+                self._all.remove(worker)
+
+    def run_pytest(
+        self,
+        files: Dict[str, str],
+        args: List[str],
+        timeout: float,
+        spill_path: Optional[str] = None
+    ) -> str:
+        """
+        Executa pytest em um worker livre (bloqueia até haver um disponível).
+
+        Args:
+            files: Arquivos a gravar no diretório do worker (nome -> conteúdo)
+            args: Argumentos para pytest.main
+            timeout: Tempo máximo de espera pelo resultado
+            spill_path: Arquivo opcional para a saída completa (caminho absoluto)
+
+        Returns:
+            Saída do pytest ou mensagem de erro
+        """
+        worker = self._idle.get()
+        recycle = False
+        try:
+            if worker is None or not worker.is_alive():
+                if worker is not None:
+                    self._retire(worker)
+                worker = self._spawn()
+
+            result = worker.run({"files": files, "args": args, "spill_path": spill_path}, timeout)
+
+            if result is None:
+                recycle = True
+                if worker.timed_out:
+                    return f"❌ Erro: execução de testes expirou (timeout de {timeout:g}s)."
+                return (
+                    f"❌ Erro: o processo sandbox foi encerrado (exit code {worker.process.exitcode}). "
+                    f"Provável violação de limite de CPU ({self.cpu_seconds}s), "
+                    f"memória ({self.memory_mb}MB) ou tamanho de arquivo ({self.file_size_mb}MB)."
+                )
+
+            if result.get("breach"):
+                logging.warning("⚠️ Sandbox: limite de recursos violado, reciclando worker.")
+                recycle = True
+            if worker.runs >= self.max_runs:
+                recycle = True
+
+            return result["output"]
+        finally:
+            if recycle and worker is not None:
+                self._retire(worker)
+                worker = None
+            self._idle.put(worker)
+
+    def shutdown(self) -> None:
+        """Encerra todos os workers."""
+        with self._lock:
+            workers = list(self._all)
+        for worker in workers:
+            self._retire(worker)
+
+
+_pool: Optional[SandboxPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Retorna o pool compartilhado do processo (criado sob demanda)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool()
+        return _pool
@@ -0,0 +1,105 @@
+"""
+Processo worker do sandbox.
+
+Roda em um processo separado (multiprocessing, start method 'spawn'), aplica
+limites de CPU, espaço de endereçamento e tamanho de arquivo via `resource`,
+trabalha em um diretório temporário próprio e executa o pytest in-process
+para cada job recebido pelo pipe.
+"""
+import contextlib
+import os
+import signal
+import sys
+from typing import Any, Dict
+
+MB = 1024 * 1024
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def apply_limits(cpu_seconds: int, memory_mb: int, file_size_mb: int) -> None:
+    """Aplica limites de recursos ao processo atual."""
+    import resource
+
+    if memory_mb:
+        limit = memory_mb * MB
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if file_size_mb:
+        limit = file_size_mb * MB
+        resource.setrlimit(resource.RLIMIT_FSIZE, (limit, limit))
+        # Sem isso o kernel mata o processo; ignorando, a escrita falha com EFBIG dentro do teste
+        signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+    if cpu_seconds:
+        # Limite rígido generoso; o limite suave é renovado a cada job em _arm_cpu_limit
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, resource.RLIM_INFINITY))
+
+
+def _arm_cpu_limit(cpu_seconds: int) -> None:
+    """RLIMIT_CPU é cumulativo: reposiciona o limite suave a partir do consumo atual."""
+    import resource
+
+    if not cpu_seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime) + 1
+    hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+    resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_seconds, hard))
+
+
+def _purge_modules(names) -> None:
+    """Remove módulos gerados do cache de imports para que cada job veja o código novo."""
+    for name in list(sys.modules):
+        if name in names:
+            del sys.modules[name]
+
+
+def _run_job(job: Dict[str, Any], scratch_dir: str, cpu_seconds: int) -> Dict[str, Any]:
+    files: Dict[str, str] = job["files"]
+    for old in os.listdir(scratch_dir):
+        path = os.path.join(scratch_dir, old)
+        if os.path.isfile(path):
+            os.remove(path)
+    for name, content in files.items():
+        with open(os.path.join(scratch_dir, name), "w", encoding="utf-8") as f:
+            f.write(content)
+
+    _purge_modules({os.path.splitext(name)[0] for name in files})
+
+    import pytest
+
+    from app.agents.output_capture import BoundedOutput
+
+    buffer = BoundedOutput(spill_path=job.get("spill_path"))
+    breach = False
+    _arm_cpu_limit(cpu_seconds)
+    try:
+        with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+            exit_code = pytest.main(job["args"])
+    except MemoryError:
+        breach = True
+        exit_code = -1
+        buffer.write("\n❌ MemoryError: limite de memória do sandbox excedido.\n")
+    finally:
+        buffer.close()
+
+    output = buffer.getvalue()
+    if "MemoryError" in output or "File too large" in output:
+        breach = True
+    return {"output": output, "exit_code": int(exit_code), "breach": breach}
+
+
+def worker_main(conn, scratch_dir: str, cpu_seconds: int, memory_mb: int, file_size_mb: int) -> None:
+    """Loop principal do worker: recebe jobs pelo pipe até receber None."""
+    sys.dont_write_bytecode = True  # Evita .pyc obsoletos entre jobs com o mesmo nome de arquivo
+    os.chdir(scratch_dir)
+    # Garante que o plugin app.agents.timeout_plugin seja importável fora do cwd original
+    sys.path[:0] = [scratch_dir, PROJECT_ROOT]
+    apply_limits(cpu_seconds, memory_mb, file_size_mb)
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        conn.send(_run_job(job, scratch_dir, cpu_seconds))
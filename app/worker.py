@@ -0,0 +1,22 @@
+import sys
+import multiprocessing
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import Config
+from app.jobs import worker_process_main
+
+if __name__ == "__main__":
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else Config.WORKER_PROCESSES
+    print(f"👷 Iniciando {processes} processo(s) worker na fila '{Config.PLAN_KEY}'...")
+
+    workers = [
+        multiprocessing.Process(target=worker_process_main, args=(index,))
+        for index in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def repo_root(monkeypatch):
+    """Executa o teste a partir da raiz do repositório (plugins `-p app.agents.*` do runner)."""
+    monkeypatch.chdir(ROOT)
+    return ROOT
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Todos os clientes criados via redis.from_url compartilham um servidor fakeredis."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # Scripts Lua (locks, fila, rate limiter)
+    import redis
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis, "from_url", lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs))
+    return server
+
+
+@pytest.fixture
+def closing():
+    """Registra recursos abertos pelo teste; todos são encerrados (close/shutdown) ao final."""
+    opened = []
+
+    def register(resource, method="close"):
+        opened.append(getattr(resource, method))
+        return resource
+
+    yield register
+    for close in opened:
+        close()
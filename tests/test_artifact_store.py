@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from app.persistence import FileArtifactStore, InMemoryArtifactStore, InMemoryPersistence, RedisArtifactStore
+from app.persistence.artifact_store import ARTIFACT_REF, artifact_digest
+
+BIG = "def f(x):\n    return x\n" * 40
+
+
+@pytest.fixture(params=["memory", "file", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryArtifactStore(cache_size=0)
+    if request.param == "file":
+        return FileArtifactStore(str(tmp_path / "artifacts"), cache_size=0)
+    request.getfixturevalue("fake_redis")
+    return RedisArtifactStore("redis://fake", cache_size=0)
+
+
+def test_round_trip_by_digest(store):
+    digest = store.put(BIG)
+
+    assert digest == artifact_digest(BIG)
+    assert store.get(digest) == BIG
+    with pytest.raises(KeyError):
+        store.get(artifact_digest("missing"))
+
+
+def test_identical_content_is_written_once(store, monkeypatch):
+    written = []
+    write = store._write
+    monkeypatch.setattr(store, "_write", lambda blobs, now: (written.extend(blobs), write(blobs, now)))
+
+    first = store.put_many([BIG, BIG])
+    second = store.put(BIG)
+
+    assert first == [second, second]
+    assert written == [second]
+
+
+def test_externalize_and_resolve_large_fields(store):
+    state = {"status": "code_written", "tests_code": BIG, "implementation_code": "x = 1"}
+
+    stored = store.externalize(state, ["tests_code", "implementation_code"], min_bytes=256)
+
+    assert stored["tests_code"] == {ARTIFACT_REF: artifact_digest(BIG)}
+    assert stored["implementation_code"] == "x = 1"
+    assert store.resolve(stored) == state
+
+
+def test_sweep_keeps_live_and_recent_blobs(store):
+    live = store.put(BIG)
+    dead = store.put(BIG + "# old\n")
+
+    assert store.sweep({live}, older_than=time.time() - 60) == 0
+    assert store.sweep({live}, older_than=time.time() + 60) == 1
+    assert store.get(live) == BIG
+    assert store.get_many([dead]) == {}
+
+
+def test_state_records_hold_only_digests():
+    persistence = InMemoryPersistence()
+    persistence.attach_artifact_store(InMemoryArtifactStore())
+    state = {"status": "green_passed", "tests_code": BIG, "specification": "curta"}
+
+    persistence.save_state("task", state)
+
+    record = persistence.load("state:task")
+    assert record["tests_code"] == {ARTIFACT_REF: artifact_digest(BIG)}
+    assert record["specification"] == "curta"
+    assert persistence.load_state("task") == state
+
+
+def test_garbage_collection_spares_referenced_blobs():
+    persistence = InMemoryPersistence()
+    persistence.attach_artifact_store(InMemoryArtifactStore())
+    persistence.save_state("task", {"tests_code": BIG})
+    persistence.save_state("task", {"tests_code": BIG + "# v2\n"})
+
+    assert persistence.collect_garbage(grace_seconds=-60) == 1
+    assert persistence.load_state("task") == {"tests_code": BIG + "# v2\n"}
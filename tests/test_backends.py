@@ -0,0 +1,62 @@
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from langchain_openai import ChatOpenAI
+
+from app.config import Config
+from app.llm import backends
+from app.llm.backends import backend_for, create_chat_model, register_backend_type
+
+BACKENDS = {
+    "local": {"type": "openai_compatible", "base_url": "http://localhost:8000/v1", "model": "qwen-coder"},
+    "fake": {"type": "fake", "responses": ["def add(a, b):\n    return a + b"]},
+    "broken": {"type": "openai_compatible"},
+    "mystery": {"type": "inexistente"},
+}
+
+
+@pytest.fixture(autouse=True)
+def backend_config(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_BACKEND", "local")
+    monkeypatch.setattr(Config, "LLM_BACKENDS", BACKENDS)
+    monkeypatch.setattr(Config, "AGENT_LLM_BACKENDS", {"developer": "fake", "tester": ""})
+    monkeypatch.setattr(backends, "_BACKEND_TYPES", dict(backends._BACKEND_TYPES))
+
+
+def test_each_agent_uses_its_configured_backend():
+    assert backend_for("developer") == "fake"
+    assert backend_for("tester") == "local"
+    assert backend_for("reviewer") == "local"
+
+    developer = create_chat_model("developer", "gpt-4o-mini")
+    assert isinstance(developer, FakeListChatModel)
+    assert developer.invoke("x").content == "def add(a, b):\n    return a + b"
+
+    tester = create_chat_model("tester", "gpt-4o-mini", temperature=0.2)
+    assert isinstance(tester, ChatOpenAI)
+    assert str(tester.openai_api_base) == "http://localhost:8000/v1"
+    # O backend local fixa o modelo servido, ignorando o modelo roteado
+    assert tester.model_name == "qwen-coder"
+    assert tester.temperature == 0.2
+
+
+def test_explicit_backend_overrides_the_agent_configuration():
+    assert isinstance(create_chat_model("tester", "gpt-4o-mini", backend="fake"), FakeListChatModel)
+
+
+def test_unknown_backend_raises_a_clear_error():
+    with pytest.raises(ValueError, match="Backend de LLM desconhecido: 'nenhum'"):
+        create_chat_model("developer", "gpt-4o-mini", backend="nenhum")
+
+    with pytest.raises(ValueError, match="Tipo de backend de LLM desconhecido: 'inexistente' \\(backend 'mystery'\\)"):
+        create_chat_model("developer", "gpt-4o-mini", backend="mystery")
+
+    with pytest.raises(ValueError, match="requer 'base_url'"):
+        create_chat_model("developer", "gpt-4o-mini", backend="broken")
+
+
+def test_registered_backend_types_are_available():
+    created = []
+    register_backend_type("inexistente", lambda model, temperature, settings: created.append(model) or "modelo")
+
+    assert create_chat_model("developer", "gpt-4o-mini", backend="mystery") == "modelo"
+    assert created == ["gpt-4o-mini"]
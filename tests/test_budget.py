@@ -0,0 +1,134 @@
+import pytest
+
+from app import orchestrator as orchestrator_module
+from app.orchestrator import TDDOrchestrator
+from app.persistence import InMemoryPersistence
+from app.runtime import BudgetExceededError, TaskBudget, TaskContext, charge_task, check_task_budget, task_scope
+
+
+def test_budget_is_exceeded_at_the_limit():
+    budget = TaskBudget({"llm_calls": 2, "tokens": 0})
+    budget.record("llm_calls")
+    budget.check()
+
+    budget.record("llm_calls")
+    with pytest.raises(BudgetExceededError) as info:
+        budget.check()
+    assert info.value.resource == "llm_calls"
+    assert info.value.used == 2 and info.value.limit == 2
+
+
+def test_missing_or_zero_limits_are_unlimited():
+    budget = TaskBudget({"tokens": 0, "unknown": 5})
+    budget.record("tokens", 10 ** 9)
+
+    assert budget.limits == {}
+    assert budget.exceeded() is None
+
+
+def test_usage_survives_a_resume():
+    first = TaskBudget({"runner_runs": 3})
+    first.record("runner_runs", 2)
+    snapshot = first.snapshot()
+
+    resumed = TaskBudget({"runner_runs": 3}, usage=snapshot["usage"])
+    assert resumed.usage["runner_runs"] == 2
+    resumed.record("runner_runs")
+    assert resumed.exceeded().resource == "runner_runs"
+
+
+def test_charges_go_to_the_current_task():
+    context = TaskContext("task", budget=TaskBudget({"tokens": 100}))
+    charge_task("tokens", 500)  # Fora de uma tarefa: ignorado
+    with task_scope(context):
+        charge_task("tokens", 100)
+        with pytest.raises(BudgetExceededError):
+            check_task_budget()
+    assert context.budget.usage["tokens"] == 100
+
+
+TESTS_CODE = """from app_code import add
+
+
+def test_add():
+    assert add(1, 2) == 3
+"""
+
+IMPLEMENTATION_CODE = """def add(a, b):
+    return a + b
+"""
+
+
+def test_resume_restores_the_phase_interrupted_by_the_budget(tmp_path, monkeypatch):
+    runs = []
+
+    def fake_run_pytest(**kwargs):
+        runs.append(kwargs)
+        return "test_app.py::test_add PASSED\n1 passed in 0.01s"
+
+    monkeypatch.setattr(orchestrator_module, "run_pytest", fake_run_pytest)
+    monkeypatch.setattr(orchestrator_module.Config, "PLANNER_STREAMING", False)
+    monkeypatch.setattr(orchestrator_module.Config, "TEST_PREFETCH_DEPTH", 0)
+
+    persistence = InMemoryPersistence()
+    orchestrator = TDDOrchestrator(
+        task_key="resume",
+        persistence=persistence,
+        budget={},
+        workspace_path=str(tmp_path)
+    )
+    orchestrator.performance_check = False
+    orchestrator.refactor = False
+    orchestrator.minimize_suite = False
+
+    # Preemptado no pre-flight logo após o Developer escrever o código
+    persistence.save_state("resume", {
+        "specification": "somar dois números",
+        "function_name": "add",
+        "plan": ["somar dois inteiros"],
+        "current_sub_req": "somar dois inteiros",
+        "tests_code": TESTS_CODE,
+        "implementation_code": IMPLEMENTATION_CODE,
+        "feedback": "",
+        "iteration": 1,
+        "plan_index": 0,
+        "max_retries": 3,
+        "phase": "green",
+        "status": "budget_exceeded",
+        "resume_node": "execute_preflight",
+        "resume_status": "code_written",
+    })
+
+    final = orchestrator.run(resume=True)
+
+    assert runs, "o GREEN deveria ter executado a suíte após o pre-flight"
+    assert final["status"] == "plan_complete"
+    assert final["resume_node"] == ""
+
+
+def test_remaining_is_never_negative():
+    budget = TaskBudget({"tokens": 100, "llm_calls": 4})
+    budget.record("tokens", 150)
+    budget.record("llm_calls")
+
+    assert budget.remaining() == {"tokens": 0.0, "llm_calls": 3.0}
+
+
+def test_branch_runs_with_the_budget_it_was_given(tmp_path, monkeypatch):
+    seen = {}
+
+    def fake_run(self, resume=False, **kwargs):
+        seen[self.task_key] = dict(self.budget_limits)
+        return {"status": "plan_complete"}
+
+    monkeypatch.setattr(TDDOrchestrator, "run", fake_run)
+    parent = TDDOrchestrator(
+        task_key="parent",
+        persistence=InMemoryPersistence(),
+        budget={"tokens": 1000},
+        workspace_path=str(tmp_path / "workspace")
+    )
+
+    parent._run_branch({"plan": ["a", "b"]}, 1, {"tokens": 250.0})
+
+    assert seen == {"parent:branch:1": {"tokens": 250.0}}
@@ -0,0 +1,74 @@
+from app.agents.fingerprint import detect_stuck_loop, failing_tests, failure_fingerprint, parse_test_results
+
+RUN = """test_app.py::test_add FAILED                                             [ 33%]
+test_app.py::test_div FAILED                                             [ 66%]
+test_app.py::test_ok PASSED                                              [100%]
+
+=================================== FAILURES ===================================
+___________________________________ test_add ___________________________________
+test_app.py:3: in test_add
+    assert add(1, 2) == 3
+E   assert <app_code.Money object at {address}> == 3
+=========================== short test summary info ============================
+FAILED test_app.py::test_add - assert <app_code.Money object at {address}> == 3
+FAILED test_app.py::test_div - ZeroDivisionError: division by zero
+========================= 2 failed, 1 passed in {duration}s ==========================
+"""
+
+COLLECTION_ERROR = """test_app.py:1: in <module>
+    from app_code import add, div
+E     File "{path}/app_code.py", line {line}
+E       def broken(:
+E                  ^
+E   SyntaxError: invalid syntax
+=========================== short test summary info ============================
+ERROR test_app.py
+!!!!!!!!!!!!!!!!!!!! Interrupted: 1 error during collection !!!!!!!!!!!!!!!!!!!!
+=============================== 1 error in {duration}s ===============================
+"""
+
+
+def test_results_are_parsed_from_the_verbose_output():
+    output = RUN.format(address="0x7fe211132060", duration="0.04")
+
+    assert parse_test_results(output) == {
+        "test_app.py::test_add": "FAILED",
+        "test_app.py::test_div": "FAILED",
+        "test_app.py::test_ok": "PASSED",
+    }
+    assert failing_tests(output) == ["test_app.py::test_add", "test_app.py::test_div"]
+
+
+def test_addresses_and_durations_do_not_change_the_fingerprint():
+    first = failure_fingerprint(RUN.format(address="0x7fe211132060", duration="0.04"))
+    second = failure_fingerprint(RUN.format(address="0x7f0a9bc4e2d0", duration="1.37"))
+
+    assert first == second
+
+
+def test_a_different_failure_changes_the_fingerprint():
+    output = RUN.format(address="0x7fe211132060", duration="0.04")
+
+    assert failure_fingerprint(output) != failure_fingerprint(output.replace("== 3", "== 4"))
+
+
+def test_collection_errors_ignore_paths_and_line_numbers():
+    first = failure_fingerprint(COLLECTION_ERROR.format(path="/tmp/tdd_sandbox_ab12", line=1, duration="0.20"))
+    second = failure_fingerprint(COLLECTION_ERROR.format(path="/tmp/tdd_sandbox_cd34", line=7, duration="0.31"))
+    other = failure_fingerprint(
+        COLLECTION_ERROR.format(path="/tmp/tdd_sandbox_ab12", line=1, duration="0.20")
+        .replace("SyntaxError: invalid syntax", "IndentationError: unexpected indent")
+    )
+
+    assert first == second
+    assert first != other
+
+
+def test_repeat_and_oscillation_are_detected():
+    a = failure_fingerprint(RUN.format(address="0x1", duration="0.04"))
+    b = failure_fingerprint(RUN.format(address="0x1", duration="0.04").replace("== 3", "== 4"))
+
+    assert detect_stuck_loop([], a) is None
+    assert detect_stuck_loop([a], b) is None
+    assert detect_stuck_loop([a, b], b) == "repeat"
+    assert detect_stuck_loop([a, b], a) == "oscillation"
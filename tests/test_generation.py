@@ -0,0 +1,108 @@
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+
+from app import orchestrator as orchestrator_module
+from app.agents import developer, tester
+from app.agents.developer import GenerationFailed, _developer_line_check, generate_code_incremental
+from app.agents.tester import generate_test_for_sub_req
+from app.config import Config
+from app.llm import GenerationAborted, stream_completion
+from app.orchestrator import TDDOrchestrator
+from app.persistence import InMemoryPersistence
+
+VALID_CODE = "def roman_to_int(s):\n    return 1"
+
+
+def stream(response, function_name="roman_to_int"):
+    llm = FakeListChatModel(responses=[response])
+    return stream_completion(llm, [HumanMessage(content="gere")], line_check=_developer_line_check(function_name))
+
+
+def test_wrong_function_name_aborts_mid_stream():
+    response = "def roman_to_integer(s):\n" + "    total = 0\n" * 200
+
+    with pytest.raises(GenerationAborted) as info:
+        stream(response)
+
+    assert "roman_to_integer" in info.value.reason
+    # Abortado logo na primeira linha, sem consumir o resto da resposta
+    assert len(info.value.partial) < 40
+
+
+def test_helpers_before_the_target_are_accepted():
+    response = (
+        "def _value(c):\n    return 1\n\n"
+        "def is_valid(s):\n    return True\n\n"
+        "def roman_to_int(s):\n    return sum(_value(c) for c in s)"
+    )
+
+    assert stream(response) == response
+
+
+def test_missing_target_aborts_after_the_line_limit(monkeypatch):
+    monkeypatch.setattr(Config, "DEVELOPER_NAME_CHECK_LINES", 3)
+
+    with pytest.raises(GenerationAborted) as info:
+        stream("x = 1\ny = 2\nz = 3\n" + "w = 4\n" * 100)
+
+    assert "ausente" in info.value.reason
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Substitui o modelo dos agentes por um FakeListChatModel com as respostas dadas."""
+    created = []
+
+    def use(*responses):
+        llm = FakeListChatModel(responses=list(responses))
+        created.append(llm)
+        for module in (developer, tester):
+            monkeypatch.setattr(module, "create_chat_model", lambda *args, **kwargs: llm)
+        return llm
+
+    return use
+
+
+def test_fenced_response_is_retried(fake_llm):
+    llm = fake_llm("```python\n" + VALID_CODE + "\n```", VALID_CODE)
+
+    assert generate_code_incremental("def test_x(): pass", "roman_to_int", model="model") == VALID_CODE
+    assert llm.i == 0  # As duas respostas foram consumidas
+
+
+def test_tester_without_previous_tests_raises_generation_failed(fake_llm):
+    fake_llm("isto não é código")
+
+    with pytest.raises(GenerationFailed):
+        generate_test_for_sub_req("somar", "add", all_tests_code="", model="model")
+
+
+def test_tester_failure_ends_the_workflow(fake_llm, tmp_path, monkeypatch):
+    fake_llm("isto não é código")
+    monkeypatch.setattr(orchestrator_module.Config, "PLANNER_STREAMING", False)
+    monkeypatch.setattr(orchestrator_module.Config, "TEST_PREFETCH_DEPTH", 0)
+
+    persistence = InMemoryPersistence()
+    orchestrator = TDDOrchestrator(task_key="tester", persistence=persistence, budget={}, workspace_path=str(tmp_path))
+    persistence.save_state("tester", {
+        "specification": "somar dois números",
+        "function_name": "add",
+        "plan": ["somar dois inteiros"],
+        "current_sub_req": "somar dois inteiros",
+        "tests_code": "",
+        "implementation_code": "",
+        "feedback": "",
+        "iteration": 0,
+        "plan_index": 0,
+        "max_retries": 3,
+        "phase": "red",
+        "status": "budget_exceeded",
+        "resume_node": "execute_tester",
+        "resume_status": "planned",
+    })
+
+    final = orchestrator.run(resume=True)
+
+    assert final["status"] == "tester_failed"
+    assert "Tester falhou" in final["error_message"]
@@ -0,0 +1,145 @@
+import os
+
+import pytest
+
+from app.persistence import LogStructuredPersistence, StaleWriteError
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "state.log")
+
+
+@pytest.fixture
+def open_log(log_path, closing):
+    return lambda: closing(LogStructuredPersistence(log_path, sync_interval=0, compact_interval=0))
+
+
+def test_replay_restores_the_latest_values(open_log):
+    log = open_log()
+    log.save("state:a", {"status": "tests_written"})
+    log.save("state:a", {"status": "code_written"})
+    log.save("state:b", {"status": "starting"})
+    log.delete("state:b")
+    log.close()
+
+    reopened = open_log()
+    assert reopened.load("state:a") == {"status": "code_written"}
+    assert not reopened.exists("state:b")
+    assert reopened.load_state("a") == {"status": "code_written"}
+    assert reopened.list_tasks() == ["a"]
+
+
+def test_torn_tail_from_a_crash_is_truncated(open_log, log_path):
+    log = open_log()
+    log.save("state:a", {"status": "green_passed"})
+    log.close()
+    intact = os.path.getsize(log_path)
+
+    # Registro pela metade: o processo morreu durante o append
+    with open(log_path, "ab") as f:
+        f.write(b"\x40\x00\x00\x00\x00\x00\x00\x00{\"op\":\"set\"")
+
+    reopened = open_log()
+    assert reopened.load("state:a") == {"status": "green_passed"}
+    assert os.path.getsize(log_path) == intact
+
+    reopened.save("state:a", {"status": "plan_complete"})
+    assert reopened.load("state:a") == {"status": "plan_complete"}
+
+
+def test_corrupt_record_stops_the_replay(open_log, log_path):
+    log = open_log()
+    log.save("state:a", {"status": "one"})
+    size = os.path.getsize(log_path)
+    log.save("state:a", {"status": "two"})
+    log.close()
+
+    with open(log_path, "r+b") as f:
+        f.seek(size + 10)
+        f.write(b"X")
+
+    assert open_log().load("state:a") == {"status": "one"}
+
+
+def test_compaction_keeps_live_records_and_fences(open_log, log_path):
+    log = open_log()
+    token = log.acquire_task_lock("a", "w1", 60)
+    for i in range(20):
+        log.save_fenced("a", "state:a", {"step": i}, token)
+    log.save("state:b", {"step": 0})
+    log.delete("state:b")
+    assert log.garbage_ratio() > 0.8
+
+    before = os.path.getsize(log_path)
+    log.compact()
+
+    assert os.path.getsize(log_path) < before / 5
+    assert log.garbage_ratio() == 0.0
+    assert log.load("state:a") == {"step": 19}
+    assert not log.exists("state:b")
+    assert log.acquire_task_lock("a", "w2", 60) is None
+    log.close()
+
+    reopened = open_log()
+    assert reopened.load("state:a") == {"step": 19}
+    assert reopened.acquire_task_lock("a", "w1", 60) == token + 1
+
+
+def test_fencing_survives_a_restart(open_log):
+    log = open_log()
+    old_token = log.acquire_task_lock("a", "w1", 60)
+    log.release_task_lock("a", "w1")
+    log.close()
+
+    reopened = open_log()
+    new_token = reopened.acquire_task_lock("a", "w2", 60)
+    assert new_token > old_token
+    with pytest.raises(StaleWriteError):
+        reopened.save_fenced("a", "state:a", {}, old_token)
+    assert not reopened.renew_task_lock("a", "w1", 60)
+    assert reopened.renew_task_lock("a", "w2", 60)
+
+
+def test_clear_all_keeps_locks(open_log):
+    log = open_log()
+    token = log.acquire_task_lock("a", "w1", 60)
+    log.save("state:a", {"x": 1})
+    log.save("other", {"y": 2})
+
+    log.clear_all()
+
+    assert log.list_tasks() == []
+    assert not log.exists("other")
+    log.save_fenced("a", "state:a", {"x": 2}, token)
+    assert log.load("state:a") == {"x": 2}
+
+
+def test_instances_sharing_a_log_see_each_other(open_log):
+    first, second = open_log(), open_log()
+
+    first.save("state:a", {"by": "first"})
+    assert second.load("state:a") == {"by": "first"}
+
+    second.compact()
+    first.save("state:b", {"by": "first"})
+    assert second.list_tasks() == ["a", "b"]
+    assert first.load("state:a") == {"by": "first"}
+
+
+def test_compaction_after_clear_all_does_not_restore_old_records(open_log):
+    log = open_log()
+    log.save("state:a", {"v": 1})
+    log.save("other", {"v": 2})
+    log.clear_all()
+    log.save("state:b", {"v": 3})
+
+    log.compact()
+    log.close()
+
+    reopened = open_log()
+    assert not reopened.exists("state:a")
+    assert not reopened.exists("other")
+    assert reopened.list_tasks() == ["b"]
+    reopened.compact()
+    assert open_log().list_tasks() == ["b"]
@@ -0,0 +1,26 @@
+from app.llm import ModelRouter
+
+
+def make_router():
+    return ModelRouter(
+        tiers=["fast", "mid", "strong"],
+        agent_tiers={"developer": 0},
+        iteration_thresholds=[4],
+        failure_threshold=2
+    )
+
+
+def test_developer_escalates_on_each_detected_loop():
+    router = make_router()
+
+    assert router.select("developer") == "fast"
+    assert router.select("developer", stuck=1) == "mid"
+    assert router.select("developer", iteration=4, stuck=1) == "strong"
+    assert router.select("developer", stuck=5) == "strong"
+
+
+def test_repeated_failures_escalate_every_threshold():
+    router = make_router()
+
+    assert router.select("tester", failures=1) == "fast"
+    assert router.select("tester", failures=2) == "mid"
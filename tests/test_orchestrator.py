@@ -0,0 +1,274 @@
+import os
+
+import pytest
+from langchain_core.language_models import FakeListChatModel
+
+from app import orchestrator as orchestrator_module
+from app.agents import developer
+from app.agents.developer import GenerationFailed
+from app.orchestrator import TDDOrchestrator
+from app.persistence import InMemoryPersistence
+
+TESTS_CODE = """from app_code import add
+
+
+def test_add():
+    assert add(1, 2) == 3
+
+
+def test_add_negative():
+    assert add(-1, -2) == -3
+
+
+def test_add_strings():
+    assert add("a", "b") == "ab"
+"""
+
+LAST_GREEN_CODE = "def add(a, b):\n    return a + b"
+BROKEN_CODE = "def add(a, b):\n    return a - b"
+FIXED_CODE = "def add(a, b):\n    result = a + b\n    return result"
+
+REGRESSION_RUN = """test_app.py::test_add FAILED
+test_app.py::test_add_negative FAILED
+test_app.py::test_add_strings FAILED
+=========================== short test summary info ============================
+FAILED test_app.py::test_add - assert -1 == 3
+FAILED test_app.py::test_add_negative - assert 1 == -3
+FAILED test_app.py::test_add_strings - TypeError: unsupported operand type(s) for -: 'str' and 'str'
+3 failed in 0.01s"""
+
+GREEN_RUN = """test_app.py::test_add PASSED
+test_app.py::test_add_negative PASSED
+test_app.py::test_add_strings PASSED
+3 passed in 0.01s"""
+
+
+@pytest.fixture
+def new_orchestrator(tmp_path, monkeypatch):
+    """Orquestrador sem planner em streaming, prefetch e fases pós-GREEN opcionais."""
+    monkeypatch.setattr(orchestrator_module.Config, "PLANNER_STREAMING", False)
+    monkeypatch.setattr(orchestrator_module.Config, "TEST_PREFETCH_DEPTH", 0)
+
+    def new_orchestrator(budget=None):
+        orchestrator = TDDOrchestrator(
+            task_key="task",
+            persistence=InMemoryPersistence(),
+            budget=budget or {},
+            workspace_path=str(tmp_path)
+        )
+        orchestrator.performance_check = False
+        orchestrator.refactor = False
+        orchestrator.minimize_suite = False
+        return orchestrator
+
+    return new_orchestrator
+
+
+@pytest.fixture
+def orchestrator(new_orchestrator):
+    return new_orchestrator()
+
+
+def test_regression_restores_the_last_green_code_without_the_reviewer(orchestrator, tmp_path, monkeypatch):
+    impl_path = tmp_path / "app_code.py"
+    runs = iter([REGRESSION_RUN, GREEN_RUN])
+    developer_calls = []
+    llm = FakeListChatModel(responses=[FIXED_CODE])
+
+    def record_developer(**kwargs):
+        developer_calls.append({**kwargs, "file": impl_path.read_text(encoding="utf-8")})
+        return generate_code(**kwargs)
+
+    generate_code = orchestrator_module.generate_code_incremental
+    monkeypatch.setattr(orchestrator_module, "generate_code_incremental", record_developer)
+    monkeypatch.setattr(orchestrator_module, "run_pytest", lambda **kwargs: next(runs))
+    monkeypatch.setattr(orchestrator_module, "analyze_failures", lambda **kwargs: pytest.fail("Reviewer chamado"))
+    monkeypatch.setattr(developer, "create_chat_model", lambda *args, **kwargs: llm)
+
+    impl_path.write_text(BROKEN_CODE, encoding="utf-8")
+    orchestrator.persistence.save_state("task", {
+        "specification": "somar números e concatenar strings",
+        "function_name": "add",
+        "plan": ["somar strings"],
+        "current_sub_req": "somar strings",
+        "tests_code": TESTS_CODE,
+        "implementation_code": BROKEN_CODE,
+        "feedback": "",
+        "iteration": 1,
+        "plan_index": 0,
+        "max_retries": 5,
+        "phase": "green",
+        # test_add_strings é o teste novo: não estava no último GREEN
+        "last_green_code": LAST_GREEN_CODE,
+        "last_green_passed": ["test_app.py::test_add", "test_app.py::test_add_negative"],
+        "status": "budget_exceeded",
+        "resume_node": "execute_runner_green",
+        "resume_status": "preflight_green_ok",
+    })
+
+    final = orchestrator.run(resume=True)
+
+    assert final["status"] == "plan_complete"
+    assert len(developer_calls) == 1
+    call = developer_calls[0]
+    assert call["file"] == LAST_GREEN_CODE
+    assert call["previous_code"] == LAST_GREEN_CODE
+    assert "ROLLBACK POR REGRESSÃO" in call["feedback"]
+    # Só o teste novo é pedido ao Developer; as regressões vêm de last_green_passed
+    assert "FAÇA PASSAR APENAS:\n- test_app.py::test_add_strings: TypeError" in call["feedback"]
+    assert "test_app.py::test_add_negative:" not in call["feedback"]
+    assert impl_path.read_text(encoding="utf-8") == FIXED_CODE
+    assert final["last_green_code"] == FIXED_CODE
+
+
+def stop_developer(**kwargs):
+    """Encerra o workflow no Developer seguinte ao GREEN."""
+    raise GenerationFailed("fim do teste")
+
+
+def test_failures_outside_the_last_green_go_to_the_reviewer(orchestrator, tmp_path, monkeypatch):
+    reviewed = []
+    monkeypatch.setattr(orchestrator_module, "run_pytest", lambda **kwargs: REGRESSION_RUN)
+    monkeypatch.setattr(orchestrator_module, "analyze_failures", lambda **kwargs: reviewed.append(kwargs) or "revisão")
+    monkeypatch.setattr(orchestrator_module, "generate_code_incremental", stop_developer)
+
+    (tmp_path / "app_code.py").write_text(BROKEN_CODE, encoding="utf-8")
+    orchestrator.persistence.save_state("task", {
+        "specification": "somar números",
+        "function_name": "add",
+        "plan": ["somar"],
+        "current_sub_req": "somar",
+        "tests_code": TESTS_CODE,
+        "implementation_code": BROKEN_CODE,
+        "feedback": "",
+        "iteration": 1,
+        "plan_index": 0,
+        "max_retries": 5,
+        "phase": "green",
+        "last_green_code": LAST_GREEN_CODE,
+        "last_green_passed": [],
+        "status": "budget_exceeded",
+        "resume_node": "execute_runner_green",
+        "resume_status": "preflight_green_ok",
+    })
+
+    final = orchestrator.run(resume=True)
+
+    assert final["status"] == "developer_failed"
+    assert final["feedback"] == "revisão"
+    assert len(reviewed) == 1
+    assert (tmp_path / "app_code.py").read_text(encoding="utf-8") == BROKEN_CODE
+
+
+def test_independent_batch_stops_at_dependencies_and_the_branch_limit(orchestrator, monkeypatch):
+    monkeypatch.setattr(orchestrator_module.Config, "PLAN_PARALLEL_BRANCHES", 3)
+    plan = ["a", "b", "c", "d", "e"]
+
+    state = {"plan": plan, "plan_dependencies": [[], [], [0], [], []]}
+    assert orchestrator._independent_batch(state, 0) == [0, 1]
+    assert orchestrator._independent_batch(state, 2) == [2, 3, 4]
+
+    state = {"plan": plan, "plan_dependencies": [[]] * 5}
+    assert orchestrator._independent_batch(state, 0) == [0, 1, 2]
+    # Ramos descartados no join: o lote volta a rodar em sequência
+    assert orchestrator._independent_batch({**state, "sequential_until": 2}, 0) == [0]
+    # Dependências desconhecidas (plano ainda chegando em streaming)
+    assert orchestrator._independent_batch({"plan": plan, "plan_dependencies": [[]]}, 0) == [0]
+
+
+def test_branch_workspace_is_removed_after_the_join(orchestrator, monkeypatch):
+    workspaces = []
+
+    def fake_run(self, resume=False, **kwargs):
+        workspaces.append(self.workspace_path)
+        assert os.path.isdir(self.workspace_path)
+        return {"status": "plan_complete"}
+
+    monkeypatch.setattr(TDDOrchestrator, "run", fake_run)
+
+    orchestrator._run_branch({"plan": ["a", "b"]}, 1, {})
+
+    assert len(workspaces) == 1 and not os.path.exists(workspaces[0])
+
+
+BRANCH_BASE = "from app_code import add\n\n\ndef test_add():\n    assert add(1, 2) == 3\n"
+
+
+def branch_state(**overrides):
+    return {
+        "specification": "somar números",
+        "function_name": "add",
+        "plan": ["somar inteiros", "somar floats"],
+        "plan_dependencies": [[], []],
+        "current_sub_req": "somar inteiros",
+        "tests_code": BRANCH_BASE,
+        "implementation_code": LAST_GREEN_CODE,
+        "feedback": "",
+        "iteration": 0,
+        "plan_index": 0,
+        "max_retries": 5,
+        "branch_steps": [0, 1],
+        "status": "budget_exceeded",
+        "resume_node": "execute_branches",
+        "resume_status": "branches_ready",
+        **overrides,
+    }
+
+
+@pytest.fixture
+def fake_branches(monkeypatch):
+    """Ramos com resultado fixo: cada um acrescenta `tests[index]` à suíte base."""
+    calls = {"budgets": {}, "tests": {}}
+
+    def fake_run_branch(self, state, index, budget):
+        calls["budgets"][index] = budget
+        return {
+            "status": "plan_complete",
+            "tests_code": BRANCH_BASE + calls["tests"][index],
+            "implementation_code": LAST_GREEN_CODE,
+            "budget": {"usage": {"tokens": 100, "llm_calls": 2}},
+        }
+
+    monkeypatch.setattr(TDDOrchestrator, "_run_branch", fake_run_branch)
+    return calls
+
+
+def test_join_merges_the_branch_tests_and_splits_the_budget(new_orchestrator, tmp_path, monkeypatch, fake_branches):
+    monkeypatch.setattr(orchestrator_module, "run_pytest", lambda **kwargs: GREEN_RUN)
+    fake_branches["tests"] = {
+        0: "\n\ndef test_add_negative():\n    assert add(-1, -2) == -3\n",
+        1: "\n\ndef test_add_floats():\n    assert add(0.5, 0.25) == 0.75\n",
+    }
+    orchestrator = new_orchestrator(budget={"tokens": 1000, "llm_calls": 10})
+    orchestrator.persistence.save_state("task", branch_state())
+
+    final = orchestrator.run(resume=True)
+
+    assert final["status"] == "plan_complete"
+    assert "def test_add_negative():" in final["tests_code"] and "def test_add_floats():" in final["tests_code"]
+    assert (tmp_path / "test_app.py").read_text(encoding="utf-8") == final["tests_code"]
+    # Saldo dividido entre os dois ramos; o consumo dos ramos volta para a tarefa
+    assert fake_branches["budgets"] == {0: {"tokens": 500.0, "llm_calls": 5.0}, 1: {"tokens": 500.0, "llm_calls": 5.0}}
+    assert final["budget"]["usage"]["tokens"] == 200
+    assert final["budget"]["usage"]["llm_calls"] == 4
+
+
+def test_conflicting_branch_tests_fall_back_to_sequential(orchestrator, monkeypatch, fake_branches):
+    monkeypatch.setattr(orchestrator_module, "run_pytest", lambda **kwargs: pytest.fail("join executado"))
+    monkeypatch.setattr(orchestrator_module, "generate_test_for_sub_req", stop_tester)
+    same_name = "\n\ndef test_add_more():\n    assert add({0}, 1) == {1}\n"
+    fake_branches["tests"] = {0: same_name.format(1, 2), 1: same_name.format(2, 3)}
+    orchestrator.persistence.save_state("task", branch_state())
+
+    final = orchestrator.run(resume=True)
+
+    # Tester chamado para o primeiro passo do lote, agora em sequência
+    assert final["status"] == "tester_failed"
+    assert final["plan_index"] == 0 and final["current_sub_req"] == "somar inteiros"
+    assert final["sequential_until"] == 2
+    assert final["tests_code"] == BRANCH_BASE
+
+
+def stop_tester(**kwargs):
+    """Encerra o workflow no Tester seguinte ao join."""
+    raise GenerationFailed("fim do teste")
@@ -0,0 +1,51 @@
+from app.agents.output_capture import BoundedOutput
+
+
+def test_short_output_is_kept_whole():
+    buffer = BoundedOutput(head_chars=10, tail_chars=10)
+    buffer.write("abc")
+    buffer.write("def")
+    assert buffer.getvalue() == "abcdef"
+    assert not buffer.truncated
+
+
+def test_keeps_head_and_tail_and_marks_the_gap():
+    buffer = BoundedOutput(head_chars=5, tail_chars=5)
+    for chunk in ("01234", "56789", "abcde", "fghij"):
+        buffer.write(chunk)
+
+    value = buffer.getvalue()
+    assert value.startswith("01234")
+    assert value.endswith("fghij")
+    assert buffer.truncated
+    assert buffer.dropped == 10
+    assert buffer.total == 20
+    assert "10 caracteres omitidos" in value
+    assert "56789" not in value and "abcde" not in value
+
+
+def test_chunk_split_across_head_and_tail():
+    buffer = BoundedOutput(head_chars=3, tail_chars=4)
+    buffer.write("abcdefghij")
+    assert buffer.getvalue().startswith("abc")
+    assert buffer.getvalue().endswith("ghij")
+    assert buffer.dropped == 3
+
+
+def test_memory_stays_bounded():
+    buffer = BoundedOutput(head_chars=100, tail_chars=100)
+    for _ in range(10_000):
+        buffer.write("x" * 50)
+    assert sum(len(part) for part in buffer._tail) <= 100
+    assert len(buffer.getvalue()) < 300
+
+
+def test_spill_file_receives_everything(tmp_path):
+    spill = tmp_path / "logs" / "run.log"
+    buffer = BoundedOutput(head_chars=2, tail_chars=2, spill_path=str(spill))
+    buffer.write("hello ")
+    buffer.write("world")
+    buffer.close()
+
+    assert spill.read_text(encoding="utf-8") == "hello world"
+    assert str(spill) in buffer.getvalue()
@@ -0,0 +1,163 @@
+import pytest
+
+from app.agents import performance
+from app.agents.performance import (
+    check_complexity,
+    compare_performance,
+    fit_exponent,
+    infer_input_kind,
+    parse_complexity_target,
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("A função deve rodar em O(n log n)", ("O(n log n)", 1.0)),
+    ("Complexidade O(n²) no pior caso", ("O(n²)", 2.0)),
+    ("Use um algoritmo O(√n)", ("O(√n)", 0.5)),
+    ("busca em O(log n)", ("O(log n)", 0.0)),
+    ("O(n^3)", ("O(n^3)", 3.0)),
+    ("deve executar em tempo linear", ("O(n)", 1.0)),
+    ("Soma dois números", None),
+    ("", None),
+])
+def test_parse_complexity_target(text, expected):
+    assert parse_complexity_target(text) == expected
+
+
+def test_fit_exponent_recovers_synthetic_growth():
+    sizes = [16 * 4 ** i for i in range(8)]
+
+    assert fit_exponent([(n, 1e-7 * n) for n in sizes]) == pytest.approx(1.0)
+    assert fit_exponent([(n, 1e-9 * n * n) for n in sizes]) == pytest.approx(2.0)
+    # Só os maiores tamanhos entram no ajuste: o trecho constante inicial é ignorado
+    mixed = [(n, 1e-6) for n in sizes[:3]] + [(n, 1e-9 * n * n) for n in sizes[3:]]
+    assert fit_exponent(mixed) == pytest.approx(2.0)
+
+
+def test_fit_exponent_needs_three_distinct_sizes():
+    assert fit_exponent([(16, 1e-6), (64, 4e-6)]) is None
+    assert fit_exponent([(16, 1e-6), (16, 2e-6), (16, 3e-6)]) is None
+    assert fit_exponent([(16, 0.0), (64, 0.0), (256, 1e-6)]) is None
+
+
+def test_infer_input_kind_from_single_literal_arguments():
+    tests_code = """from app_code import f
+
+
+def test_f():
+    assert f(10) == 4
+    assert f(0) == 0
+    assert f(True) == 1
+    assert f("abc") == 3
+    assert f(x=[1]) == 1
+"""
+
+    assert infer_input_kind(tests_code, "f") == "int"
+    assert infer_input_kind("assert f([1, 2]) == 3\nassert f([]) == 0\n", "f") == "list"
+    assert infer_input_kind("assert g(1) == 1\n", "f") is None
+    assert infer_input_kind("def broken(:\n", "f") is None
+
+
+POINTS = [(16, 1e-6), (64, 4e-6), (256, 1.6e-5), (1024, 6.4e-5)]
+
+
+@pytest.fixture
+def measured(monkeypatch):
+    """Resultado fixo de measure_growth: (pontos, terminou, exceção, saída)."""
+    result = {}
+    monkeypatch.setattr(performance, "measure_growth", lambda *args, **kwargs: result["value"])
+    return result
+
+
+def test_linear_growth_meets_a_linear_target(measured):
+    measured["value"] = (POINTS, True, "", "1 passed")
+
+    ok, report = check_complexity("code", "f", "assert f(3) == 3", "O(n)")
+
+    assert ok is True and "n^1.00" in report
+
+
+def test_timeout_means_slower_than_the_target(measured):
+    measured["value"] = (POINTS, False, "", "⏱️ TIMEOUT: test_app.py::test_benchmark")
+
+    ok, report = check_complexity("code", "f", "assert f(3) == 3", "O(log n)")
+
+    assert ok is False and "excedeu o tempo limite" in report
+
+
+def test_exception_in_the_benchmark_is_inconclusive(measured):
+    measured["value"] = (POINTS, False, "RecursionError: maximum recursion depth exceeded", "1 passed")
+
+    ok, report = check_complexity("code", "f", "assert f(3) == 3", "O(n)")
+
+    assert ok is None
+    assert "n = 4,096" in report and "RecursionError" in report
+
+
+def test_harness_records_an_exception_above_a_bounded_domain():
+    implementation = (
+        "def f(n):\n"
+        "    if n > 1000:\n"
+        "        raise ValueError('fora do domínio')\n"
+        "    return n\n"
+    )
+
+    ok, report = check_complexity(implementation, "f", "assert f(3) == 3", "O(1)")
+
+    assert ok is None
+    assert "ValueError: fora do domínio" in report
+
+
+@pytest.fixture
+def benchmarks(monkeypatch):
+    """measure_growth fixo por versão do código: {código: (pontos, terminou, exceção, saída)}."""
+    results = {}
+    monkeypatch.setattr(performance, "measure_growth", lambda code, *args, **kwargs: results[code])
+    return results
+
+
+def scaled(points, factor):
+    return [(size, seconds * factor) for size, seconds in points]
+
+
+def test_slower_candidate_is_rejected(benchmarks):
+    benchmarks.update(base=(POINTS, True, "", ""), candidate=(scaled(POINTS, 2.0), True, "", ""))
+
+    faster, report = compare_performance("base", "candidate", "f", "assert f(3) == 3")
+
+    assert faster is False and "2x" in report
+
+
+def test_equivalent_candidate_is_kept(benchmarks):
+    benchmarks.update(base=(POINTS, True, "", ""), candidate=(scaled(POINTS, 1.05), True, "", ""))
+
+    faster, _ = compare_performance("base", "candidate", "f", "assert f(3) == 3")
+
+    assert faster is True
+
+
+def test_only_sizes_measured_by_both_versions_are_compared(benchmarks):
+    # A candidata, mais rápida, mediu um tamanho a mais antes de parar por tempo total
+    longer = scaled(POINTS, 0.5) + [(4096, 1.3e-4)]
+    benchmarks.update(base=(POINTS, True, "", ""), candidate=(longer, False, "", ""))
+
+    faster, report = compare_performance("base", "candidate", "f", "assert f(3) == 3")
+
+    assert faster is True and "4,096" not in report
+
+
+def test_candidate_timing_out_before_the_baseline_is_slower(benchmarks):
+    benchmarks.update(base=(POINTS, True, "", ""), candidate=(POINTS[:2], False, "", ""))
+
+    faster, report = compare_performance("base", "candidate", "f", "assert f(3) == 3")
+
+    assert faster is False and "n = 1,024" in report
+
+
+def test_unfinished_baseline_or_candidate_exception_is_inconclusive(benchmarks):
+    benchmarks.update(base=(POINTS, False, "", ""), candidate=(POINTS, True, "", ""))
+    assert compare_performance("base", "candidate", "f", "assert f(3) == 3")[0] is None
+
+    benchmarks.update(base=(POINTS, True, "", ""), candidate=(POINTS[:2], False, "RecursionError: depth", ""))
+    faster, report = compare_performance("base", "candidate", "f", "assert f(3) == 3")
+    assert faster is None and "RecursionError" in report
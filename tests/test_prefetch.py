@@ -0,0 +1,84 @@
+from app.agents import prefetch
+from app.agents.prefetch import merge_prefetched_tests
+
+BASE = """from app_code import add
+
+
+def test_add():
+    assert add(1, 2) == 3
+"""
+
+# Rascunho do passo seguinte, gerado sobre BASE
+DRAFT = BASE + """
+
+@pytest.mark.parametrize("a, b", [(1, -1), (-2, 2)])
+def test_add_opposites(a, b):
+    assert add(a, b) == 0
+"""
+
+# Arquivo atual: o passo em andamento acrescentou outro teste
+CURRENT = BASE + """
+
+def test_add_zero():
+    assert add(0, 0) == 0
+"""
+
+
+def test_unchanged_file_uses_the_draft_as_is():
+    assert merge_prefetched_tests(BASE, DRAFT, BASE) == DRAFT
+
+
+def test_new_definitions_and_imports_are_appended_to_the_current_file():
+    merged = merge_prefetched_tests(BASE, "import pytest\n" + DRAFT, CURRENT)
+
+    assert merged.startswith("import pytest\nfrom app_code import add\n")
+    assert "def test_add_zero():" in merged
+    assert merged.rstrip().endswith(
+        '@pytest.mark.parametrize("a, b", [(1, -1), (-2, 2)])\n'
+        "def test_add_opposites(a, b):\n"
+        "    assert add(a, b) == 0"
+    )
+    assert merged.count("def test_add():") == 1
+
+
+def test_name_conflict_returns_none():
+    current = BASE + "\n\ndef test_add_opposites():\n    assert add(1, -1) == 0\n"
+
+    assert merge_prefetched_tests(BASE, DRAFT, current) is None
+
+
+def test_invalid_or_empty_drafts_return_none():
+    assert merge_prefetched_tests(BASE, "def test_x(:\n", CURRENT) is None
+    assert merge_prefetched_tests(BASE, BASE, CURRENT) is None
+
+
+def test_prefetcher_skips_steps_of_the_next_branch_batch(monkeypatch):
+    generated = []
+
+    def fake_generate(sub_requirement, function_name, all_tests_code):
+        generated.append(sub_requirement)
+        return DRAFT
+
+    monkeypatch.setattr(prefetch, "generate_test_for_sub_req", fake_generate)
+    prefetcher = prefetch.TestPrefetcher(depth=3, workers=1)
+    try:
+        prefetcher.schedule(["a", "b", "c", "d"], 1, "add", BASE, skip=[1, 2])
+
+        assert prefetcher.take(1, BASE) is None
+        assert prefetcher.take(3, CURRENT) == merge_prefetched_tests(BASE, DRAFT, CURRENT)
+        assert generated == ["d"]
+    finally:
+        prefetcher.shutdown()
+
+
+def test_discard_drops_pending_drafts(monkeypatch):
+    monkeypatch.setattr(prefetch, "generate_test_for_sub_req", lambda **kwargs: DRAFT)
+    prefetcher = prefetch.TestPrefetcher(depth=2, workers=1)
+    try:
+        prefetcher.schedule(["a", "b", "c"], 1, "add", BASE)
+        prefetcher.discard()
+
+        assert prefetcher.take(1, BASE) is None
+        assert prefetcher.take(2, BASE) is None
+    finally:
+        prefetcher.shutdown()
@@ -0,0 +1,70 @@
+from app.agents.preflight import check_implementation, check_tests
+
+TESTS_CODE = """from app_code import isqrt
+
+
+def test_isqrt():
+    assert isqrt(16) == 4
+"""
+
+
+def test_valid_tests_pass_the_preflight():
+    assert check_tests(TESTS_CODE) == []
+
+
+def test_syntax_error_in_the_tests():
+    problems = check_tests("def test_a(:\n    pass\n")
+
+    assert len(problems) == 1
+    assert "Erro de sintaxe em test_app.py, linha 1" in problems[0]
+
+
+def test_duplicate_test_names_are_reported():
+    problems = check_tests(TESTS_CODE + "\n\ndef test_isqrt():\n    assert isqrt(9) == 3\n")
+
+    assert problems == [
+        "❌ Teste duplicado 'test_isqrt' (linha 8): "
+        "a última definição sobrescreve a anterior e o pytest coleta apenas uma."
+    ]
+
+
+def test_collection_errors_are_reported():
+    problems = check_tests("import modulo_inexistente\n\n\ndef test_a():\n    assert True\n")
+
+    assert len(problems) == 1
+    assert "Erro na coleta" in problems[0] and "modulo_inexistente" in problems[0]
+
+
+def test_file_without_collectable_tests():
+    assert check_tests("from app_code import isqrt\n") == [
+        "❌ Nenhum teste coletável pelo pytest em test_app.py."
+    ]
+
+
+def test_fallback_definitions_inside_compound_statements_are_found():
+    implementation = """try:
+    from math import isqrt
+except ImportError:
+    def isqrt(n):
+        return int(n ** 0.5)
+"""
+
+    assert check_implementation(TESTS_CODE, implementation, "isqrt") == []
+
+
+def test_missing_function_and_imported_names_are_reported():
+    tests_code = "from app_code import isqrt, helper\n\n\ndef test_a():\n    assert isqrt(4) == 2\n"
+
+    problems = check_implementation(tests_code, "def other(n):\n    return n\n", "isqrt")
+
+    assert problems == [
+        "❌ A função 'isqrt' não está definida em app_code.py.",
+        "❌ 'from app_code import helper' (linha 1): 'helper' não existe em app_code.py.",
+    ]
+
+
+def test_syntax_error_in_the_implementation():
+    problems = check_implementation(TESTS_CODE, "def isqrt(n)\n    return n\n", "isqrt")
+
+    assert len(problems) == 1
+    assert "Erro de sintaxe em app_code.py" in problems[0]
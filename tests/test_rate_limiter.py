@@ -0,0 +1,140 @@
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from app.llm import GenerationAborted, RateLimiter, RedisTokenBucket, TokenBucket, stream_completion
+from app.llm import rate_limiter, streaming
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    return clock
+
+
+def test_bucket_waits_and_refills_over_time(clock):
+    bucket = TokenBucket(capacity=10, refill_per_second=2)
+
+    assert bucket.try_acquire(10) == 0
+    assert bucket.try_acquire(4) == pytest.approx(2.0)
+
+    clock.now += 1.0
+    assert bucket.try_acquire(4) == pytest.approx(1.0)
+    clock.now += 1.0
+    assert bucket.try_acquire(4) == 0
+
+
+def test_bucket_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(capacity=10, refill_per_second=2)
+    bucket.try_acquire(10)
+
+    clock.now += 60
+    assert bucket.try_acquire(10) == 0
+    assert bucket.try_acquire(1) > 0
+
+
+def test_record_usage_reconciles_the_estimate(clock):
+    tokens = TokenBucket(capacity=100, refill_per_second=1)
+    limiter = RateLimiter(TokenBucket(10, 1), tokens)
+
+    limiter.acquire(80)
+    limiter.record_usage(80, 30)  # Estimativa alta: devolve 50
+    assert tokens.try_acquire(70) == 0
+
+    limiter.record_usage(10, 40)  # Estimativa baixa: cobra 30 a mais
+    assert tokens.try_acquire(1) == pytest.approx(31.0)  # Saldo negativo: -30
+
+
+def test_redis_bucket_shares_the_balance(fake_redis):
+    import redis
+
+    first = RedisTokenBucket(redis.from_url("redis://fake"), "bucket", capacity=10, refill_per_second=0.001)
+    second = RedisTokenBucket(redis.from_url("redis://fake"), "bucket", capacity=10, refill_per_second=0.001)
+
+    assert first.try_acquire(8) == 0
+    assert second.try_acquire(8) > 0
+    first.adjust(6)
+    assert second.try_acquire(8) == 0
+
+
+class RecordingLimiter:
+    def __init__(self, events):
+        self.events = events
+        self.usage = []
+
+    def acquire(self, estimated):
+        self.events.append("acquire")
+
+    def record_usage(self, estimated, actual):
+        self.usage.append((estimated, actual))
+
+
+class RecordingScheduler:
+    def __init__(self, events):
+        self.events = events
+
+    @contextlib.contextmanager
+    def slot(self, resource):
+        self.events.append("slot")
+        yield
+
+
+class FakeStreamingModel:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def stream(self, messages):
+        return iter(SimpleNamespace(content=c) for c in self.chunks)
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    events = []
+    limiter = RecordingLimiter(events)
+    monkeypatch.setattr(streaming, "get_rate_limiter", lambda: limiter)
+    monkeypatch.setattr(streaming, "get_scheduler", lambda: RecordingScheduler(events))
+    return limiter
+
+
+def test_stream_acquires_quota_before_the_slot(recorded):
+    text = stream_completion(FakeStreamingModel(["def f():\n", "    return 1\n"]), [HumanMessage(content="x" * 40)])
+
+    assert text == "def f():\n    return 1\n"
+    assert recorded.events == ["acquire", "slot"]
+    estimated, actual = recorded.usage[0]
+    assert actual == 10 + len(text) // 4
+    assert estimated > actual
+
+
+def test_aborted_stream_still_reconciles_usage(recorded):
+    model = FakeStreamingModel(["ok\n", "```python\n", "never read\n"])
+    check = lambda line: "markdown" if line.startswith("```") else None
+
+    with pytest.raises(GenerationAborted) as info:
+        stream_completion(model, [HumanMessage(content="x" * 40)], line_check=check)
+
+    assert len(recorded.usage) == 1
+    _, actual = recorded.usage[0]
+    assert actual == 10 + len(info.value.partial) // 4
+
+
+def test_failed_stream_releases_the_completion_reservation(recorded):
+    class BrokenModel:
+        def stream(self, messages):
+            raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        stream_completion(BrokenModel(), [HumanMessage(content="x" * 40)])
+
+    assert [actual for _, actual in recorded.usage] == [10]
@@ -0,0 +1,98 @@
+import pytest
+
+from app.jobs.redis_queue import RedisJobQueue
+from app.jobs.worker import JobWorker
+
+
+@pytest.fixture
+def queue(fake_redis):
+    return RedisJobQueue(queue_key="test:jobs", lease_seconds=30, max_attempts=2)
+
+
+def expire_lease(queue, job_id):
+    queue.client.zadd(queue.leases_key, {job_id: 0})
+
+
+def test_claim_is_fifo_and_leased(queue):
+    first = queue.enqueue("task-a", "spec a", "fa", priority=2.0)
+    second = queue.enqueue("task-b", "spec b", "fb")
+
+    job = queue.claim("w1")
+    assert job["job_id"] == first
+    assert job["status"] == "running" and job["worker"] == "w1"
+    assert job["attempts"] == 1 and job["priority"] == 2.0
+    assert queue.list_running() == [first]
+    assert queue.pending_count() == 1
+    assert queue.claim("w2")["job_id"] == second
+    assert queue.claim("w3") is None
+
+
+def test_only_the_owner_can_heartbeat_or_complete(queue):
+    job_id = queue.enqueue("task", "spec", "f")
+    queue.claim("w1")
+
+    assert queue.heartbeat(job_id, "w1")
+    assert not queue.heartbeat(job_id, "w2")
+    assert not queue.complete(job_id, "w2", "plan_complete")
+    assert queue.complete(job_id, "w1", "plan_complete")
+
+    job = queue.get_job(job_id)
+    assert job["status"] == "done" and job["result_status"] == "plan_complete"
+    assert queue.list_running() == []
+
+
+def test_expired_lease_is_requeued_and_old_worker_loses_ownership(queue):
+    job_id = queue.enqueue("task", "spec", "f")
+    queue.claim("dead-worker")
+    expire_lease(queue, job_id)
+
+    assert queue.requeue_expired() == 1
+    job = queue.claim("w2")
+    assert job["job_id"] == job_id and job["attempts"] == 2
+
+    assert not queue.heartbeat(job_id, "dead-worker")
+    assert not queue.complete(job_id, "dead-worker", "plan_complete")
+    assert queue.complete(job_id, "w2", "plan_complete")
+
+
+def test_job_fails_after_max_attempts(queue):
+    job_id = queue.enqueue("task", "spec", "f")
+    for worker in ("w1", "w2"):
+        queue.claim(worker)
+        expire_lease(queue, job_id)
+        queue.requeue_expired()
+
+    job = queue.get_job(job_id)
+    assert job["status"] == "failed" and job["result_status"] == "lease_expired"
+    assert queue.pending_count() == 0
+
+
+def test_released_job_returns_to_the_queue_after_the_delay(queue):
+    job_id = queue.enqueue("task", "spec", "f")
+    queue.claim("w1")
+
+    assert not queue.release(job_id, "w2", 30)
+    assert queue.release(job_id, "w1", 30)
+
+    job = queue.get_job(job_id)
+    assert job["status"] == "delayed" and job["attempts"] == 0
+    assert queue.list_running() == []
+    assert queue.requeue_delayed() == 0
+    assert queue.claim("w2") is None
+
+    queue.client.zadd(queue.delayed_key, {job_id: 0})
+    assert queue.requeue_delayed() == 1
+    job = queue.claim("w2")
+    assert job["job_id"] == job_id and job["attempts"] == 1
+
+
+def test_worker_releases_a_job_whose_task_is_locked(queue, monkeypatch):
+    job_id = queue.enqueue("task", "spec", "f")
+    worker = JobWorker(job_queue=queue, worker_id="w1")
+    monkeypatch.setattr(worker, "process", lambda job: "task_locked")
+
+    assert worker.run_once()
+
+    job = queue.get_job(job_id)
+    assert job["status"] == "delayed" and job.get("result_status") is None
+    assert queue.client.zscore(queue.delayed_key, job_id) is not None
@@ -0,0 +1,154 @@
+import re
+
+import pytest
+
+from app import orchestrator as orchestrator_module
+from app.agents import runner
+from app.agents.runner import RUNNER_ERROR_PREFIX, is_runner_error
+from app.orchestrator import TDDOrchestrator
+from app.persistence import InMemoryPersistence
+from app.sandbox import SandboxPool
+
+pytest.importorskip("resource")
+
+PID_TEST = """import os
+
+
+def test_pid():
+    print(f"PID={os.getpid()}")
+"""
+
+
+@pytest.fixture
+def open_pool(closing):
+    def open_pool(**kwargs):
+        pool = SandboxPool(**{"size": 1, "max_runs": 100, "memory_mb": 0, "file_size_mb": 0, **kwargs})
+        return closing(pool, "shutdown")
+
+    return open_pool
+
+
+def run(pool, tests_code, timeout=30):
+    return pool.run_pytest(
+        files={"test_app.py": tests_code},
+        args=["test_app.py", "-q", "-s", "-p", "no:cacheprovider"],
+        timeout=timeout
+    )
+
+
+def worker_pid(pool):
+    output = run(pool, PID_TEST)
+    assert "1 passed" in output, output
+    return int(re.search(r"PID=(\d+)", output).group(1))
+
+
+def test_worker_runs_with_the_configured_limits(open_pool):
+    pool = open_pool(memory_mb=768, file_size_mb=4, cpu_seconds=20)
+
+    output = run(pool, """import resource
+
+MB = 1024 * 1024
+
+
+def test_limits():
+    assert resource.getrlimit(resource.RLIMIT_AS)[0] == 768 * MB
+    assert resource.getrlimit(resource.RLIMIT_FSIZE)[0] == 4 * MB
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    # Limite suave renovado no início do job: ~20s a partir do consumo atual
+    assert 18 <= resource.getrlimit(resource.RLIMIT_CPU)[0] - used <= 22
+""")
+
+    assert "1 passed" in output, output
+
+
+def test_cpu_limit_is_rearmed_for_every_job(open_pool):
+    # Cada job consome ~1s de CPU: o limite de 2s só vale se for renovado a cada job
+    pool = open_pool(cpu_seconds=2)
+    burn = """import time
+
+
+def test_burn():
+    start = time.process_time()
+    while time.process_time() - start < 1.0:
+        pass
+"""
+
+    for _ in range(3):
+        output = run(pool, burn)
+        assert "1 passed" in output, output
+
+
+def test_worker_is_recycled_after_max_runs(open_pool):
+    pool = open_pool(max_runs=2)
+
+    first, second, third = worker_pid(pool), worker_pid(pool), worker_pid(pool)
+
+    assert first == second
+    assert third != first
+
+
+def test_hung_job_recycles_the_worker_and_the_next_job_runs(open_pool):
+    pool = open_pool()
+    pid = worker_pid(pool)
+
+    output = run(pool, "import time\n\n\ndef test_hang():\n    time.sleep(60)\n", timeout=1)
+
+    assert output.startswith("❌ Erro: execução de testes expirou")
+    assert not is_runner_error(output)  # Travamento é causado pelo código testado
+    assert worker_pid(pool) != pid
+
+
+def test_memory_breach_recycles_the_worker(open_pool):
+    pool = open_pool(memory_mb=768)
+    pid = worker_pid(pool)
+
+    output = run(pool, "def test_alloc():\n    bytearray(2 * 1024 ** 3)\n")
+
+    assert "MemoryError" in output
+    assert worker_pid(pool) != pid
+
+
+def test_sandbox_failure_is_reported_as_a_runner_error(monkeypatch, tmp_path):
+    def broken_sandbox(*args, **kwargs):
+        raise OSError("fork falhou")
+
+    monkeypatch.setattr(runner.Config, "SANDBOX_ENABLED", True)
+    monkeypatch.setattr(runner, "_run_in_sandbox", broken_sandbox)
+
+    output = runner.run_pytest(workspace=str(tmp_path))
+
+    assert output == f"{RUNNER_ERROR_PREFIX}: falha ao executar testes no sandbox: fork falhou"
+    assert is_runner_error(output)
+
+
+def test_runner_error_is_not_a_red_failure(monkeypatch, tmp_path):
+    monkeypatch.setattr(orchestrator_module, "run_pytest", lambda **kwargs: f"{RUNNER_ERROR_PREFIX}: fork falhou")
+    monkeypatch.setattr(orchestrator_module, "analyze_failures", lambda **kwargs: pytest.fail("RED confirmado"))
+    monkeypatch.setattr(orchestrator_module.Config, "PLANNER_STREAMING", False)
+    monkeypatch.setattr(orchestrator_module.Config, "TEST_PREFETCH_DEPTH", 0)
+    monkeypatch.setattr(orchestrator_module.Config, "RED_COVERAGE_SKIP", False)
+
+    persistence = InMemoryPersistence()
+    orchestrator = TDDOrchestrator(task_key="red", persistence=persistence, budget={}, workspace_path=str(tmp_path))
+    persistence.save_state("red", {
+        "specification": "somar dois números",
+        "function_name": "add",
+        "plan": ["somar dois inteiros"],
+        "current_sub_req": "somar dois inteiros",
+        "tests_code": "from app_code import add\n\n\ndef test_add():\n    assert add(1, 2) == 3\n",
+        "implementation_code": "",
+        "feedback": "",
+        "iteration": 0,
+        "plan_index": 0,
+        "max_retries": 3,
+        "phase": "red",
+        "status": "budget_exceeded",
+        "resume_node": "execute_runner_red",
+        "resume_status": "preflight_red_ok",
+    })
+
+    final = orchestrator.run(resume=True)
+
+    assert final["status"] == "runner_error"
+    assert final["error_message"] == f"{RUNNER_ERROR_PREFIX}: fork falhou"
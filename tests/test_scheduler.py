@@ -0,0 +1,107 @@
+import threading
+import time
+
+from app.runtime import TaskContext, task_scope
+from app.runtime.scheduler import FairShareScheduler
+
+
+def run_in_task(scheduler, context, order, hold=0.0):
+    def target():
+        with task_scope(context):
+            with scheduler.slot("llm"):
+                order.append(context.task_key)
+                time.sleep(hold)
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+def queue_behind(scheduler, contexts, order):
+    """Ocupa o único slot, enfileira as tarefas e libera o slot após todas esperarem."""
+    release = threading.Event()
+    blocker = threading.Thread(target=lambda: _hold(scheduler, release))
+    blocker.start()
+    while scheduler._in_use["llm"] < 1:
+        time.sleep(0.01)
+
+    threads = []
+    for context in contexts:
+        threads.append(run_in_task(scheduler, context, order))
+        while len(scheduler._waiting["llm"]) < len(threads):
+            time.sleep(0.01)
+
+    release.set()
+    for thread in [blocker, *threads]:
+        thread.join(timeout=5)
+
+
+def _hold(scheduler, release):
+    with scheduler.slot("llm"):
+        release.wait(timeout=5)
+
+
+def test_least_served_task_goes_first():
+    scheduler = FairShareScheduler({"llm": 1}, quantum=0.01)
+    heavy, light = TaskContext("heavy"), TaskContext("light")
+    scheduler._usage["heavy"] = 5.0
+
+    order = []
+    queue_behind(scheduler, [heavy, light], order)
+    assert order == ["light", "heavy"]
+
+
+def test_priority_scales_the_fair_share():
+    scheduler = FairShareScheduler({"llm": 1}, quantum=0.01)
+    urgent, normal = TaskContext("urgent", priority=10.0), TaskContext("normal")
+    scheduler._usage["urgent"] = 1.0
+    scheduler._usage["normal"] = 0.5
+
+    order = []
+    queue_behind(scheduler, [normal, urgent], order)
+    assert order == ["urgent", "normal"]
+
+
+def test_shortest_remaining_plan_breaks_ties():
+    scheduler = FairShareScheduler({"llm": 1}, quantum=10.0)
+    long_plan, short_plan = TaskContext("long"), TaskContext("short")
+    long_plan.update_progress(["a", "b", "c", "d"], 0)
+    short_plan.update_progress(["a", "b", "c", "d"], 3)
+
+    order = []
+    queue_behind(scheduler, [long_plan, short_plan], order)
+    assert order == ["short", "long"]
+
+
+def test_capacity_limits_concurrent_slots_and_usage_is_recorded():
+    scheduler = FairShareScheduler({"llm": 2})
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def target(index):
+        with task_scope(TaskContext(f"task-{index}")):
+            with scheduler.slot("llm"):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.05)
+                with lock:
+                    active[0] -= 1
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert peak[0] == 2
+    assert scheduler.usage("task-0") >= 0.04
+    scheduler.forget("task-0")
+    assert scheduler.usage("task-0") == 0.0
+
+
+def test_unscheduled_resource_is_not_limited():
+    scheduler = FairShareScheduler({"llm": 1})
+    with scheduler.slot("runner"):
+        with scheduler.slot("runner"):
+            pass
@@ -0,0 +1,61 @@
+import threading
+import time
+
+from app.agents import speculative
+from app.llm import GenerationAborted
+
+GREEN_OUTPUT = "test_app.py::test_add PASSED\n1 passed in 0.01s"
+
+
+def test_winner_returns_without_waiting_for_slow_candidates(monkeypatch):
+    loser_started, loser_stopped = threading.Event(), threading.Event()
+
+    def fake_generate(temperature, cancel, **kwargs):
+        if temperature == 0.0:
+            loser_started.wait(timeout=5)
+            return "def add(a, b):\n    return a + b\n"
+        # Candidato lento: só termina quando é cancelado
+        loser_started.set()
+        while not cancel.wait(0.01):
+            pass
+        time.sleep(0.5)
+        loser_stopped.set()
+        raise GenerationAborted("candidato cancelado")
+
+    monkeypatch.setattr(speculative, "generate_code_incremental", fake_generate)
+    monkeypatch.setattr(speculative, "check_implementation", lambda *args: [])
+    monkeypatch.setattr(speculative, "run_pytest", lambda **kwargs: GREEN_OUTPUT)
+
+    started = time.monotonic()
+    code, output = speculative.generate_speculative_code(
+        test_code="from app_code import add\n",
+        function_name="add",
+        temperatures=[0.0, 0.7]
+    )
+
+    assert time.monotonic() - started < 0.4
+    assert not loser_stopped.is_set()
+    assert "return a + b" in code
+    assert output == GREEN_OUTPUT
+    assert loser_stopped.wait(timeout=5)
+
+
+def test_without_green_returns_the_best_candidate_and_no_output(monkeypatch):
+    outputs = {
+        "best": "test_app.py::test_a PASSED\ntest_app.py::test_b FAILED\n1 failed, 1 passed",
+        "worst": "test_app.py::test_a FAILED\ntest_app.py::test_b FAILED\n2 failed",
+    }
+
+    monkeypatch.setattr(
+        speculative, "generate_code_incremental",
+        lambda temperature, **kwargs: "best" if temperature == 0.0 else "worst"
+    )
+    monkeypatch.setattr(speculative, "check_implementation", lambda *args: [])
+    monkeypatch.setattr(speculative, "run_pytest", lambda files, **kwargs: outputs[files["app_code.py"]])
+
+    code, output = speculative.generate_speculative_code(
+        test_code="", function_name="f", temperatures=[0.0, 0.7]
+    )
+
+    assert code == "best"
+    assert output is None
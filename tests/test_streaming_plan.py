@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from app.agents import planner
+from app.agents.planner import StreamingPlan
+from app.orchestrator import TDDOrchestrator
+from app.persistence import InMemoryPersistence
+
+
+def plan_line(step_id, text, depends_on):
+    return json.dumps({"id": step_id, "sub_requirement": text, "depends_on": depends_on})
+
+
+@pytest.fixture
+def fake_planner(monkeypatch):
+    """Planner em streaming que envia `lines` e, opcionalmente, falha em seguida."""
+    response = {"lines": [], "error": None}
+
+    def fake_stream(llm, messages, line_check=None, max_chars=None):
+        for line in response["lines"]:
+            line_check(line)
+        if response["error"]:
+            raise response["error"]
+        return "\n".join(response["lines"])
+
+    monkeypatch.setattr(planner, "create_chat_model", lambda *args, **kwargs: None)
+    monkeypatch.setattr(planner, "select_model", lambda *args, **kwargs: "model")
+    monkeypatch.setattr(planner, "stream_completion", fake_stream)
+    return response
+
+
+def test_regenerated_plan_keeps_the_received_steps(fake_planner):
+    fake_planner["lines"] = [
+        plan_line(1, "outro a", []),
+        plan_line(2, "outro b", [1]),
+        plan_line(3, "c", [1]),
+    ]
+
+    stream = StreamingPlan("spec", received=(["a", "b"], [[], [0]])).start()
+    stream.wait_for(3)
+
+    assert stream.snapshot() == (["a", "b", "c"], [[], [0], [0]])
+
+
+@pytest.fixture
+def orchestrator(tmp_path):
+    return TDDOrchestrator(task_key="plan", persistence=InMemoryPersistence(), budget={}, workspace_path=str(tmp_path))
+
+
+def test_failed_stream_keeps_the_plan_marked_incomplete(fake_planner, orchestrator):
+    fake_planner["lines"] = [plan_line(1, "a", []), plan_line(2, "b", [1])]
+    fake_planner["error"] = ValueError("conexão perdida")
+    orchestrator.plan_stream = StreamingPlan("spec").start()
+
+    state = orchestrator._refresh_streamed_plan({"plan": ["a"], "plan_streaming": True}, 3)
+
+    assert state["plan"] == ["a", "b"]
+    assert state["plan_streaming"] is True
+
+
+def test_resume_regenerates_the_remaining_steps(fake_planner, orchestrator):
+    fake_planner["lines"] = [plan_line(1, "a", []), plan_line(2, "b", [1]), plan_line(3, "c", [2])]
+    state = {"specification": "spec", "plan": ["a"], "plan_dependencies": [[]], "plan_streaming": True}
+
+    state = orchestrator._refresh_streamed_plan(state, 2)
+    orchestrator.plan_stream.wait_for(3)
+    state = orchestrator._refresh_streamed_plan(state, 3)
+
+    assert state["plan"] == ["a", "b", "c"]
+    assert state["plan_streaming"] is False
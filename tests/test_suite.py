@@ -0,0 +1,115 @@
+import ast
+
+from app.agents.suite import assertion_signatures, covered_by_existing, minimize_suite, remove_duplicate_tests
+
+
+def signatures(source):
+    return assertion_signatures(ast.parse(source).body[0])
+
+
+def test_signatures_ignore_names_comments_and_operand_order():
+    first = signatures("def test_a():\n    # soma simples\n    assert add(1, 2) == 3\n")
+    second = signatures("def test_b():\n    assert 3 == add(1, 2)\n")
+
+    assert first == second
+
+
+def test_parametrized_tests_and_tests_without_asserts_are_not_compared():
+    assert signatures("@pytest.mark.parametrize('x', [1])\ndef test_a(x):\n    assert f(x)\n") is None
+    assert signatures("def test_a():\n    f(1)\n") is None
+
+
+PREVIOUS = """from app_code import add
+
+
+def test_add():
+    assert add(1, 2) == 3
+"""
+
+
+def test_new_tests_repeating_existing_checks_are_dropped():
+    new = PREVIOUS + """
+
+def test_add_again():
+    assert 3 == add(1, 2)
+
+
+def test_add_negative():
+    assert add(-1, -2) == -3
+
+
+def test_add_negative_again():
+    assert add(-1, -2) == -3
+"""
+
+    code, removed = remove_duplicate_tests(PREVIOUS, new)
+
+    assert removed == ["test_add_again", "test_add_negative_again"]
+    assert "def test_add():" in code and "def test_add_negative():" in code
+    assert "again" not in code
+
+
+def test_existing_tests_are_never_removed():
+    code, removed = remove_duplicate_tests(PREVIOUS, PREVIOUS + "\n\ndef test_add():\n    assert add(1, 2) == 3\n")
+
+    assert removed == []
+
+
+SUITE = """from app_code import classify
+
+
+def test_zero():
+    assert classify(0) == "zero"
+
+
+def test_positive():
+    assert classify(5) == "positive"
+
+
+def test_positive_again():
+    assert classify(7) == "positive"
+
+
+def test_negative():
+    assert classify(-1) == "negative"
+"""
+
+COVERAGE = {
+    "test_app.py::test_zero": {"lines": [1, 2], "arcs": [[1, 2]]},
+    "test_app.py::test_positive": {"lines": [1, 3, 4], "arcs": [[1, 3], [3, 4]]},
+    "test_app.py::test_positive_again": {"lines": [1, 3, 4], "arcs": [[1, 3], [3, 4]]},
+    "test_app.py::test_negative": {"lines": [1, 3, 5], "arcs": [[1, 3], [3, 5]]},
+}
+
+
+def test_minimize_drops_tests_that_add_no_coverage():
+    code, removed = minimize_suite(SUITE, COVERAGE)
+
+    assert removed == ["test_positive_again"]
+    assert "def test_positive():" in code
+
+
+def test_minimize_keeps_specification_examples_and_failing_tests():
+    spec = "classify(7) retorna 'positive'"
+    _, removed = minimize_suite(SUITE, COVERAGE, specification=spec)
+    assert removed == ["test_positive"]
+
+    passed = set(COVERAGE) - {"test_app.py::test_positive_again"}
+    _, removed = minimize_suite(SUITE, COVERAGE, passed=passed)
+    assert removed == ["test_positive"]
+
+
+def test_new_tests_covering_only_existing_code_are_already_satisfied():
+    new = ["test_app.py::test_positive_again"]
+    assert covered_by_existing(COVERAGE, new, passed=set(COVERAGE))
+
+
+def test_new_tests_reaching_new_code_are_not_covered():
+    coverage = {**COVERAGE, "test_app.py::test_positive_again": {"lines": [1, 3, 6], "arcs": [[3, 6]]}}
+    assert not covered_by_existing(coverage, ["test_app.py::test_positive_again"])
+
+
+def test_without_new_passing_tests_nothing_is_covered():
+    assert not covered_by_existing(COVERAGE, [])
+    assert not covered_by_existing(COVERAGE, ["test_app.py::test_positive_again"], passed=set())
+    assert not covered_by_existing(COVERAGE, ["test_app.py::test_missing"])
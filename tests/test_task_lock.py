@@ -0,0 +1,66 @@
+import pytest
+
+from app.persistence import InMemoryPersistence, RedisPersistence, StaleWriteError
+
+
+@pytest.fixture(params=["memory", "redis"])
+def persistence(request):
+    if request.param == "memory":
+        return InMemoryPersistence()
+    request.getfixturevalue("fake_redis")
+    return RedisPersistence("redis://fake")
+
+
+def expire_lock(persistence, task_key):
+    """Simula o fim do TTL do lock sem esperar."""
+    if isinstance(persistence, RedisPersistence):
+        persistence.client.delete(f"lock:{task_key}")
+    else:
+        owner, _ = persistence._locks[task_key]
+        persistence._locks[task_key] = (owner, 0.0)
+
+
+def test_lock_is_exclusive_until_released(persistence):
+    token = persistence.acquire_task_lock("task", "w1", 30)
+    assert token is not None
+    assert persistence.acquire_task_lock("task", "w2", 30) is None
+
+    persistence.release_task_lock("task", "w2")  # Não é o dono: ignorado
+    assert persistence.acquire_task_lock("task", "w2", 30) is None
+
+    persistence.release_task_lock("task", "w1")
+    assert persistence.acquire_task_lock("task", "w2", 30) > token
+
+
+def test_only_the_owner_can_renew(persistence):
+    persistence.acquire_task_lock("task", "w1", 30)
+
+    assert persistence.renew_task_lock("task", "w1", 30)
+    assert not persistence.renew_task_lock("task", "w2", 30)
+
+    expire_lock(persistence, "task")
+    assert not persistence.renew_task_lock("task", "w1", 30)
+
+
+def test_stale_owner_cannot_write_after_takeover(persistence):
+    old_token = persistence.acquire_task_lock("task", "w1", 30)
+    persistence.save_fenced("task", "state:task", {"status": "tests_written"}, old_token)
+
+    expire_lock(persistence, "task")
+    new_token = persistence.acquire_task_lock("task", "w2", 30)
+    assert new_token > old_token
+
+    with pytest.raises(StaleWriteError):
+        persistence.save_fenced("task", "state:task", {"status": "stale"}, old_token)
+
+    persistence.save_fenced("task", "state:task", {"status": "code_written"}, new_token)
+    assert persistence.load("state:task") == {"status": "code_written"}
+
+
+def test_reacquire_by_the_same_owner_bumps_the_token(persistence):
+    first = persistence.acquire_task_lock("task", "w1", 30)
+    second = persistence.acquire_task_lock("task", "w1", 30)
+
+    assert second > first
+    with pytest.raises(StaleWriteError):
+        persistence.save_fenced("task", "state:task", {}, first)
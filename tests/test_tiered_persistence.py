@@ -0,0 +1,100 @@
+import time
+
+import pytest
+
+from app.persistence import StaleWriteError, TieredRedisPersistence
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def open_tiered(fake_redis, closing):
+    def open_tiered(**kwargs):
+        tiered = closing(TieredRedisPersistence("redis://fake", channel="test:invalidate", **kwargs))
+        assert wait_until(lambda: tiered._online), "assinatura de invalidação não confirmada"
+        return tiered
+
+    return open_tiered
+
+
+def count_gets(monkeypatch, tiered):
+    calls = []
+    get = tiered.client.get
+    monkeypatch.setattr(tiered.client, "get", lambda key: (calls.append(key), get(key))[1])
+    return calls
+
+
+def test_reads_are_served_from_the_local_cache(open_tiered, monkeypatch):
+    tiered = open_tiered()
+    tiered.save("state:a", {"status": "code_written"})
+    gets = count_gets(monkeypatch, tiered)
+
+    assert tiered.exists("state:a")
+    assert tiered.load_state("a") == {"status": "code_written"}
+    assert not tiered.exists("state:missing")
+    assert not tiered.exists("state:missing")
+
+    assert gets == ["state:missing"]
+
+
+def test_writes_invalidate_peer_caches(open_tiered):
+    first, second = open_tiered(), open_tiered()
+    first.save("state:a", {"v": 1})
+    assert second.load("state:a") == {"v": 1}
+
+    first.save("state:a", {"v": 2})
+    assert wait_until(lambda: second.load("state:a") == {"v": 2})
+
+    first.delete("state:a")
+    assert wait_until(lambda: not second.exists("state:a"))
+
+
+def test_clear_all_empties_every_cache(open_tiered):
+    first, second = open_tiered(), open_tiered()
+    first.save("state:a", {"v": 1})
+    assert second.exists("state:a")
+
+    first.clear_all()
+
+    assert not first.exists("state:a")
+    assert wait_until(lambda: not second.exists("state:a"))
+
+
+def test_stale_fenced_write_is_rejected_and_not_cached(open_tiered):
+    first, second = open_tiered(), open_tiered()
+    old_token = first.acquire_task_lock("a", "w1", 60)
+    first.save_fenced("a", "state:a", {"owner": "w1"}, old_token)
+    first.release_task_lock("a", "w1")
+
+    new_token = second.acquire_task_lock("a", "w2", 60)
+    second.save_fenced("a", "state:a", {"owner": "w2"}, new_token)
+
+    with pytest.raises(StaleWriteError):
+        first.save_fenced("a", "state:a", {"owner": "w1"}, old_token)
+    assert wait_until(lambda: first.load("state:a") == {"owner": "w2"})
+
+
+def test_cache_is_bounded(open_tiered):
+    tiered = open_tiered(max_keys=2)
+    for key in ("a", "b", "c"):
+        tiered.save(key, {"k": key})
+
+    assert list(tiered._cache) == ["b", "c"]
+    assert tiered.load("a") == {"k": "a"}
+
+
+def test_cache_is_bypassed_after_close(open_tiered, monkeypatch):
+    tiered = open_tiered()
+    tiered.save("state:a", {"v": 1})
+    tiered.close()
+    gets = count_gets(monkeypatch, tiered)
+
+    assert tiered.load("state:a") == {"v": 1}
+    assert gets == ["state:a"]
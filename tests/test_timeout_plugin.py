@@ -0,0 +1,31 @@
+from app.agents.runner import run_pytest
+from app.agents.timeout_plugin import TIMEOUT_MARKER
+from app.config import Config
+
+TESTS = """
+from app_code import process
+
+def test_hangs():
+    process(True)
+
+def test_passes():
+    assert process(False) == 1
+"""
+
+IMPLEMENTATION = """
+def process(hang):
+    while hang:
+        pass
+    return 1
+"""
+
+
+def test_hung_test_fails_alone_and_the_rest_runs(repo_root, monkeypatch):
+    monkeypatch.setattr(Config, "SANDBOX_ENABLED", False)
+    output = run_pytest(
+        per_test_timeout=0.5,
+        files={Config.TEST_FILE: TESTS, f"{Config.IMPLEMENTATION_MODULE}.py": IMPLEMENTATION}
+    )
+    assert TIMEOUT_MARKER in output
+    assert "test_hangs" in output
+    assert "1 failed, 1 passed" in output